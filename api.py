@@ -1,39 +1,113 @@
 from fastapi import FastAPI, Response, Request
-from models.gemini_chat_model import GeminiChatModel, Chat
+from fastapi.responses import JSONResponse
+from models.gemini_chat_model import GeminiChatModel, Chat, ChatRequest, ChatResponse
 from models.api_models import ResponseSchema, Status
 from models.api_models import UserSchema
 import asyncio
 import uvicorn
+import os
+import signal
 import sys
+import tempfile
+import threading
+import time
 from dotenv import load_dotenv
 from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
-from utils.gemini_call import gemini
-from db.crud import UserManager
+from utils.gemini_call import gemini, context_window, load_model_client, warm_up_prompt_cache
+from utils.context_window import estimate_tokens
+from utils.response_cache import response_cache
+from utils.renderer import render_reply
+from utils.compression import CompressionMiddleware, HTML_MINIFY, compression_stats, minify_html, minify_stats
+from prompts.prompt import general_prompt
+from db.crud import UserManager, conversations, usage
+from db.database import warm_up, get_pool_metrics
+from utils.mcp_pool import mcp_pool
+from utils.admission import chat_admission, Overloaded
+from utils.llm_scheduler import llm_scheduler
+from utils.usage import usage_metrics
+from utils.tool_governor import tool_governor
 from loguru import logger
 from pymongo.errors import DuplicateKeyError
 
 load_dotenv()
+API_HOST = os.getenv("API_HOST", "127.0.0.1")
+API_PORT = int(os.getenv("API_PORT", "8080"))
+# Worker processes; all per-user state (sessions, conversations, response/prompt caches) lives in
+# Mongo, so any worker can serve any request
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+# On shutdown, stop admitting new /chat runs and give the in-flight ones this long to finish
+# (uvicorn's graceful shutdown timeout)
+API_DRAIN_TIMEOUT = float(os.getenv("API_DRAIN_TIMEOUT", "120"))
+
+# How often to retry creating the Mongo indexes after a failure at startup
+MONGO_INDEX_RETRY_SECONDS = float(os.getenv("MONGO_INDEX_RETRY_SECONDS", "5"))
+
 if sys.platform.startswith("win"):
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
-sessions = {}
+# Registration relies on the unique index on users.username; /ready is 503 until the indexes exist
+indexes_ready = False
+
+
+async def warm_up_mongo():
+    global indexes_ready
+    try:
+        logger.info("Warming up Mongo connection pool")
+        await warm_up()
+        logger.info("Ensuring indexes")
+        await UserManager.ensure_indexes()
+        indexes_ready = True
+        logger.info("Indexes ready")
+    except Exception as e:
+        logger.error(f"Index creation failed, retrying in {MONGO_INDEX_RETRY_SECONDS}s\nstacktrace:{e}")
+
+
+async def ensure_mongo_ready():
+    while not indexes_ready:
+        await asyncio.sleep(MONGO_INDEX_RETRY_SECONDS)
+        await warm_up_mongo()
+
+
+async def prepare_agent():
+    # /chat answers 503 until every tool server has been reached and its tools discovered
+    await asyncio.gather(mcp_pool.wait_ready(), ensure_mongo_ready())
+    await warm_up_prompt_cache()
+
 
-# Initialize MCP client once (on startup)
-mcp_client = None
+def drain_on_shutdown_signal():
+    # uvicorn runs lifespan shutdown only once open requests have finished, too late to turn new
+    # ones away; so the shutdown signal itself starts the drain, then uvicorn's own handler runs.
+    # uvicorn installs its handlers before lifespan startup, in every worker process
+    if threading.current_thread() is not threading.main_thread():
+        return
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        previous = signal.getsignal(sig)
+        if not callable(previous):
+            continue
+
+        def handler(signum, frame, previous=previous):
+            chat_admission.start_draining()
+            previous(signum, frame)
+        signal.signal(sig, handler)
 
 
 @asynccontextmanager
 async def lifespan(app:FastAPI):
-    try:
-        logger.info("Synchronizing sessions")
-        sessions = await UserManager.getSessions()
-        logger.info("Sessions Synchronized")
-    except Exception as e:
-        logger.info(f"Synchronizng Failed\nstacktrace:{e}")
-    
+    started = time.perf_counter()
+    drain_on_shutdown_signal()
+    # Everything the first /chat would otherwise pay for, in parallel: the Gemini/LangGraph imports
+    # and client (in a thread), the Mongo pool, and the persistent MCP sessions to the tool servers
+    # (servers listed in MCP_INPROCESS are imported and served in memory; servers that aren't up
+    # yet are reconnected lazily and by the pool's health check)
+    await asyncio.gather(asyncio.to_thread(load_model_client), warm_up_mongo(), mcp_pool.start())
+    logger.info(f"Startup warm-up finished in {time.perf_counter() - started:.2f}s")
+    readiness = asyncio.create_task(prepare_agent())
+
     yield
     print("Shutting Down")
+    readiness.cancel()
+    await mcp_pool.close()
 
 
 api = FastAPI(lifespan=lifespan)
@@ -44,6 +118,8 @@ api.add_middleware(
     allow_methods = ["*"],
     allow_headers=["*"]
 )
+# gzip/br for responses over COMPRESSION_MIN_BYTES (chat HTML and histories compress ~5-10x)
+api.add_middleware(CompressionMiddleware)
 @api.post("/register")
 async def register(user_data:UserSchema):
     try:
@@ -63,7 +139,7 @@ async def register(user_data:UserSchema):
 @api.post("/login")
 async def login(user_data:UserSchema):
     try:
-        response:ResponseSchema = await UserManager.login(user_data, sessions)
+        response:ResponseSchema = await UserManager.login(user_data)
         if response.status == Status.SUCCESS:
             logger.info(f"User {user_data.username} logged in successfully.")
         else:
@@ -80,13 +156,164 @@ async def logout(request:Request):
     return response.model_dump()
 
 
+@api.get("/metrics")
+async def metrics():
+    return {"worker": os.getpid(), "mongo_pool": get_pool_metrics(), "response_cache": response_cache.stats(), "mcp_pool": mcp_pool.stats(),
+            "chat_admission": chat_admission.stats(),
+            "compression": {**compression_stats.snapshot(), "minify": minify_stats.snapshot()}, "llm_scheduler": llm_scheduler.stats(),
+            "tool_governor": tool_governor.stats()}
+
+
+@api.get("/metrics/prometheus")
+async def prometheus_metrics():
+    exposition = usage_metrics.exposition()
+    if exposition is None:
+        return JSONResponse(status_code=501, content={"detail": "prometheus_client is not installed"})
+    body, content_type = exposition
+    return Response(content=body, media_type=content_type)
+
+
+@api.get("/health")
+async def health():
+    return {"status": "ok"}
+
+
+@api.get("/ready")
+async def ready():
+    # Readiness probe for load balancers and supervisor.py: ready once the tool servers are reachable
+    # and the Mongo indexes exist
+    is_ready = mcp_pool.ready and indexes_ready
+    body = {"ready": is_ready, "worker": os.getpid(), "indexes": indexes_ready, "mcp_pool": mcp_pool.stats()}
+    return JSONResponse(status_code=200 if is_ready else 503, content=body)
+
+
+async def get_session(request:Request):
+    return await UserManager.get_session(request.headers.get("Authorization"))
+
+
+def rendered(message: Chat) -> Chat:
+    # AI replies are stored as the model's compact structured JSON (also what later turns send back
+    # to the model) and rendered into the themed HTML on the way out
+    if message.role != "ai":
+        return message
+    content = render_reply(message.content)
+    return Chat(role="ai", content=minify_html(content) if HTML_MINIFY else content)
+
+
+@api.get("/conversations")
+async def list_conversations(request:Request):
+    session = await get_session(request)
+    if not session:
+        return ResponseSchema(status=Status.ERROR, content="Invalid or expired session").model_dump()
+    items = await conversations.list(session["username"])
+    return ResponseSchema(status=Status.SUCCESS, content=[
+        {**c, "created_at": c["created_at"].isoformat(), "updated_at": c["updated_at"].isoformat()} for c in items
+    ]).model_dump()
+
+
+@api.get("/conversations/{conversation_id}")
+async def get_conversation(conversation_id:str, request:Request):
+    session = await get_session(request)
+    if not session:
+        return ResponseSchema(status=Status.ERROR, content="Invalid or expired session").model_dump()
+    history = await conversations.get_messages(conversation_id, session["username"])
+    if history is None:
+        return ResponseSchema(status=Status.ERROR, content="Conversation not found").model_dump()
+    return GeminiChatModel(messages=[rendered(Chat(**m)) for m in history]).model_dump()
+
+
+@api.get("/usage")
+async def get_usage(request:Request, days:int = 30, conversation_id:str = None):
+    # Tokens and estimated cost of the caller's agent runs, with the tools that inflated the context most
+    session = await get_session(request)
+    if not session:
+        return ResponseSchema(status=Status.ERROR, content="Invalid or expired session").model_dump()
+    summary = await usage.summary(session["username"], days=max(1, min(days, 365)), conversation_id=conversation_id)
+    return ResponseSchema(status=Status.SUCCESS, content=summary).model_dump()
+
+
+async def run_agent(username: str, conversation_id: str, conversation: dict, user_message: Chat,
+                    first_message: bool) -> Chat:
+    window, summary, summarized_upto, stats = context_window.build(
+        conversation["messages"] + [user_message.model_dump()],
+        summary=conversation["summary"],
+        summarized_upto=conversation["summarized_upto"],
+        reserved_tokens=estimate_tokens(general_prompt())
+    )
+    if summarized_upto != conversation["summarized_upto"]:
+        await conversations.save_summary(conversation_id, summary, summarized_upto)
+
+    result = await gemini(GeminiChatModel(messages=window), stats)
+    ai_message = result.messages[-1]
+    if first_message:
+        await response_cache.store(user_message.content, ai_message.content)
+    await conversations.append(conversation_id, [user_message.model_dump(), ai_message.model_dump()])
+    logger.info(
+        f"Context for {conversation_id}: history {stats['history_tokens']} -> {stats['history_tokens_sent']} tokens, "
+        f"{stats.get('llm_steps', 0)} LLM steps {stats.get('step_tokens', 0)} -> {stats.get('step_tokens_sent', 0)} tokens, "
+        f"input {stats.get('input_tokens', 0)} (cached {stats.get('cached_input_tokens', 0)}, "
+        f"uncached {stats.get('uncached_input_tokens', 0)}), output {stats.get('output_tokens', 0)}"
+    )
+    await usage.record(username, conversation_id, user_message.content, stats)
+    return ai_message
+
+
 @api.post("/chat")
-async def chat(messages: GeminiChatModel):
-    # Ensure last message is from user
-    if messages.messages[-1].role not in ["user", "human"]:
-        return messages
+async def chat(body: ChatRequest, request: Request):
+    # History lives server-side; the client sends only the new user message
+    session = await get_session(request)
+    if not session:
+        return ResponseSchema(status=Status.ERROR, content="Invalid or expired session").model_dump()
+
+    if body.conversation_id:
+        conversation = await conversations.get(body.conversation_id, session["username"])
+        if conversation is None:
+            return ResponseSchema(status=Status.ERROR, content="Conversation not found").model_dump()
     else:
-        return await gemini(messages)
+        # Created only once the message is answered, so shed requests don't leave empty conversations
+        conversation = {"messages": [], "summary": None, "summarized_upto": 0}
+    first_message = not conversation["messages"]
+
+    user_message = Chat(role="user", content=body.message)
+    # Only the opening question of a conversation is self-contained enough to answer from cache
+    if first_message:
+        cached = await response_cache.lookup(body.message)
+        if cached is not None:
+            conversation_id = body.conversation_id or await conversations.create(session["username"])
+            ai_message = Chat(role="ai", content=cached)
+            await conversations.append(conversation_id, [user_message.model_dump(), ai_message.model_dump()])
+            logger.info(f"Response cache hit for {conversation_id}")
+            return ChatResponse(conversation_id=conversation_id, message=rendered(ai_message)).model_dump()
+
+    if not mcp_pool.ready:
+        return JSONResponse(
+            status_code=503,
+            headers={"Retry-After": "2"},
+            content=ResponseSchema(status=Status.ERROR, content="Kowalski is starting up, please retry shortly").model_dump()
+        )
+
+    # Agent runs are admitted up to CHAT_MAX_CONCURRENCY at a time; beyond the bounded queue, or
+    # after waiting CHAT_QUEUE_TIMEOUT_SECONDS, the request is shed with a 429; a worker that is
+    # shutting down answers 503 so the client retries against another one
+    try:
+        async with chat_admission.slot():
+            conversation_id = body.conversation_id or await conversations.create(session["username"])
+            ai_message = await run_agent(session["username"], conversation_id, conversation, user_message, first_message)
+    except Overloaded as e:
+        logger.warning(f"Shedding /chat for {session['username']} ({e.reason}), retry after {e.retry_after}s")
+        return JSONResponse(
+            status_code=503 if e.reason == "draining" else 429,
+            headers={"Retry-After": str(e.retry_after)},
+            content=ResponseSchema(status=Status.ERROR, content="Kowalski is busy, please retry shortly").model_dump()
+        )
+    return ChatResponse(conversation_id=conversation_id, message=rendered(ai_message)).model_dump()
 
 if __name__ == "__main__":
-    uvicorn.run(api, port=8080)
+    if API_WORKERS > 1 and not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # Prometheus counters are per process; in multiprocess mode the workers (which import the
+        # app afresh and inherit this) share them through files, so any worker can be scraped
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="kowalski-prometheus-")
+    # Multiple workers need the app as an import string; on SIGTERM/Ctrl+C uvicorn waits up to the
+    # graceful shutdown timeout for open requests while /chat sheds new ones (drain_on_shutdown_signal)
+    uvicorn.run("api:api", host=API_HOST, port=API_PORT, workers=API_WORKERS,
+                timeout_graceful_shutdown=int(API_DRAIN_TIMEOUT))
@@ -0,0 +1,322 @@
+"""
+Offline load test for POST /chat.
+
+The real api.py app is driven in-process (httpx ASGI transport) at a configurable concurrency. Only
+the edges are swapped for local stand-ins:
+- the LLM is a deterministic scripted chat model that emits tool-call sequences (still routed
+  through the LLM scheduler and the LangGraph agent);
+- the three MCP servers run in-process with their real tools, backed by benchmarks.stubs
+  (fake DuckDuckGo/web pages/OpenWeather, in-memory MongoDB);
+- sessions and conversations live in memory.
+Everything else (admission control, context window, MCP pool, agent loop, script subprocesses)
+is the production code path, so regressions show up without network access or API keys.
+
+    python -m benchmarks.chat_load --users 16 --turns 4 --llm-ms 200 --backend-ms 20 --json chat_load.json
+"""
+import os
+
+# Must be set before the app modules are imported
+os.environ["MCP_INPROCESS"] = "all"
+os.environ["MCP_HEALTH_INTERVAL"] = "0"
+os.environ["GEMINI_CONTEXT_CACHE"] = "0"
+os.environ["RESPONSE_CACHE_ENABLED"] = "0"
+
+import argparse
+import asyncio
+import contextvars
+import json
+import statistics
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from typing import List
+
+import httpx
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from loguru import logger
+
+import api
+import utils.gemini_call as gemini_call
+from benchmarks.stubs import MemoryMongoClient, patients, stub_database_server, stub_search_server
+from servers import mongoose_database_server, search_server
+from utils.context_window import message_tokens
+from utils.llm_scheduler import LLMScheduler, ScheduledChatModel
+from utils.mcp_pool import mcp_pool
+
+STAGES = ("admission", "context", "llm", "tools", "persist")
+# Per-request stage timings; tasks spawned by the agent inherit the same dict
+stage_times: contextvars.ContextVar[dict] = contextvars.ContextVar("stage_times")
+
+SCENARIOS = {
+    "weather": [("get_weather", {"city": "Paris"})],
+    "research": [
+        ("search", {"query": "quantum computing", "max_results": 2, "character_lookup": 1000}),
+        ("get_page_content", {"link": "http://fixtures.local/quantum-computing/0"}),
+    ],
+    "data": [
+        ("get_collections", {"database": "clinic"}),
+        ("read_records", {"database": "clinic", "collection": "patients",
+                          "query_filter": {"age": {"$gt": 60}}, "projection": ["age", "glucose", "bmi"], "limit": 25}),
+    ],
+    "script": [
+        ("list_scripts", {"limit": 5}),
+        ("run_script", {"filename": "current_time.py"}),
+    ],
+}
+PROMPTS = {
+    "weather": "What's the weather in Paris right now?",
+    "research": "Research quantum computing for me",
+    "data": "Show older patients from the clinic data",
+    "script": "Run the current time script",
+}
+
+
+def add_time(stage: str, seconds: float):
+    times = stage_times.get(None)
+    if times is not None:
+        times[stage] = times.get(stage, 0.0) + seconds
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Deterministic stand-in for Gemini. The scenario is picked from the latest user message; each
+    step issues the scenario's next tool call until all have results, then answers with a
+    structured response (rendered by the API like a real one).
+    `latency_ms` is slept per call to mimic model time.
+    """
+
+    latency_ms: float = 200.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[getattr(t, "name", str(t)) for t in tools])
+
+    def _respond(self, messages) -> ChatResult:
+        last_user = max(i for i, m in enumerate(messages) if isinstance(m, HumanMessage))
+        prompt = str(messages[last_user].content).lower()
+        scenario = next((name for name in SCENARIOS if name in prompt or PROMPTS[name].lower() in prompt), "weather")
+        results = [m for m in messages[last_user:] if isinstance(m, ToolMessage)]
+        steps = SCENARIOS[scenario]
+        if len(results) < len(steps):
+            name, args = steps[len(results)]
+            message = AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": f"call_{uuid.uuid4().hex[:8]}"}])
+        else:
+            sizes = {m.name: f"{len(str(m.content))} chars" for m in results}
+            message = AIMessage(content=json.dumps({"title": scenario.title(), "blocks": [
+                {"type": "card", "title": "Tool results", "facts": sizes}
+            ]}))
+        input_tokens = sum(message_tokens(m) for m in messages)
+        output_tokens = message_tokens(message)
+        message.usage_metadata = {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                                  "total_tokens": input_tokens + output_tokens}
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency_ms / 1000)
+        return self._respond(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency_ms / 1000)
+        return self._respond(messages)
+
+
+class TimedChatModel(ScheduledChatModel):
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        started = time.perf_counter()
+        try:
+            return await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        finally:
+            add_time("llm", time.perf_counter() - started)
+
+
+def timed(stage: str, fn):
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            add_time(stage, time.perf_counter() - started)
+    return wrapper
+
+
+def timed_sync(stage: str, fn):
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            add_time(stage, time.perf_counter() - started)
+    return wrapper
+
+
+class MemoryConversations:
+    """In-memory stand-in for db.conversations.ConversationStore."""
+
+    def __init__(self):
+        self.items = {}
+
+    async def create(self, username: str) -> str:
+        conversation_id = uuid.uuid4().hex
+        self.items[conversation_id] = {"username": username, "messages": [], "summary": None, "summarized_upto": 0}
+        return conversation_id
+
+    async def get(self, conversation_id: str, username: str):
+        item = self.items.get(conversation_id)
+        if item is None or item["username"] != username:
+            return None
+        return {"messages": list(item["messages"]), "summary": item["summary"], "summarized_upto": item["summarized_upto"]}
+
+    async def save_summary(self, conversation_id: str, summary: str, summarized_upto: int):
+        self.items[conversation_id].update(summary=summary, summarized_upto=summarized_upto)
+
+    async def append(self, conversation_id: str, messages: List[dict]):
+        self.items[conversation_id]["messages"].extend(messages)
+
+
+class MemoryUsage:
+    """In-memory stand-in for db.usage.UsageStore."""
+
+    def __init__(self):
+        self.records = []
+
+    async def record(self, username: str, conversation_id: str, prompt: str, stats: dict):
+        self.records.append((username, conversation_id, stats))
+
+
+async def get_session(request):
+    token = request.headers.get("Authorization")
+    return {"username": token} if token else None
+
+
+def install_stand_ins(llm_ms: float = 200.0, backend_ms: float = 20.0, records: int = 5000, rpm: float = 0,
+                      tpm: float = 0, max_concurrency: int = 0):
+    """Swap the app's edges (LLM, tool backends, sessions, conversations, usage) for the local stand-ins."""
+    stub_search_server(search_server, latency_ms=backend_ms)
+    mongo = MemoryMongoClient()
+    mongo["clinic"]["patients"].insert_many(patients(records))
+    stub_database_server(mongoose_database_server, mongo)
+
+    scheduler = LLMScheduler(requests_per_minute=rpm, tokens_per_minute=tpm)
+    gemini_call.chat_model = lambda **kwargs: TimedChatModel(
+        model=ScriptedChatModel(latency_ms=llm_ms), scheduler=scheduler
+    )
+    api.llm_scheduler = scheduler
+    api.conversations = MemoryConversations()
+    api.usage = MemoryUsage()
+    api.get_session = get_session
+    if max_concurrency:
+        api.chat_admission.max_concurrency = max_concurrency
+
+
+async def instrument():
+    """Attribute each request's time to stages (see `stage_times`)."""
+    conversations = api.conversations
+    for name in ("create", "save_summary", "append"):
+        setattr(conversations, name, timed("persist", getattr(conversations, name)))
+    api.context_window.build = timed_sync("context", api.context_window.build)
+    api.chat_admission.acquire = timed("admission", api.chat_admission.acquire)
+    for tool in await mcp_pool.get_tools():
+        tool.coroutine = timed("tools", tool.coroutine)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))] if values else 0.0
+
+
+def ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+async def run(args) -> dict:
+    install_stand_ins(args.llm_ms, args.backend_ms, args.records, args.rpm, args.tpm, args.max_concurrency)
+    await instrument()
+    transport = httpx.ASGITransport(app=api.api)
+    latencies = []
+    statuses = Counter()
+    stages = defaultdict(list)
+    names = list(SCENARIOS)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://load", timeout=None) as client:
+        async def user(index: int):
+            conversation_id = None
+            for turn in range(args.turns):
+                scenario = names[(index + turn) % len(names)]
+                times = {}
+                stage_times.set(times)
+                started = time.perf_counter()
+                response = await client.post(
+                    "/chat",
+                    json={"message": f"{PROMPTS[scenario]} (user {index}, turn {turn})", "conversation_id": conversation_id},
+                    headers={"Authorization": f"user{index}"}
+                )
+                total = time.perf_counter() - started
+                statuses[response.status_code] += 1
+                if response.status_code != 200:
+                    continue
+                conversation_id = response.json().get("conversation_id", conversation_id)
+                latencies.append(total)
+                for stage in STAGES:
+                    stages[stage].append(times.get(stage, 0.0))
+                stages["other"].append(total - sum(times.values()))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user(i) for i in range(args.users)))
+        elapsed = time.perf_counter() - started
+        metrics = (await client.get("/metrics")).json()
+
+    return {
+        "config": vars(args),
+        "requests": sum(statuses.values()),
+        "statuses": dict(statuses),
+        "wall_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "latency_ms": {
+            "p50": ms(percentile(latencies, 0.5)),
+            "p95": ms(percentile(latencies, 0.95)),
+            "p99": ms(percentile(latencies, 0.99)),
+            "max": ms(max(latencies, default=0.0)),
+        },
+        "stages_ms": {
+            stage: {"mean": ms(statistics.mean(values)), "p95": ms(percentile(values, 0.95))}
+            for stage, values in stages.items() if values
+        },
+        "chat_admission": metrics["chat_admission"],
+        "llm_scheduler": metrics["llm_scheduler"],
+        "mcp_pool": metrics["mcp_pool"],
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=16, help="concurrent virtual users")
+    parser.add_argument("--turns", type=int, default=4, help="sequential /chat turns per user (one conversation)")
+    parser.add_argument("--llm-ms", type=float, default=200.0, help="simulated model latency per agent step")
+    parser.add_argument("--backend-ms", type=float, default=20.0, help="simulated search/weather backend latency")
+    parser.add_argument("--records", type=int, default=5000, help="patients in the in-memory clinic database")
+    parser.add_argument("--rpm", type=float, default=0, help="LLM requests/minute quota (0 = unlimited)")
+    parser.add_argument("--tpm", type=float, default=0, help="LLM tokens/minute quota (0 = unlimited)")
+    parser.add_argument("--max-concurrency", type=int, help="override CHAT_MAX_CONCURRENCY")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--verbose", action="store_true", help="keep the app's info logs")
+    args = parser.parse_args()
+    if not args.verbose:
+        logger.remove()
+        logger.add(sys.stderr, level="WARNING")
+
+    report = await run(args)
+    await mcp_pool.close()
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,35 @@
+"""
+The api.py app wired to the chat_load stand-ins, for serving under a real uvicorn process:
+
+    BENCH_LLM_MS=200 python -m uvicorn benchmarks.chat_load_app:app --workers 4 --port 8090
+
+Each worker process builds its own stand-ins; settings come from BENCH_* env vars. Conversations
+are kept in worker memory, so drive it with single-turn requests (see benchmarks.worker_scaling).
+"""
+import os
+import sys
+
+from loguru import logger
+
+import api
+from benchmarks.chat_load import install_stand_ins
+from db.crud import UserManager
+
+
+async def skip():
+    pass
+
+
+install_stand_ins(
+    llm_ms=float(os.getenv("BENCH_LLM_MS", "200")),
+    backend_ms=float(os.getenv("BENCH_BACKEND_MS", "20")),
+    records=int(os.getenv("BENCH_RECORDS", "5000")),
+)
+# No MongoDB needed: sessions and conversations are already in-memory stand-ins
+api.warm_up = skip
+UserManager.ensure_indexes = skip
+if os.getenv("BENCH_VERBOSE") != "1":
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+app = api.api
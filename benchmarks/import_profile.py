@@ -0,0 +1,82 @@
+"""
+Import-time profile of the API (or any module), from `python -X importtime`.
+
+Imports the module in a fresh interpreter --repeat times and reports the median wall time, the
+slowest imports by cumulative time, and self time summed per top-level package. Exits with
+status 1 when the median is over --budget-ms, so it can guard startup time in CI.
+
+    python -m benchmarks.import_profile
+    python -m benchmarks.import_profile --module utils.gemini_call --top 30 --budget-ms 1500
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)\s*$")
+
+
+def profile(module: str) -> dict:
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, capture_output=True,
+                            text=True, env={**os.environ, "PYTHONPATH": ROOT})
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    imports = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            imports.append({"module": name, "depth": len(indent) // 2, "self_ms": int(self_us) / 1000,
+                            "cumulative_ms": int(cumulative_us) / 1000})
+    return {"wall_ms": float(result.stdout.strip().splitlines()[-1]) * 1000, "imports": imports}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="api", help="module to import")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters to take the median over")
+    parser.add_argument("--top", type=int, default=20, help="slowest imports / packages to list")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", "2000")),
+                        help="fail when the median import time is above this")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    runs = [profile(args.module) for _ in range(args.repeat)]
+    wall_ms = statistics.median(r["wall_ms"] for r in runs)
+    # The profile of the median run; -X importtime itself adds some overhead to every import
+    imports = sorted(runs, key=lambda r: r["wall_ms"])[len(runs) // 2]["imports"]
+    packages = defaultdict(float)
+    for entry in imports:
+        packages[entry["module"].split(".")[0]] += entry["self_ms"]
+    direct = [e for e in imports if e["depth"] == 1]
+
+    print(f"import {args.module}: median {wall_ms:.0f} ms over {args.repeat} runs "
+          f"(budget {args.budget_ms:.0f} ms, {len(imports)} modules)")
+    print("\nDirect imports by cumulative time")
+    for entry in sorted(direct, key=lambda e: -e["cumulative_ms"])[:args.top]:
+        print(f"  {entry['cumulative_ms']:9.1f} ms  {entry['module']}")
+    print("\nSlowest imports by cumulative time")
+    for entry in sorted(imports, key=lambda e: -e["cumulative_ms"])[:args.top]:
+        print(f"  {entry['cumulative_ms']:9.1f} ms  {'  ' * (entry['depth'] - 1)}{entry['module']}")
+    print("\nSelf time per top-level package")
+    for name, ms in sorted(packages.items(), key=lambda p: -p[1])[:args.top]:
+        print(f"  {ms:9.1f} ms  {name}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"module": args.module, "wall_ms": round(wall_ms, 1), "budget_ms": args.budget_ms,
+                       "runs_ms": [round(r["wall_ms"], 1) for r in runs], "packages_ms": dict(packages),
+                       "imports": imports}, f, indent=2)
+    if wall_ms > args.budget_ms:
+        print(f"\nOver budget by {wall_ms - args.budget_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
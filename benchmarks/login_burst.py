@@ -0,0 +1,92 @@
+"""
+/chat latency under a burst of logins, with bcrypt run inline on the event loop ("before")
+versus offloaded to PasswordUtils' bounded worker pool ("after").
+
+The app below mirrors the shape of api.py: `/login` verifies a bcrypt hash and `/chat` stands in
+for an agent run that is I/O bound (awaiting the LLM/tool servers). No network or Mongo is needed.
+
+    python -m benchmarks.login_burst --logins 32 --chats 50 --rounds 12
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import bcrypt
+import httpx
+from fastapi import FastAPI
+
+from utils.pass_hasher import PasswordUtils, BCRYPT_WORKERS, BCRYPT_MAX_CONCURRENCY
+
+
+def build_app(mode: str, hashed: str, chat_io_seconds: float) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/login")
+    async def login():
+        if mode == "inline":
+            ok = PasswordUtils.verify_password("secret", hashed)
+        else:
+            ok = await PasswordUtils.verify_password_async("secret", hashed)
+        return {"ok": ok}
+
+    @app.post("/chat")
+    async def chat():
+        await asyncio.sleep(chat_io_seconds)
+        return {"ok": True}
+
+    return app
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+async def run(mode: str, hashed: str, logins: int, chats: int, chat_io_seconds: float) -> dict:
+    transport = httpx.ASGITransport(app=build_app(mode, hashed, chat_io_seconds))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        latencies = []
+
+        started = time.perf_counter()
+
+        async def one_chat(delay):
+            await asyncio.sleep(delay)
+            await client.post("/chat")
+            # Measured from when the request was due, so time stuck behind a blocked loop counts
+            latencies.append(time.perf_counter() - (started + delay))
+
+        # Chats are spread over the burst so some always overlap with bcrypt work
+        await asyncio.gather(
+            *(client.post("/login") for _ in range(logins)),
+            *(one_chat(i * 0.005) for i in range(chats))
+        )
+        elapsed = time.perf_counter() - started
+
+    return {
+        "mode": mode,
+        "wall_s": round(elapsed, 3),
+        "chat_p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "chat_p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "chat_max_ms": round(max(latencies) * 1000, 1),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--chats", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost of the stored hash")
+    parser.add_argument("--chat-io-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    hashed = bcrypt.hashpw(b"secret", bcrypt.gensalt(rounds=args.rounds)).decode("utf-8")
+    print(f"logins={args.logins} chats={args.chats} rounds={args.rounds} "
+          f"workers={BCRYPT_WORKERS} max_concurrency={BCRYPT_MAX_CONCURRENCY}")
+    for mode in ("inline", "offloaded"):
+        result = await run(mode, hashed, args.logins, args.chats, args.chat_io_ms / 1000)
+        print(result)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
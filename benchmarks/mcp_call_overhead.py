@@ -0,0 +1,110 @@
+"""
+Per-tool-call latency with a new MCP session per call (MultiServerMCPClient, "before") versus
+the persistent, pooled sessions of utils.mcp_pool ("after").
+
+A throwaway FastMCP server with a trivial `echo` tool is started on localhost, so what is measured
+is the session/transport overhead the agent pays on every tool call, not the tool's own work.
+
+    python -m benchmarks.mcp_call_overhead --calls 200 --concurrency 4
+"""
+import argparse
+import asyncio
+import socket
+import statistics
+import time
+
+import uvicorn
+from fastmcp import Client, FastMCP
+from langchain_mcp_adapters.client import MultiServerMCPClient
+
+from utils.mcp_pool import MCPPool, HTTPServer
+
+
+def build_server() -> FastMCP:
+    app = FastMCP("bench")
+
+    @app.tool()
+    def echo(text: str) -> dict:
+        return {"status": "success", "text": text}
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+async def wait_until_up(url: str, timeout: float = 15.0):
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            async with Client(url) as client:
+                await client.ping()
+                return
+        except Exception:
+            if time.perf_counter() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+
+async def measure(mode: str, tool, calls: int, concurrency: int) -> dict:
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            started = time.perf_counter()
+            await tool.ainvoke({"text": f"call {i}"})
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    elapsed = time.perf_counter() - started
+    return {
+        "mode": mode,
+        "calls_per_s": round(calls / elapsed, 1),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--pool-size", type=int, default=2)
+    args = parser.parse_args()
+
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/mcp"
+    server = uvicorn.Server(uvicorn.Config(build_server().http_app(), host="127.0.0.1", port=port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    try:
+        await wait_until_up(url)
+        print(f"calls={args.calls} concurrency={args.concurrency} pool_size={args.pool_size}")
+
+        per_call = MultiServerMCPClient({"bench": {"url": url, "transport": "streamable_http"}})
+        tool = (await per_call.get_tools())[0]
+        await tool.ainvoke({"text": "warm-up"})
+        print(await measure("session-per-call", tool, args.calls, args.concurrency))
+
+        pool = MCPPool({"bench": HTTPServer(url)}, size=args.pool_size, health_interval=0)
+        tool = (await pool.get_tools())[0]
+        await tool.ainvoke({"text": "warm-up"})
+        print(await measure("pooled", tool, args.calls, args.concurrency))
+        await pool.close()
+    finally:
+        server.should_exit = True
+        await serving
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
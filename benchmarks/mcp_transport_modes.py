@@ -0,0 +1,68 @@
+"""
+Tool-call latency for the two MCP deployment modes of utils.mcp_pool: pooled sessions to a
+separate server process over loopback HTTP ("http") versus the server's FastMCP app imported into
+the API process and called through the in-memory transport ("inprocess", MCP_INPROCESS).
+
+Two tools are measured: a trivial `echo` (pure transport overhead) and the script server's real
+`read_script` on a workspace file (local disk only, no network or MongoDB needed).
+
+    python -m benchmarks.mcp_transport_modes --calls 300 --concurrency 4
+"""
+import argparse
+import asyncio
+
+import uvicorn
+
+from benchmarks.mcp_call_overhead import build_server, free_port, measure, wait_until_up
+from utils.mcp_pool import MCPPool, HTTPServer, InProcessServer
+
+
+async def compare(label: str, http_app, inprocess_app, tool_name: str, arguments: dict, args) -> None:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/mcp"
+    server = uvicorn.Server(uvicorn.Config(http_app.http_app(), host="127.0.0.1", port=port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    try:
+        await wait_until_up(url)
+        for mode, factory in (("http", HTTPServer(url)), ("inprocess", InProcessServer(inprocess_app))):
+            pool = MCPPool({label: factory}, size=args.pool_size, health_interval=0)
+            tool = next(t for t in await pool.get_tools() if t.name == tool_name)
+            bound = _Bound(tool, arguments)
+            await bound.ainvoke({})
+            result = await measure(mode, bound, args.calls, args.concurrency)
+            print({"tool": tool_name, **result})
+            await pool.close()
+    finally:
+        server.should_exit = True
+        await serving
+
+
+class _Bound:
+    """Calls a tool with fixed arguments, whatever `measure` passes in."""
+
+    def __init__(self, tool, arguments: dict):
+        self.tool = tool
+        self.arguments = arguments
+
+    async def ainvoke(self, _):
+        return await self.tool.ainvoke(self.arguments)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--pool-size", type=int, default=2)
+    args = parser.parse_args()
+    print(f"calls={args.calls} concurrency={args.concurrency} pool_size={args.pool_size}")
+
+    await compare("bench", build_server(), build_server(), "echo", {"text": "hello"}, args)
+
+    from servers import script_server
+    # Both modes serve the same app; the HTTP run goes first, before in-process mode moves its
+    # sync tools onto worker threads
+    await compare("scripts", script_server.app, script_server.app, "read_script", {"filename": "dataset_loader.py"}, args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
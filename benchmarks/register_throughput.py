@@ -0,0 +1,144 @@
+"""
+Registration throughput: the old find_one -> insert_one -> find_one flow versus the
+single insert backed by the unique index on users.username.
+
+Runs against MONGO_URL in a throwaway database that is dropped afterwards. Without a reachable
+MongoDB, `--stand-in-rtt-ms` uses an in-memory users collection that sleeps that long per
+round trip instead, so the difference in round trips is what gets measured.
+bcrypt is set to its minimum cost so the numbers reflect the database round trips.
+
+    python -m benchmarks.register_throughput --users 2000 --concurrency 50
+    python -m benchmarks.register_throughput --stand-in-rtt-ms 1 --json benchmarks/results/register_throughput.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+from db import crud
+from db.crud import UserManager
+from models.api_models import UserSchema, ResponseSchema, Status
+from utils.pass_hasher import PasswordUtils
+
+
+async def legacy_create_user(user: UserSchema):
+    users = crud.client.db.users
+    if await users.find_one({"username": user.username}):
+        return ResponseSchema(status=Status.ERROR, content="username already exists")
+    user.password = await PasswordUtils.hash_password_async(user.password)
+    result = await users.insert_one(user.model_dump())
+    created = await users.find_one({"_id": result.inserted_id})
+    return ResponseSchema(status=Status.SUCCESS, content=crud.client.serialize_doc(created))
+
+
+class StandInUsers:
+    """In-memory users collection; every call costs one simulated round trip."""
+
+    def __init__(self, rtt_ms: float):
+        self.rtt = rtt_ms / 1000
+        self.docs = {}
+        self.unique = False
+
+    async def _round_trip(self):
+        await asyncio.sleep(self.rtt)
+
+    async def create_index(self, key, unique=False):
+        await self._round_trip()
+        self.unique = self.unique or (key == "username" and unique)
+
+    async def find_one(self, query, projection=None):
+        await self._round_trip()
+        for doc in self.docs.values():
+            if all(doc.get(k) == v for k, v in query.items()):
+                return dict(doc)
+        return None
+
+    async def insert_one(self, document):
+        await self._round_trip()
+        if self.unique and any(d["username"] == document["username"] for d in self.docs.values()):
+            raise DuplicateKeyError("E11000 duplicate key error: username")
+        document.setdefault("_id", ObjectId())
+        self.docs[document["_id"]] = dict(document)
+        return type("InsertOneResult", (), {"inserted_id": document["_id"]})()
+
+    async def count_documents(self, query):
+        prefix = query["username"]["$regex"].lstrip("^")
+        return sum(1 for d in self.docs.values() if d["username"].startswith(prefix))
+
+    async def delete_many(self, query):
+        self.docs.clear()
+
+
+class StandInDatabase:
+    def __init__(self, rtt_ms: float):
+        self.users = StandInUsers(rtt_ms)
+
+
+async def run(name, create, users: int, concurrency: int, prefix: str) -> dict:
+    limiter = asyncio.Semaphore(concurrency)
+    results = []
+
+    async def one(i):
+        async with limiter:
+            # every 10th registration reuses a name to exercise the duplicate path
+            username = f"{prefix}-{i - 1 if i % 10 == 9 else i}"
+            results.append(await create(UserSchema(username=username, password="secret")))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(users)))
+    elapsed = time.perf_counter() - started
+    created = sum(1 for r in results if r.status == Status.SUCCESS)
+    stored = await crud.client.db.users.count_documents({"username": {"$regex": f"^{prefix}-"}})
+    return {
+        "flow": name,
+        "registrations_per_s": round(users / elapsed, 1),
+        "wall_s": round(elapsed, 3),
+        "created": created,
+        "stored": stored,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--database", default="auth-bench")
+    parser.add_argument("--stand-in-rtt-ms", type=float,
+                        help="use an in-memory users collection with this round-trip time instead of MongoDB")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = []
+    if args.stand_in_rtt_ms is not None:
+        # Legacy flow runs without the unique index, as it did before
+        crud.client.db = StandInDatabase(args.stand_in_rtt_ms)
+        results.append(await run("find+insert+find", legacy_create_user, args.users, args.concurrency, "legacy"))
+        crud.client.db = StandInDatabase(args.stand_in_rtt_ms)
+        await crud.client.db.users.create_index("username", unique=True)
+        results.append(await run("single insert", UserManager.create_user, args.users, args.concurrency, "single"))
+    else:
+        crud.client.db = crud.client.db.client[args.database]
+        await crud.client.db.client.drop_database(args.database)
+        try:
+            results.append(await run("find+insert+find", legacy_create_user, args.users, args.concurrency, "legacy"))
+            await crud.client.db.users.delete_many({})
+            await UserManager.ensure_indexes()
+            results.append(await run("single insert", UserManager.create_user, args.users, args.concurrency, "single"))
+        finally:
+            await crud.client.db.client.drop_database(args.database)
+    for result in results:
+        print(result)
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
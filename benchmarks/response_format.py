@@ -0,0 +1,150 @@
+"""
+Output size and latency of structured responses (RESPONSE_FORMAT=structured) vs model-written
+HTML (RESPONSE_FORMAT=html).
+
+Offline (default): for representative answers (greeting, weather, records table, research
+summary, chart), compares the tokens the model has to generate. Structured mode generates
+compact JSON. HTML mode generates the themed HTML with inline styles, approximated by the
+renderer's inline mode without the whitespace the model adds, so the saving is understated.
+It also times the server-side renderer. Latency is projected from --output-tps.
+
+--live sends each case's question plus its tool data to Gemini under both system prompts and
+reports the real output tokens and end-to-end latency (needs GOOGLE_API_KEY).
+
+    python -m benchmarks.response_format
+    python -m benchmarks.response_format --live --runs 3
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from models.response_schema import StructuredResponse
+from prompts.prompt import HTML_PROMPT, STRUCTURED_PROMPT
+from utils.context_window import estimate_tokens
+from utils.renderer import Renderer, parse_reply, renderer
+
+WEATHER = {"city": "Cuttack", "condition": "light rain", "temperature": 27.4, "feels_like": 30.1, "humidity": 84, "wind": 4.2}
+RECORDS = [{"patient_id": i, "age": 40 + i * 3 % 37, "glucose": round(95 + i * 7.3 % 60, 1),
+            "bmi": round(22 + i * 1.7 % 12, 1), "outcome": i % 3 == 0} for i in range(15)]
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun"]
+SALES = [120, 135, 160, 148, 190, 210]
+
+CASES = [
+    ("greeting", "hi", None, {"blocks": [{"type": "text", "text": "Hey there! I'm Kowalski, your AI agent 😎. How can I help?"}]}),
+    ("weather", "Show weather for Cuttack", WEATHER, {"blocks": [
+        {"type": "weather", **WEATHER},
+        {"type": "text", "text": "Humid with light rain; carry an umbrella."},
+    ]}),
+    ("records", "Show 15 patient records", RECORDS, {"title": "Patients", "blocks": [
+        {"type": "table", "columns": list(RECORDS[0]), "rows": [list(r.values()) for r in RECORDS],
+         "caption": "15 of 768 records"},
+    ]}),
+    ("research", "Summarize what quantum computing is", None, {"title": "Quantum computing", "blocks": [
+        {"type": "card", "title": "In short", "text": "Computers that use qubits, superposition and entanglement to "
+         "solve some problems far faster than classical machines.", "facts": {"First proposed": "1980s", "Qubits (2024)": "1,000+"}},
+        {"type": "list", "items": ["**Qubits** hold 0 and 1 at once", "**Entanglement** links qubit states",
+                                   "**Error correction** is the main engineering hurdle",
+                                   "Uses: cryptography, chemistry simulation, optimisation"]},
+        {"type": "sources", "sources": [{"title": "Quantum computing - Wikipedia", "url": "https://en.wikipedia.org/wiki/Quantum_computing"},
+                                        {"title": "What is quantum computing? - IBM", "url": "https://www.ibm.com/topics/quantum-computing"}]},
+    ]}),
+    ("chart", "Chart monthly sales for the first half year", dict(zip(MONTHS, SALES)), {"title": "Sales H1", "blocks": [
+        {"type": "chart", "kind": "bar", "title": "Units sold", "labels": MONTHS, "series": [{"name": "2024", "values": SALES}]},
+        {"type": "text", "text": "Sales grew **75%** from January to June, with a dip in April."},
+    ]}),
+]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def offline(args) -> list:
+    inline = Renderer(inline=True)
+    results = []
+    for name, _, _, answer in CASES:
+        response = StructuredResponse.model_validate(answer)
+        structured = json.dumps(answer, ensure_ascii=False, separators=(",", ":"))
+        model_html = inline.render(response)
+        times = []
+        for _ in range(args.render_runs):
+            started = time.perf_counter()
+            renderer.render(parse_reply(structured))
+            times.append(time.perf_counter() - started)
+        render_ms = statistics.median(times) * 1000
+        structured_tokens, html_tokens = estimate_tokens(structured), estimate_tokens(model_html)
+        results.append({
+            "case": name,
+            "html_tokens": html_tokens,
+            "structured_tokens": structured_tokens,
+            "saved_pct": round((1 - structured_tokens / html_tokens) * 100, 1),
+            "render_ms": round(render_ms, 3),
+            "html_latency_ms": round(html_tokens / args.output_tps * 1000, 1),
+            "structured_latency_ms": round(structured_tokens / args.output_tps * 1000 + render_ms, 1),
+        })
+    return results
+
+
+async def live(args) -> list:
+    from langchain_core.messages import HumanMessage, SystemMessage
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    from utils.gemini_call import MODEL_NAME
+
+    model = ChatGoogleGenerativeAI(model=MODEL_NAME)
+    results = []
+    for name, question, data, _ in CASES:
+        row = {"case": name}
+        for mode, prompt in (("html", HTML_PROMPT), ("structured", STRUCTURED_PROMPT)):
+            tokens, latencies, valid = [], [], 0
+            for _ in range(args.runs):
+                content = question if data is None else f"{question}\n\nTool result:\n{json.dumps(data)}"
+                started = time.perf_counter()
+                reply = await model.ainvoke([SystemMessage(content=prompt), HumanMessage(content=content)])
+                latency = time.perf_counter() - started
+                if mode == "structured":
+                    response = parse_reply(str(reply.content))
+                    valid += response is not None
+                    if response is not None:
+                        started = time.perf_counter()
+                        renderer.render(response)
+                        latency += time.perf_counter() - started
+                latencies.append(latency)
+                tokens.append((reply.usage_metadata or {}).get("output_tokens", 0))
+            row[f"{mode}_tokens"] = round(statistics.mean(tokens))
+            row[f"{mode}_latency_ms"] = round(percentile(latencies, 0.5) * 1000, 1)
+            if mode == "structured":
+                row["structured_valid"] = f"{valid}/{args.runs}"
+        row["saved_pct"] = round((1 - row["structured_tokens"] / max(row["html_tokens"], 1)) * 100, 1)
+        results.append(row)
+    return results
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--live", action="store_true", help="measure against Gemini (needs GOOGLE_API_KEY)")
+    parser.add_argument("--runs", type=int, default=3, help="live calls per case and mode")
+    parser.add_argument("--output-tps", type=float, default=150.0, help="output tokens/s used for offline latency projection")
+    parser.add_argument("--render-runs", type=int, default=500, help="offline renderer timing runs per case")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = await live(args) if args.live else offline(args)
+    for r in results:
+        extra = f"  render {r['render_ms']:.3f} ms" if "render_ms" in r else f"  valid {r['structured_valid']}"
+        print(f"{r['case']:10} output tokens {r['html_tokens']:6} -> {r['structured_tokens']:5} ({r['saved_pct']:5.1f}% less)  "
+              f"latency {r['html_latency_ms']:8.1f} -> {r['structured_latency_ms']:8.1f} ms{extra}")
+    total_html = sum(r["html_tokens"] for r in results)
+    total_structured = sum(r["structured_tokens"] for r in results)
+    print(f"{'total':10} output tokens {total_html:6} -> {total_structured:5} "
+          f"({(1 - total_structured / total_html) * 100:5.1f}% less)")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"mode": "live" if args.live else "offline", "config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,298 @@
+"""
+Local stand-ins for the tool servers' external backends (DuckDuckGo, web pages, OpenWeather, MongoDB),
+so benchmarks run deterministically and without network access.
+
+    stub_search_server(servers.search_server, latency_ms=20)
+    stub_database_server(servers.mongoose_database_server, MemoryMongoClient())
+"""
+import copy
+import random
+import re
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson import ObjectId
+
+WORDS = ("model data research system network energy history market policy language science city "
+         "climate protein signal memory theory design growth health travel music quantum orbit").split()
+
+
+def html_page(title: str, paragraphs: int = 20, seed: int = 0) -> str:
+    """A deterministic article-like HTML page (nav, inline script/style, paragraphs) of roughly paragraphs * 400 bytes."""
+    rng = random.Random(seed)
+    body = "\n".join(
+        f"<p>{' '.join(rng.choice(WORDS) for _ in range(60))}.</p>" for _ in range(paragraphs)
+    )
+    return (
+        f"<html><head><title>{title}</title><style>body{{font-family:sans-serif}} p{{margin:1em}}</style>"
+        f"<script>window.analytics = {{id: {seed}}};</script></head><body>"
+        f"<nav><a href='/'>Home</a> <a href='/about'>About</a></nav><h1>{title}</h1>\n{body}\n"
+        f"<footer>Fixture page {seed}</footer></body></html>"
+    )
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-") or "page"
+
+
+class FakeDDGS:
+    """Drop-in for duckduckgo_search.DDGS: `text()` yields deterministic results pointing at fixture pages."""
+
+    latency_s = 0.0
+
+    def text(self, query: str, max_results: int = 3, region: str = "us-en") -> Iterable[dict]:
+        time.sleep(self.latency_s)
+        slug = _slug(query)
+        for i in range(max_results):
+            yield {
+                "title": f"{query.title()} - result {i + 1}",
+                "href": f"http://fixtures.local/{slug}/{i}",
+                "body": f"Snippet {i + 1} about {query}: " + " ".join(WORDS[(i + j) % len(WORDS)] for j in range(25)),
+            }
+
+
+class FakeResponse:
+    def __init__(self, text: str = "", payload: Optional[dict] = None, status_code: int = 200):
+        self.text = text
+        self.payload = payload
+        self.status_code = status_code
+
+    def json(self):
+        return self.payload
+
+
+class FakeRequests:
+    """Drop-in for the `requests` module: fixture HTML for any page, canned OpenWeather JSON for weather URLs."""
+
+    def __init__(self, latency_ms: float = 0.0, paragraphs: int = 20):
+        self.latency_s = latency_ms / 1000
+        self.paragraphs = paragraphs
+
+    def get(self, url: str, headers=None, timeout=None, **kwargs) -> FakeResponse:
+        time.sleep(self.latency_s)
+        if "openweathermap.org" in url:
+            city = re.search(r"q=([^&]+)", url).group(1)
+            return FakeResponse(payload={
+                "cod": 200, "name": city,
+                "main": {"temp": 21.5, "feels_like": 21.0, "humidity": 60},
+                "weather": [{"description": "scattered clouds"}],
+                "wind": {"speed": 3.4},
+            })
+        return FakeResponse(text=html_page(url.rsplit("/", 2)[-2], self.paragraphs, seed=sum(map(ord, url))))
+
+
+def stub_search_server(module, latency_ms: float = 0.0, paragraphs: int = 20):
+    """Point servers.search_server at the fakes; `latency_ms` simulates each backend round trip."""
+    FakeDDGS.latency_s = latency_ms / 1000
+    module.DDGS = FakeDDGS
+    module.requests = FakeRequests(latency_ms, paragraphs)
+    module.OPENWEATHER_API_KEY = "fixture"
+
+
+# --- MongoDB -------------------------------------------------------------------------------------
+
+_MISSING = object()
+
+
+def _get(doc: dict, path: str):
+    value = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _compare(value, op: str, operand) -> bool:
+    if op == "$eq":
+        return value == operand
+    if op == "$ne":
+        return value != operand
+    if op == "$in":
+        return value in operand
+    if op == "$nin":
+        return value not in operand
+    if op == "$exists":
+        return (value is not _MISSING) == bool(operand)
+    if value is _MISSING or value is None:
+        return False
+    try:
+        if op == "$gt":
+            return value > operand
+        if op == "$gte":
+            return value >= operand
+        if op == "$lt":
+            return value < operand
+        if op == "$lte":
+            return value <= operand
+    except TypeError:
+        return False
+    raise ValueError(f"Unsupported operator {op}")
+
+
+def matches(doc: dict, query: dict) -> bool:
+    for key, condition in (query or {}).items():
+        if key == "$and":
+            if not all(matches(doc, q) for q in condition):
+                return False
+            continue
+        if key == "$or":
+            if not any(matches(doc, q) for q in condition):
+                return False
+            continue
+        value = _get(doc, key)
+        if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+            if not all(_compare(value, op, operand) for op, operand in condition.items()):
+                return False
+        elif value is _MISSING or value != condition:
+            return False
+    return True
+
+
+def project(doc: dict, projection: Optional[dict]) -> dict:
+    if not projection:
+        return copy.deepcopy(doc)
+    include = {k for k, v in projection.items() if v}
+    if include:
+        out = {k: copy.deepcopy(doc[k]) for k in include if k in doc}
+        if projection.get("_id", 1) and "_id" in doc:
+            out["_id"] = doc["_id"]
+        return out
+    return {k: copy.deepcopy(v) for k, v in doc.items() if k not in projection}
+
+
+class MemoryCursor:
+    def __init__(self, docs: List[dict], query: Optional[dict], projection: Optional[dict]):
+        self.docs = docs
+        self.query = query
+        self.projection = projection
+        self._limit = 0
+        self._sort = None
+
+    def sort(self, key: str, direction: int = 1):
+        self._sort = (key, direction)
+        return self
+
+    def limit(self, n: int):
+        self._limit = n
+        return self
+
+    def batch_size(self, n: int):
+        return self
+
+    def __iter__(self):
+        returned = 0
+        docs = self.docs
+        if self._sort:
+            key, direction = self._sort
+            docs = sorted(docs, key=lambda d: str(_get(d, key)), reverse=direction < 0)
+        for doc in docs:
+            if matches(doc, self.query):
+                yield project(doc, self.projection)
+                returned += 1
+                if self._limit and returned >= self._limit:
+                    return
+
+
+class MemoryCollection:
+    """The subset of pymongo's Collection API the database server uses."""
+
+    def __init__(self):
+        self.docs: List[dict] = []
+
+    def insert_many(self, records: List[dict]):
+        ids = []
+        for record in records:
+            record.setdefault("_id", ObjectId())
+            self.docs.append(copy.deepcopy(record))
+            ids.append(record["_id"])
+        return SimpleNamespace(inserted_ids=ids)
+
+    def insert_one(self, record: dict):
+        return SimpleNamespace(inserted_id=self.insert_many([record]).inserted_ids[0])
+
+    def find(self, query: Optional[dict] = None, projection: Optional[dict] = None) -> MemoryCursor:
+        return MemoryCursor(self.docs, query, projection)
+
+    def find_one(self, query: Optional[dict] = None, projection: Optional[dict] = None):
+        return next(iter(self.find(query, projection).limit(1)), None)
+
+    def count_documents(self, query: dict) -> int:
+        return sum(1 for doc in self.docs if matches(doc, query))
+
+    def _update(self, query: dict, update: dict, many: bool):
+        matched = modified = 0
+        for doc in self.docs:
+            if not matches(doc, query):
+                continue
+            matched += 1
+            changes = update.get("$set", {})
+            if any(doc.get(k, _MISSING) != v for k, v in changes.items()):
+                doc.update(copy.deepcopy(changes))
+                modified += 1
+            if not many:
+                break
+        return SimpleNamespace(matched_count=matched, modified_count=modified)
+
+    def update_many(self, query: dict, update: dict):
+        return self._update(query, update, many=True)
+
+    def update_one(self, query: dict, update: dict):
+        return self._update(query, update, many=False)
+
+
+class MemoryDatabase:
+    def __init__(self):
+        self.collections: Dict[str, MemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        return self.collections.setdefault(name, MemoryCollection())
+
+    def list_collection_names(self) -> List[str]:
+        return [name for name, c in self.collections.items() if c.docs]
+
+    def command(self, name: str, *args, **kwargs):
+        return {"ok": 1.0}
+
+
+class MemoryMongoClient:
+    """In-memory stand-in for pymongo.MongoClient, enough for the database MCP server's tools."""
+
+    def __init__(self):
+        self.databases: Dict[str, MemoryDatabase] = {}
+        self.admin = MemoryDatabase()
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        return self.databases.setdefault(name, MemoryDatabase())
+
+    def get_database(self, name: str) -> MemoryDatabase:
+        return self[name]
+
+    def list_database_names(self) -> List[str]:
+        return [name for name, db in self.databases.items() if db.list_collection_names()]
+
+
+def stub_database_server(module, client: Any):
+    """Point servers.mongoose_database_server at `client` (a MemoryMongoClient or a real local MongoClient)."""
+    module.client = client
+    module.db = client.get_database("mcp_db")
+
+
+def patients(n: int, seed: int = 0) -> List[dict]:
+    """Generated records shaped like the demo datasets (numeric measurements + a few categorical fields)."""
+    rng = random.Random(seed)
+    return [
+        {
+            "patient_id": i,
+            "age": rng.randint(18, 90),
+            "pregnancies": rng.randint(0, 10),
+            "glucose": round(rng.gauss(120, 30), 1),
+            "bmi": round(rng.gauss(28, 6), 1),
+            "blood_pressure": rng.randint(50, 120),
+            "outcome": rng.random() < 0.35,
+            "city": rng.choice(["Cuttack", "Paris", "Lagos", "Lima", "Osaka"]),
+            "status": rng.choice(["active", "pending", "closed"]),
+        }
+        for i in range(n)
+    ]
@@ -0,0 +1,241 @@
+"""
+Per-tool micro-benchmarks for the three MCP servers, called through the in-memory `Client(app)`
+transport (the same one their run_tests() use), so only the tools' own cost is measured.
+
+Backends are local: search tools use benchmarks.stubs (fake DuckDuckGo, fixture HTML pages, canned
+OpenWeather); database tools run against generated collections of each --sizes in an in-memory
+MongoDB stand-in, or a local mongod with --mongo-url; script tools work on a temporary copy of the
+workspace, including a script that reads an exported dataset.
+
+Results go to benchmarks/results/tool_bench-<commit>.json; --compare prints the p50 change
+against an earlier results file.
+
+    python -m benchmarks.tool_bench --sizes 1000,100000
+    python -m benchmarks.tool_bench --sizes 1000,100000,1000000 --mongo-url mongodb://localhost:27017/
+    python -m benchmarks.tool_bench --compare benchmarks/results/tool_bench-abc1234.json
+"""
+import atexit
+import glob
+import os
+import shutil
+import tempfile
+
+# Must be set before the servers are imported: scripts and exports go to a throwaway workspace
+SOURCE_WORKSPACE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "servers", "workspace")
+BENCH_WORKSPACE = tempfile.mkdtemp(prefix="kowalski-bench-")
+# Removed however the run ends (an error, Ctrl+C, or just importing this module)
+atexit.register(shutil.rmtree, BENCH_WORKSPACE, ignore_errors=True)
+os.environ["WORKSPACE_DIR"] = BENCH_WORKSPACE
+for path in glob.glob(os.path.join(SOURCE_WORKSPACE, "*.py")):
+    shutil.copy(path, BENCH_WORKSPACE)
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from fastmcp import Client
+from loguru import logger
+
+from benchmarks.stubs import MemoryMongoClient, patients, stub_database_server, stub_search_server
+from servers import mongoose_database_server, script_server, search_server
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+BENCH_DB = "kowalski_bench"
+
+DATASET_SCRIPT = '''
+from dataset_loader import load_column
+import numpy as np
+
+glucose = load_column("patients_bench", "glucose")
+print(f"rows={len(glucose)} mean_glucose={np.nanmean(glucose):.2f}")
+'''
+
+
+def label(size: int) -> str:
+    return f"{size // 1_000_000}m" if size >= 1_000_000 else f"{size // 1000}k" if size >= 1000 else str(size)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(RESULTS_DIR), check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def load_datasets(client, sizes):
+    for size in sizes:
+        collection = client[BENCH_DB][f"patients_{label(size)}"]
+        if hasattr(collection, "drop"):
+            collection.drop()
+        started = time.perf_counter()
+        for offset in range(0, size, 50_000):
+            collection.insert_many(patients(min(50_000, size - offset), seed=offset))
+        logger.warning(f"Loaded {size} records into {BENCH_DB}.patients_{label(size)} in {time.perf_counter() - started:.1f}s")
+
+
+def search_cases():
+    return [
+        ("search", "get_links", "3 results", {"query": "quantum computing", "max_results": 3}),
+        ("search", "search", "3 results x 1000 chars", {"query": "quantum computing", "max_results": 3, "character_lookup": 1000}),
+        ("search", "get_page_content", "~8 KB page", {"link": "http://fixtures.local/quantum-computing/0"}),
+        ("search", "get_weather", "", {"city": "Paris"}),
+    ]
+
+
+def database_cases(sizes):
+    cases = [
+        ("database", "get_databases", "", {}),
+        ("database", "get_collections", "", {"database": BENCH_DB}),
+    ]
+    for size in sizes:
+        collection = f"patients_{label(size)}"
+        base = {"database": BENCH_DB, "collection": collection}
+        cases += [
+            ("database", "get_fields_for_collection", label(size), base),
+            ("database", "read_records", f"{label(size)} limit 100",
+             {**base, "query_filter": {"age": {"$gt": 60}}, "projection": ["age", "glucose", "bmi"], "limit": 100}),
+            ("database", "add_record", f"{label(size)} 10 docs",
+             {**base, "records": [{"patient_id": -i, "age": 40, "glucose": 100.0} for i in range(10)]}),
+            ("database", "update_record", f"{label(size)} many",
+             {**base, "filter_field": "status", "filter_value": "pending", "update_field": "flag",
+              "update_value": True, "update_multiple_records": True}),
+            ("database", "describe_collection", f"{label(size)} full scan",
+             {**base, "fields": ["age", "glucose", "bmi", "blood_pressure"]}),
+            ("database", "export_dataset", f"{label(size)} 4 columns",
+             {**base, "name": "patients_bench", "projection": ["age", "glucose", "bmi", "outcome"]}),
+        ]
+    return cases
+
+
+def script_cases():
+    edit = {"filename": "bench_edit.py", "edits": [{"search": "value = 1", "replace": "value = 1"}]}
+    return [
+        ("scripts", "list_scripts", "catalog", {"limit": 50}),
+        ("scripts", "list_scripts", "query", {"query": "dataset", "limit": 10}),
+        ("scripts", "write_script", "60 lines", {"filename": "bench_edit.py",
+                                                  "code": "value = 1\n" + "\n".join(f"x{i} = {i}" for i in range(60))}),
+        ("scripts", "read_script", "dataset_loader.py", {"filename": "dataset_loader.py"}),
+        ("scripts", "edit_script", "search/replace", edit),
+        ("scripts", "run_script", "current_time.py", {"filename": "current_time.py"}),
+        ("scripts", "run_script", "sha256_hasher.py", {"filename": "sha256_hasher.py"}),
+        ("scripts", "run_script", "dataset stats (last export)", {"filename": "bench_dataset_stats.py"}),
+    ]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+async def time_case(client: Client, tool: str, arguments: dict, min_runs: int, max_runs: int, budget_s: float) -> dict:
+    result = await client.call_tool_mcp(tool, arguments)
+    text = "".join(getattr(c, "text", "") for c in result.content)
+    error = text if result.isError or '"status":"error"' in text or text.startswith('{"error"') else None
+    times = []
+    started = time.perf_counter()
+    while len(times) < max_runs and (len(times) < min_runs or time.perf_counter() - started < budget_s):
+        call_started = time.perf_counter()
+        await client.call_tool_mcp(tool, arguments)
+        times.append(time.perf_counter() - call_started)
+    return {
+        "runs": len(times),
+        "mean_ms": round(statistics.mean(times) * 1000, 3),
+        "p50_ms": round(percentile(times, 0.5) * 1000, 3),
+        "p95_ms": round(percentile(times, 0.95) * 1000, 3),
+        "min_ms": round(min(times) * 1000, 3),
+        "ops_per_s": round(len(times) / sum(times), 2),
+        "response_bytes": len(text.encode("utf-8")),
+        "error": error[:300] if error else None,
+    }
+
+
+def compare(results: list, baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = {(r["server"], r["tool"], r["case"]): r for r in json.load(f)["results"]}
+    print(f"\np50 vs {baseline_path}")
+    for r in results:
+        old = baseline.get((r["server"], r["tool"], r["case"]))
+        if old and old["p50_ms"]:
+            change = (r["p50_ms"] - old["p50_ms"]) / old["p50_ms"] * 100
+            print(f"  {r['server']:9} {r['tool']:26} {r['case']:28} {old['p50_ms']:10.3f} -> {r['p50_ms']:10.3f} ms ({change:+.1f}%)")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,100000", help="collection sizes, e.g. 1000,100000,1000000")
+    parser.add_argument("--mongo-url", help="use this local mongod instead of the in-memory stand-in")
+    parser.add_argument("--servers", default="search,database,scripts")
+    parser.add_argument("--backend-ms", type=float, default=0.0, help="simulated search/weather backend latency")
+    parser.add_argument("--min-runs", type=int, default=5)
+    parser.add_argument("--max-runs", type=int, default=200)
+    parser.add_argument("--budget-s", type=float, default=2.0, help="time spent per case after min-runs")
+    parser.add_argument("--out", help="results file (default benchmarks/results/tool_bench-<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare p50 against")
+    args = parser.parse_args()
+
+    # The servers log every call; keep the output (and the timings) to the results
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    servers = set(args.servers.split(","))
+    stub_search_server(search_server, latency_ms=args.backend_ms)
+    if args.mongo_url:
+        from pymongo import MongoClient
+        mongo = MongoClient(args.mongo_url)
+        atexit.register(mongo.drop_database, BENCH_DB)
+    else:
+        mongo = MemoryMongoClient()
+    stub_database_server(mongoose_database_server, mongo)
+    if "database" in servers:
+        load_datasets(mongo, sizes)
+    with open(os.path.join(BENCH_WORKSPACE, "bench_dataset_stats.py"), "w") as f:
+        f.write(DATASET_SCRIPT)
+    script_server.catalog.refresh()
+
+    apps = {"search": search_server.app, "database": mongoose_database_server.app, "scripts": script_server.app}
+    cases = [c for c in search_cases() + database_cases(sizes) + script_cases() if c[0] in servers]
+    if "database" not in servers:
+        cases = [c for c in cases if c[3].get("filename") != "bench_dataset_stats.py"]
+
+    results = []
+    for server, tool, case, arguments in cases:
+        async with Client(apps[server]) as client:
+            result = {"server": server, "tool": tool, "case": case,
+                      **await time_case(client, tool, arguments, args.min_runs, args.max_runs, args.budget_s)}
+        results.append(result)
+        status = f"ERROR {result['error'][:80]}" if result["error"] else ""
+        print(f"{server:9} {tool:26} {case:28} p50 {result['p50_ms']:10.3f} ms  p95 {result['p95_ms']:10.3f} ms  "
+              f"{result['response_bytes']:>9} B  {status}")
+
+    commit = git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sizes": sizes,
+            "mongo": "local mongod" if args.mongo_url else "in-memory stand-in",
+            "backend_ms": args.backend_ms,
+        },
+        "results": results,
+    }
+    out = args.out or os.path.join(RESULTS_DIR, f"tool_bench-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {out}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+"""
+Context tokens of oversized tool results with and without the tool-output governor
+(utils/tool_governor.py).
+
+For representative large outputs (an unbounded read_records, a long get_page_content, a chatty
+run_script), reports the tokens the raw result adds to the context, the governed size, the time
+spent condensing, and whether the fact the question needs survived (else it is one
+read_tool_output call away). "context" multiplies by --later-steps: every LLM step after a tool
+call resends its result.
+
+    python -m benchmarks.tool_output
+    python -m benchmarks.tool_output --records 5000 --later-steps 4
+"""
+import argparse
+import json
+import statistics
+import time
+
+from utils.context_window import estimate_tokens
+from utils.tool_governor import ToolGovernor, ToolOutputStore
+
+FILLER = ("The committee reviewed the quarterly figures and noted that most indicators were in line with "
+          "the previous period. ")
+
+
+def cases(args) -> list:
+    records = [{"_id": f"{i:024x}", "patient_id": i, "age": 21 + i * 7 % 60, "glucose": 80 + i * 13 % 120,
+                "bmi": round(19 + i * 0.37 % 20, 1), "outcome": i % 3 == 0} for i in range(args.records)]
+    page = (FILLER * 400 + "Gemini 2.5 Flash supports a context window of one million tokens. "
+            + FILLER * 400)
+    stdout = "\n".join(f"epoch {i}: loss={1 / (i + 1):.5f}" for i in range(3000)) + "\nfinal accuracy: 0.9412"
+    return [
+        ("read_records", "Show the first patients in the clinic data", {"collection": "patients"},
+         {"status": "success", "database": "clinic", "collection": "patients", "query_filter": {},
+          "records": records, "count": len(records)}, '"patient_id": 0'),
+        ("get_page_content", "How large is the Gemini 2.5 Flash context window?", {"link": "https://example.org/specs"},
+         {"url": "https://example.org/specs", "data": page}, "one million tokens"),
+        ("run_script", "Train the model and tell me the final accuracy", {"filename": "train.py"},
+         {"stdout": stdout, "stderr": "", "exit_code": 0}, "final accuracy: 0.9412"),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=2000, help="documents returned by read_records")
+    parser.add_argument("--later-steps", type=int, default=2, help="LLM steps that resend a result after it arrives")
+    parser.add_argument("--runs", type=int, default=20, help="timing runs per case")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    governor = ToolGovernor(store=ToolOutputStore(), enabled=True)
+    results = []
+    for tool, question, arguments, output, needle in cases(args):
+        raw = json.dumps(output, ensure_ascii=False)
+        times = []
+        for _ in range(args.runs):
+            with governor.turn(query=question):
+                started = time.perf_counter()
+                governed = governor.govern(tool, arguments, raw)
+                times.append(time.perf_counter() - started)
+        raw_tokens, governed_tokens = estimate_tokens(raw), estimate_tokens(governed)
+        results.append({
+            "tool": tool,
+            "raw_tokens": raw_tokens,
+            "governed_tokens": governed_tokens,
+            "raw_context": raw_tokens * (1 + args.later_steps),
+            "governed_context": governed_tokens * (1 + args.later_steps),
+            "saved_pct": round((1 - governed_tokens / raw_tokens) * 100, 1),
+            "condense_ms": round(statistics.median(times) * 1000, 2),
+            "answer_kept": needle in governed,
+        })
+
+    for r in results:
+        print(f"{r['tool']:17} {r['raw_tokens']:7} -> {r['governed_tokens']:5} tokens ({r['saved_pct']:5.1f}% less)  "
+              f"context {r['raw_context']:7} -> {r['governed_context']:6}  condense {r['condense_ms']:7.2f} ms  "
+              f"answer kept: {'yes' if r['answer_kept'] else 'no (read_tool_output)'}")
+    print(governor.stats())
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
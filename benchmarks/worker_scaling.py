@@ -0,0 +1,136 @@
+"""
+/chat throughput vs number of API worker processes.
+
+For each --workers count, benchmarks.chat_load_app (the real api.py app with the chat_load
+stand-ins for Gemini, the tool backends, sessions and conversations) is served by
+`uvicorn --workers N` and driven over real HTTP with single-turn /chat requests at a fixed
+client concurrency. The server is stopped with SIGTERM, so the graceful drain runs too.
+
+    python -m benchmarks.worker_scaling --workers 1,2,4 --concurrency 64 --requests 400
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from collections import Counter
+
+import httpx
+
+from benchmarks.chat_load import PROMPTS, SCENARIOS
+from benchmarks.mcp_call_overhead import free_port, percentile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def start_server(workers: int, port: int, args) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "BENCH_LLM_MS": str(args.llm_ms),
+        "BENCH_BACKEND_MS": str(args.backend_ms),
+        "API_WORKERS": str(workers),
+        "PYTHONPATH": ROOT,
+    }
+    if args.max_concurrency:
+        env["CHAT_MAX_CONCURRENCY"] = str(args.max_concurrency)
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.chat_load_app:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--timeout-graceful-shutdown", "30"],
+        cwd=ROOT, env=env
+    )
+
+
+async def wait_until_up(client: httpx.AsyncClient, timeout: float = 60.0):
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            if (await client.get("/metrics")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        if time.perf_counter() > deadline:
+            raise TimeoutError("API workers did not come up")
+        await asyncio.sleep(0.3)
+
+
+async def drive(client: httpx.AsyncClient, requests: int, concurrency: int) -> dict:
+    names = list(SCENARIOS)
+    latencies = []
+    statuses = Counter()
+    workers = Counter()
+    counter = iter(range(requests))
+
+    async def user(index: int):
+        for n in counter:
+            scenario = names[n % len(names)]
+            started = time.perf_counter()
+            response = await client.post("/chat", json={"message": f"{PROMPTS[scenario]} (request {n})"},
+                                         headers={"Authorization": f"user{index}"})
+            statuses[response.status_code] += 1
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    # /metrics is answered by whichever worker accepts the connection; sample a few to count them
+    for _ in range(32):
+        workers[(await client.get("/metrics")).json()["worker"]] += 1
+    return {
+        "statuses": dict(statuses),
+        "wall_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 1) if latencies else 0.0,
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1) if latencies else 0.0,
+        "workers_seen": len(workers),
+    }
+
+
+async def measure(workers: int, args) -> dict:
+    port = free_port()
+    server = start_server(workers, port, args)
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=0)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None, limits=limits) as client:
+            await wait_until_up(client)
+            # Let every worker load its tools before timing
+            await drive(client, workers * 8, min(args.concurrency, workers * 8))
+            result = await drive(client, args.requests, args.concurrency)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            server.kill()
+    return {"workers": workers, **result}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="worker counts to compare")
+    parser.add_argument("--requests", type=int, default=400, help="timed /chat requests per worker count")
+    parser.add_argument("--concurrency", type=int, default=64, help="concurrent client connections")
+    parser.add_argument("--llm-ms", type=float, default=200.0, help="simulated model latency per agent step")
+    parser.add_argument("--backend-ms", type=float, default=20.0, help="simulated search/weather backend latency")
+    parser.add_argument("--max-concurrency", type=int, help="override CHAT_MAX_CONCURRENCY (per worker)")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for workers in (int(w) for w in args.workers.split(",") if w):
+        result = await measure(workers, args)
+        results.append(result)
+        speedup = result["throughput_rps"] / results[0]["throughput_rps"] if results[0]["throughput_rps"] else 0.0
+        print(f"workers {workers:2}  {result['throughput_rps']:8.2f} req/s (x{speedup:.2f})  "
+              f"p50 {result['p50_ms']:8.1f} ms  p95 {result['p95_ms']:8.1f} ms  statuses {result['statuses']}  "
+              f"workers seen {result['workers_seen']}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
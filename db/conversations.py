@@ -0,0 +1,130 @@
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import List, Optional
+from uuid import uuid4
+import os
+
+from pymongo import ReturnDocument
+
+CONVERSATION_CACHE_SIZE = int(os.getenv("CONVERSATION_CACHE_SIZE", "1000"))
+
+
+class ConversationStore:
+    """
+    Server-side chat history, one Mongo document per conversation:
+        {conversation_id, username, messages: [{role, content}], length, created_at, updated_at}
+    Hot conversations are kept in a per-process LRU cache. A cached history is only used after a
+    cheap `length`/`summarized_upto` check against Mongo, so turns appended or summaries saved by
+    another worker are never missed.
+    """
+
+    def __init__(self, collection, cache_size: int = CONVERSATION_CACHE_SIZE):
+        self.collection = collection
+        self.cache_size = cache_size
+        self.cache: "OrderedDict[str, dict]" = OrderedDict()
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("conversation_id", unique=True)
+        await self.collection.create_index([("username", 1), ("updated_at", -1)])
+
+    def _cache_put(self, conversation: dict):
+        self.cache[conversation["conversation_id"]] = conversation
+        self.cache.move_to_end(conversation["conversation_id"])
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    async def create(self, username: str) -> str:
+        now = datetime.now(timezone.utc)
+        conversation = {
+            "conversation_id": str(uuid4()),
+            "username": username,
+            "messages": [],
+            "length": 0,
+            "created_at": now,
+            "updated_at": now
+        }
+        await self.collection.insert_one(dict(conversation))
+        self._cache_put({k: conversation[k] for k in ("conversation_id", "username", "messages", "length")})
+        return conversation["conversation_id"]
+
+    async def get(self, conversation_id: str, username: str) -> Optional[dict]:
+        """
+        Conversation owned by `username` as {messages, summary, summarized_upto},
+        or None if there is no such conversation.
+        """
+        cached = self.cache.get(conversation_id)
+        if cached and cached["username"] == username:
+            current = await self.collection.find_one(
+                {"conversation_id": conversation_id}, {"_id": 0, "length": 1, "summarized_upto": 1}
+            )
+            if (current and current["length"] == cached["length"]
+                    and current.get("summarized_upto", 0) == cached.get("summarized_upto", 0)):
+                self.cache.move_to_end(conversation_id)
+                return self._view(cached)
+            self.cache.pop(conversation_id, None)
+
+        conversation = await self.collection.find_one(
+            {"conversation_id": conversation_id, "username": username},
+            {"_id": 0, "conversation_id": 1, "username": 1, "messages": 1, "length": 1,
+             "summary": 1, "summarized_upto": 1}
+        )
+        if not conversation:
+            return None
+        self._cache_put(conversation)
+        return self._view(conversation)
+
+    @staticmethod
+    def _view(conversation: dict) -> dict:
+        return {
+            "messages": list(conversation["messages"]),
+            "summary": conversation.get("summary"),
+            "summarized_upto": conversation.get("summarized_upto", 0)
+        }
+
+    async def get_messages(self, conversation_id: str, username: str) -> Optional[List[dict]]:
+        conversation = await self.get(conversation_id, username)
+        return conversation["messages"] if conversation else None
+
+    async def save_summary(self, conversation_id: str, summary: str, summarized_upto: int):
+        """Rolling summary of messages[:summarized_upto], maintained by utils.context_window."""
+        await self.collection.update_one(
+            {"conversation_id": conversation_id},
+            {"$set": {"summary": summary, "summarized_upto": summarized_upto}}
+        )
+        cached = self.cache.get(conversation_id)
+        if cached is not None:
+            cached["summary"] = summary
+            cached["summarized_upto"] = summarized_upto
+
+    async def append(self, conversation_id: str, messages: List[dict]):
+        result = await self.collection.find_one_and_update(
+            {"conversation_id": conversation_id},
+            {
+                "$push": {"messages": {"$each": messages}},
+                "$inc": {"length": len(messages)},
+                "$set": {"updated_at": datetime.now(timezone.utc)}
+            },
+            projection={"_id": 0, "length": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        cached = self.cache.get(conversation_id)
+        if cached is None:
+            return
+        if result and result["length"] == cached["length"] + len(messages):
+            cached["messages"].extend(messages)
+            cached["length"] = result["length"]
+        else:
+            # Someone else appended in between; reload on next read
+            self.cache.pop(conversation_id, None)
+
+    async def list(self, username: str, limit: int = 50) -> List[dict]:
+        cursor = self.collection.find(
+            {"username": username},
+            {"_id": 0, "conversation_id": 1, "length": 1, "created_at": 1, "updated_at": 1}
+        ).sort("updated_at", -1).limit(limit)
+        return [c async for c in cursor]
+
+    async def delete(self, conversation_id: str, username: str) -> int:
+        self.cache.pop(conversation_id, None)
+        result = await self.collection.delete_one({"conversation_id": conversation_id, "username": username})
+        return result.deleted_count
@@ -1,52 +1,61 @@
 
 from db.database import AsyncMongoClient
+from db.sessions import SessionStore
+from db.conversations import ConversationStore
+from db.usage import UsageStore
 from models.api_models import UserSchema, ResponseSchema, Status
 from utils.pass_hasher import PasswordUtils
-from loguru import logger
-from uuid import uuid4
-import asyncio
+from utils.response_cache import response_cache
+from utils.prompt_cache import prompt_cache
+from pymongo.errors import DuplicateKeyError
 
 client = AsyncMongoClient("auth-demo")
+sessions = SessionStore(client.db.sessions, client.db.session_revocations)
+conversations = ConversationStore(client.db.conversations)
+usage = UsageStore(client.db.usage_requests, client.db.usage_daily)
+# Shared between API workers
+response_cache.share(client.db.response_cache)
+prompt_cache.share(client.db.prompt_caches)
 
 class UserManager:
     @staticmethod
     async def create_user(user:UserSchema):
-        if (await client.db.users.find_one({"username":user.username})):
+        # The unique index on users.username makes the insert itself the existence check
+        user.password = await PasswordUtils.hash_password_async(user.password)
+        document = user.model_dump()
+        try:
+            await client.db.users.insert_one(document)
+        except DuplicateKeyError:
             return ResponseSchema(status=Status.ERROR, content="username already exists")
-        user.password = PasswordUtils.hash_password(user.password)
-        result = await client.db.users.insert_one(user.model_dump())
-        created = await client.db.users.find_one({"_id":result.inserted_id})
-        if created:
-            return ResponseSchema(status=Status.SUCCESS, content=client.serialize_doc(created))
-        else:
-            return ResponseSchema(status=Status.ERROR, content="Some error occurred creating user")
+        return ResponseSchema(status=Status.SUCCESS, content=client.serialize_doc(document))
     @staticmethod
-    async def login(user:UserSchema, sessions:dict):
+    async def login(user:UserSchema):
         user_instance = await client.db.users.find_one({"username":user.username})
         if not user_instance:
             return ResponseSchema(status=Status.ERROR, content="Username doesn't exist")
         else:
-            if PasswordUtils.verify_password(password=user.password, hashed=user_instance["password"]):
-                session_id = str(uuid4())
-                sessions[session_id]={"username": user.username}
-                client.db.sessions.insert_one({
-                    "username":user.username,
-                    "session_id":session_id
-                })
-                return ResponseSchema(status=Status.SUCCESS, content={"user":client.serialize_doc(user_instance), "session_id":session_id})
+            if await PasswordUtils.verify_password_async(password=user.password, hashed=user_instance["password"]):
+                session = await sessions.create(user.username)
+                return ResponseSchema(status=Status.SUCCESS, content={"user":client.serialize_doc(user_instance), "session_id":session["session_id"]})
             else:
                 return ResponseSchema(status=Status.ERROR, content="Password doesn't match")
     
     @staticmethod
-    async def logout(session_id, sessions):
-        username = sessions[session_id]["username"]
-        result = await client.db.sessions.delete_many({"username":username})
-        return ResponseSchema(status=Status.SUCCESS, content={"Logged-Out of all devices"})
+    async def logout(session_id):
+        session = await sessions.get(session_id)
+        if not session:
+            return ResponseSchema(status=Status.ERROR, content="Invalid or expired session")
+        await sessions.delete_user(session["username"])
+        return ResponseSchema(status=Status.SUCCESS, content="Logged-Out of all devices")
     
     @staticmethod
-    async def getSessions():
-        cursor = client.db.sessions.find({})
-        data = {}
-        async for session in cursor:
-            data[session["session_id"]] = session["username"]
-        return data
+    async def get_session(session_id):
+        return await sessions.get(session_id)
+
+    @staticmethod
+    async def ensure_indexes():
+        await client.db.users.create_index("username", unique=True)
+        await sessions.ensure_indexes()
+        await conversations.ensure_indexes()
+        await response_cache.ensure_indexes()
+        await usage.ensure_indexes()
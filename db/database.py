@@ -1,13 +1,171 @@
-from motor.motor_asyncio import AsyncIOMotorClient
-
-
 import os
+import threading
+import warnings
+
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+from pymongo.compression_support import validate_compressors
+from pymongo.monitoring import ConnectionPoolListener
 from dotenv import load_dotenv
+from loguru import logger
 
 load_dotenv()
 
-MONGO_URL = os.getenv('MONGO_URL', 'mongodb://localhost:27017/')
+MONGO_URL = os.getenv('MONGO_URL') or os.getenv('MONGO_URI') or 'mongodb://localhost:27017/'
+# The MCP database server has always read MONGO_URI first; it keeps that precedence
+MONGO_SERVER_URL = os.getenv('MONGO_URI') or MONGO_URL
+
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "5"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "10000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+# Preference order; compressors whose module isn't installed are skipped (zlib is always available)
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "zstd,snappy,zlib")
+
+
+class PoolMetrics(ConnectionPoolListener):
+    """Connection pool counters, including how long operations waited to check out a connection."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.checked_out = 0
+        self.wait_total_s = 0.0
+        self.wait_max_s = 0.0
+        self.connections_created = 0
+        self.connections_closed = 0
+        self.pool_clears = 0
+
+    def _waited(self, duration):
+        duration = duration or 0.0
+        self.wait_total_s += duration
+        self.wait_max_s = max(self.wait_max_s, duration)
+
+    def connection_checked_out(self, event):
+        with self.lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self._waited(getattr(event, "duration", None))
+
+    def connection_check_out_failed(self, event):
+        with self.lock:
+            self.checkout_failures += 1
+            self._waited(getattr(event, "duration", None))
+
+    def connection_checked_in(self, event):
+        with self.lock:
+            self.checked_out -= 1
+
+    def connection_created(self, event):
+        with self.lock:
+            self.connections_created += 1
+
+    def connection_closed(self, event):
+        with self.lock:
+            self.connections_closed += 1
+
+    def pool_cleared(self, event):
+        with self.lock:
+            self.pool_clears += 1
+
+    # Events we don't track, but the listener interface requires them
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            attempts = self.checkouts + self.checkout_failures
+            return {
+                "max_pool_size": MONGO_MAX_POOL_SIZE,
+                "min_pool_size": MONGO_MIN_POOL_SIZE,
+                "open_connections": self.connections_created - self.connections_closed,
+                "checked_out": self.checked_out,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "checkout_wait_avg_ms": round(self.wait_total_s / attempts * 1000, 3) if attempts else 0.0,
+                "checkout_wait_max_ms": round(self.wait_max_s * 1000, 3),
+                "pool_clears": self.pool_clears,
+            }
+
+
+pool_metrics = PoolMetrics()
+_motor_client = None
+_sync_client = None
+_client_lock = threading.Lock()
+
+
+def available_compressors() -> list:
+    # pymongo drops compressors it has no module for; its per-compressor warnings are replaced by one line
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        available = validate_compressors(None, MONGO_COMPRESSORS)
+    skipped = [c for c in MONGO_COMPRESSORS.split(",") if c.strip() and c.strip() not in available]
+    if skipped:
+        logger.warning(f"Mongo wire compressors {skipped} unavailable (pip install \"pymongo[snappy,zstd]\"), using {available}")
+    return available
+
+
+def client_options() -> dict:
+    return {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "compressors": available_compressors(),
+        "event_listeners": [pool_metrics],
+    }
+
+
+def get_motor_client() -> AsyncIOMotorClient:
+    """Process-wide motor client; every AsyncMongoClient shares its connection pool."""
+    global _motor_client
+    with _client_lock:
+        if _motor_client is None:
+            _motor_client = AsyncIOMotorClient(MONGO_URL, **client_options())
+        return _motor_client
+
+
+def get_sync_client(url: str = None) -> MongoClient:
+    """
+    Process-wide pymongo client for synchronous callers such as the MCP database server.
+    `url` (default MONGO_URL) only matters for the first call, which creates the client.
+    """
+    global _sync_client
+    with _client_lock:
+        if _sync_client is None:
+            _sync_client = MongoClient(url or MONGO_URL, **client_options())
+        return _sync_client
+
+
+async def warm_up():
+    # Forces server selection + the first connection so the first request doesn't pay for it;
+    # the pool then fills up to minPoolSize in the background
+    await get_motor_client().admin.command("ping")
+
+
+def get_pool_metrics() -> dict:
+    return pool_metrics.snapshot()
+
 
 class AsyncMongoClient:
 
@@ -19,5 +177,4 @@ class AsyncMongoClient:
         return doc
 
     def __init__(self, db_name:str):
-        client = AsyncIOMotorClient(MONGO_URL)
-        self.db = client[db_name]
+        self.db = get_motor_client()[db_name]
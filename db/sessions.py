@@ -0,0 +1,212 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from uuid import uuid4
+import asyncio
+import os
+import time
+
+from loguru import logger
+
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(7 * 24 * 3600)))
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "10000"))
+# How long a worker may trust a cached session before re-checking Mongo; 0 disables the cache
+SESSION_CACHE_TTL_SECONDS = float(os.getenv("SESSION_CACHE_TTL_SECONDS", "60"))
+# Logouts are published as revocations; each worker polls for new ones at most this often (one
+# query per worker, not per request), so a logout through another worker takes effect within it
+SESSION_REVOCATION_POLL_SECONDS = float(os.getenv("SESSION_REVOCATION_POLL_SECONDS", "1"))
+# Revocations are read with this much overlap, so one written with a lagging clock isn't missed
+REVOCATION_CLOCK_SKEW_SECONDS = 10
+
+
+class SessionStore:
+    """
+    Mongo-backed session store shared by every API worker.
+    - unique index on `session_id`, TTL index on `expires_at` (Mongo purges expired sessions)
+    - per-process LRU cache in front of it (SESSION_CACHE_TTL_SECONDS), so validating a session
+      is usually an O(1) dict hit
+    - logouts are written to `revocations`, which every worker polls (SESSION_REVOCATION_POLL_SECONDS)
+      to evict the sessions another worker ended; expiry is checked locally from `expires_at`
+    Nothing is loaded at startup; sessions are fetched on first use.
+    """
+
+    def __init__(self, collection, revocations=None, ttl_seconds: int = SESSION_TTL_SECONDS,
+                 cache_size: int = SESSION_CACHE_SIZE, cache_ttl: float = SESSION_CACHE_TTL_SECONDS,
+                 poll_interval: float = SESSION_REVOCATION_POLL_SECONDS):
+        self.collection = collection
+        self.revocations = revocations
+        self.ttl_seconds = ttl_seconds
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.poll_interval = poll_interval
+        self.cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self.cache_hits = 0
+        self.polled_at = 0.0
+        self.revoked_since = datetime.now(timezone.utc)
+        self.poll_lock = asyncio.Lock()
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("session_id", unique=True)
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+        await self.collection.create_index("username")
+        if self.revocations is not None:
+            await self.revocations.create_index("at", expireAfterSeconds=24 * 3600)
+
+    async def _poll_revocations(self):
+        """Evict cached sessions that were logged out through another worker."""
+        if self.revocations is None or time.monotonic() - self.polled_at < self.poll_interval:
+            return
+        async with self.poll_lock:
+            if time.monotonic() - self.polled_at < self.poll_interval:
+                return
+            since = self.revoked_since - timedelta(seconds=REVOCATION_CLOCK_SKEW_SECONDS)
+            latest = self.revoked_since
+            async for revocation in self.revocations.find({"at": {"$gt": since}}):
+                self._evict(revocation.get("session_id"), revocation.get("username"))
+                at = revocation["at"] if revocation["at"].tzinfo else revocation["at"].replace(tzinfo=timezone.utc)
+                latest = max(latest, at)
+            self.revoked_since = latest
+            self.polled_at = time.monotonic()
+
+    def _evict(self, session_id: Optional[str] = None, username: Optional[str] = None):
+        if session_id:
+            self.cache.pop(session_id, None)
+        if username:
+            for sid in [sid for sid, (s, _) in self.cache.items() if s["username"] == username]:
+                self.cache.pop(sid, None)
+
+    async def _revoke(self, **target):
+        if self.revocations is not None:
+            await self.revocations.insert_one({**target, "at": datetime.now(timezone.utc)})
+
+    def _cache_put(self, session: dict):
+        if self.cache_ttl <= 0:
+            return
+        self.cache[session["session_id"]] = (session, time.monotonic() + self.cache_ttl)
+        self.cache.move_to_end(session["session_id"])
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    @staticmethod
+    def _expires_ts(session: dict) -> float:
+        expires_at = session["expires_at"]
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        return expires_at.timestamp()
+
+    async def create(self, username: str) -> dict:
+        now = datetime.now(timezone.utc)
+        session = {
+            "session_id": str(uuid4()),
+            "username": username,
+            "created_at": now,
+            "expires_at": now + timedelta(seconds=self.ttl_seconds)
+        }
+        await self.collection.insert_one(dict(session))
+        self._cache_put(session)
+        return session
+
+    async def get(self, session_id: Optional[str]) -> Optional[dict]:
+        if not session_id:
+            return None
+        if self.cache:
+            try:
+                await self._poll_revocations()
+            except Exception as e:
+                # Without the revocation feed a cached session could outlive its logout; use Mongo
+                logger.warning(f"Could not poll session revocations: {e}")
+                self.cache.clear()
+        cached = self.cache.get(session_id)
+        if cached:
+            session, valid_until = cached
+            if valid_until > time.monotonic() and self._expires_ts(session) > time.time():
+                self.cache.move_to_end(session_id)
+                self.cache_hits += 1
+                return session
+            self.cache.pop(session_id, None)
+
+        session = await self.collection.find_one(
+            {"session_id": session_id, "expires_at": {"$gt": datetime.now(timezone.utc)}},
+            {"_id": 0}
+        )
+        if session:
+            self._cache_put(session)
+        return session
+
+    async def delete(self, session_id: str) -> int:
+        self._evict(session_id=session_id)
+        await self._revoke(session_id=session_id)
+        result = await self.collection.delete_one({"session_id": session_id})
+        return result.deleted_count
+
+    async def delete_user(self, username: str) -> int:
+        self._evict(username=username)
+        await self._revoke(username=username)
+        result = await self.collection.delete_many({"username": username})
+        logger.info(f"Removed {result.deleted_count} sessions for {username}")
+        return result.deleted_count
+
+
+async def run_tests():
+    class Cursor:
+        def __init__(self, docs):
+            self.docs = docs
+
+        def __aiter__(self):
+            self.it = iter(self.docs)
+            return self
+
+        async def __anext__(self):
+            try:
+                return next(self.it)
+            except StopIteration:
+                raise StopAsyncIteration
+
+    class Collection:
+        def __init__(self):
+            self.docs = []
+            self.reads = 0
+
+        async def insert_one(self, doc):
+            self.docs.append(dict(doc))
+
+        async def find_one(self, query, projection=None):
+            self.reads += 1
+            return next((dict(d) for d in self.docs if d["session_id"] == query["session_id"]
+                         and d["expires_at"] > query["expires_at"]["$gt"]), None)
+
+        def find(self, query):
+            self.reads += 1
+            return Cursor([d for d in self.docs if d["at"] > query["at"]["$gt"]])
+
+        async def delete_one(self, query):
+            before = len(self.docs)
+            self.docs = [d for d in self.docs if d["session_id"] != query["session_id"]]
+            return type("Result", (), {"deleted_count": before - len(self.docs)})()
+
+        async def delete_many(self, query):
+            before = len(self.docs)
+            self.docs = [d for d in self.docs if d["username"] != query["username"]]
+            return type("Result", (), {"deleted_count": before - len(self.docs)})()
+
+    sessions, revocations = Collection(), Collection()
+    worker_a = SessionStore(sessions, revocations, cache_ttl=60, poll_interval=0.05)
+    worker_b = SessionStore(sessions, revocations, cache_ttl=60, poll_interval=0.05)
+
+    session = await worker_a.create("ada")
+    assert (await worker_b.get(session["session_id"]))["username"] == "ada"
+    reads = sessions.reads
+    for _ in range(100):
+        assert await worker_b.get(session["session_id"]) is not None
+    assert sessions.reads == reads and worker_b.cache_hits == 100, "cached sessions must not hit Mongo"
+    assert revocations.reads <= 2, "revocations are polled per interval, not per request"
+    print(f"✅ cache hit for 100 lookups ({revocations.reads} revocation polls)")
+
+    await worker_a.delete_user("ada")
+    await asyncio.sleep(0.06)
+    assert await worker_b.get(session["session_id"]) is None, "logout on another worker must evict"
+    print("✅ logout through another worker evicts the cached session")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_tests())
@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import os
+
+from loguru import logger
+
+from utils.usage import cost_usd, usage_metrics
+
+USAGE_RETENTION_DAYS = int(os.getenv("USAGE_RETENTION_DAYS", "90"))
+PROMPT_PREVIEW_CHARS = 120
+TOKEN_FIELDS = ("input_tokens", "cached_input_tokens", "uncached_input_tokens", "output_tokens", "llm_steps")
+
+
+class UsageStore:
+    """
+    Token and cost accounting per agent run, attributed to the user and conversation.
+    - `requests`: one document per run {username, conversation_id, at, prompt, tokens, cost_usd,
+      tools: {name: {calls, result_tokens, context_tokens}}}, expired after USAGE_RETENTION_DAYS
+    - `daily`: running totals per {username, day}, incremented in place, so totals over long
+      periods stay cheap to read
+    Accounting never fails a chat: Mongo errors are logged and dropped.
+    """
+
+    def __init__(self, requests, daily, retention_days: int = USAGE_RETENTION_DAYS):
+        self.requests = requests
+        self.daily = daily
+        self.retention_days = retention_days
+
+    async def ensure_indexes(self):
+        await self.requests.create_index([("username", 1), ("at", -1)])
+        await self.requests.create_index([("conversation_id", 1), ("at", -1)])
+        await self.requests.create_index("at", expireAfterSeconds=self.retention_days * 24 * 3600)
+        await self.daily.create_index([("username", 1), ("day", -1)], unique=True)
+
+    async def record(self, username: str, conversation_id: str, prompt: str, stats: dict):
+        cost = cost_usd(stats)
+        usage_metrics.observe(stats, cost)
+        now = datetime.now(timezone.utc)
+        tokens = {field: stats.get(field, 0) for field in TOKEN_FIELDS}
+        tools = stats.get("tools", {})
+        increments = {**{f"tokens.{k}": v for k, v in tokens.items()}, "requests": 1, "cost_usd": cost}
+        for tool, counts in tools.items():
+            for key, value in counts.items():
+                increments[f"tools.{tool}.{key}"] = value
+        try:
+            await self.requests.insert_one({
+                "username": username,
+                "conversation_id": conversation_id,
+                "at": now,
+                "prompt": prompt[:PROMPT_PREVIEW_CHARS],
+                "tokens": tokens,
+                "cost_usd": cost,
+                "tools": tools,
+            })
+            await self.daily.update_one(
+                {"username": username, "day": now.strftime("%Y-%m-%d")},
+                {"$inc": increments, "$set": {"updated_at": now}},
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"Could not record usage for {username}/{conversation_id}: {e}")
+
+    @staticmethod
+    def _add(total: dict, doc: dict):
+        total["requests"] += doc.get("requests", 1)
+        total["cost_usd"] += doc.get("cost_usd", 0.0)
+        for key, value in doc.get("tokens", {}).items():
+            total["tokens"][key] = total["tokens"].get(key, 0) + value
+        for tool, counts in doc.get("tools", {}).items():
+            into = total["tools"].setdefault(tool, {"calls": 0, "result_tokens": 0, "context_tokens": 0})
+            for key, value in counts.items():
+                into[key] = into.get(key, 0) + value
+
+    @staticmethod
+    def _empty() -> dict:
+        return {"requests": 0, "cost_usd": 0.0, "tokens": {}, "tools": {}}
+
+    async def summary(self, username: str, days: int = 30, conversation_id: Optional[str] = None,
+                      top: int = 10) -> dict:
+        """
+        Totals, per-day breakdown and the most expensive recent requests of `username` (optionally
+        one conversation). Tools are ranked by context tokens, i.e. how much they inflated the context.
+        """
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+        total = self._empty()
+        per_day = []
+        if conversation_id is None:
+            async for doc in self.daily.find({"username": username, "day": {"$gte": since.strftime("%Y-%m-%d")}},
+                                             {"_id": 0}).sort("day", 1):
+                day = self._empty()
+                self._add(day, doc)
+                self._add(total, doc)
+                per_day.append({"day": doc["day"], "requests": day["requests"], "cost_usd": round(day["cost_usd"], 6),
+                                "tokens": day["tokens"]})
+            query = {"username": username, "at": {"$gte": since}}
+        else:
+            query = {"username": username, "conversation_id": conversation_id}
+            async for doc in self.requests.find(query, {"_id": 0, "tokens": 1, "cost_usd": 1, "tools": 1}):
+                self._add(total, doc)
+
+        heaviest = self.requests.find(
+            query, {"_id": 0, "conversation_id": 1, "at": 1, "prompt": 1, "tokens": 1, "cost_usd": 1}
+        ).sort("tokens.input_tokens", -1).limit(top)
+        total["cost_usd"] = round(total["cost_usd"], 6)
+        total["tools"] = dict(sorted(total["tools"].items(), key=lambda t: -t[1].get("context_tokens", 0)))
+        return {
+            "username": username,
+            "conversation_id": conversation_id,
+            "days": days,
+            "total": total,
+            "per_day": per_day,
+            "heaviest_requests": [{**r, "at": r["at"].isoformat(), "cost_usd": round(r["cost_usd"], 6)}
+                                  async for r in heaviest],
+        }
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 class Chat(BaseModel):
     role:str
     content:str
@@ -7,6 +7,14 @@ class Chat(BaseModel):
 class GeminiChatModel(BaseModel):
     messages:List[Chat]
 
+class ChatRequest(BaseModel):
+    message:str
+    conversation_id:Optional[str] = None
+
+class ChatResponse(BaseModel):
+    conversation_id:str
+    message:Chat
+
 
 chat = Chat(role = "user", content="Who is pablo escobar?")
 messages = GeminiChatModel(messages=[chat])
@@ -0,0 +1,78 @@
+from pydantic import BaseModel, Field
+from typing import Annotated, List, Literal, Optional, Union
+
+
+class TextBlock(BaseModel):
+    type: Literal["text"] = "text"
+    # Paragraphs separated by blank lines; **bold** and `code` are supported
+    text: str
+
+
+class ListBlock(BaseModel):
+    type: Literal["list"] = "list"
+    items: List[str]
+    ordered: bool = False
+
+
+class CardBlock(BaseModel):
+    type: Literal["card"] = "card"
+    title: str
+    text: Optional[str] = None
+    # Label/value pairs shown as a small grid, e.g. {"Population": "8.9M"}
+    facts: dict = Field(default_factory=dict)
+
+
+class TableBlock(BaseModel):
+    type: Literal["table"] = "table"
+    columns: List[str]
+    rows: List[list]
+    caption: Optional[str] = None
+
+
+class WeatherBlock(BaseModel):
+    type: Literal["weather"] = "weather"
+    city: str
+    condition: str
+    temperature: Optional[float] = None
+    feels_like: Optional[float] = None
+    humidity: Optional[float] = None
+    wind: Optional[float] = None
+    unit: str = "°C"
+
+
+class Series(BaseModel):
+    name: str
+    values: List[float]
+
+
+class ChartBlock(BaseModel):
+    type: Literal["chart"] = "chart"
+    kind: Literal["bar", "line"] = "bar"
+    title: Optional[str] = None
+    labels: List[str]
+    series: List[Series]
+
+
+class Source(BaseModel):
+    title: str
+    url: str
+
+
+class SourcesBlock(BaseModel):
+    type: Literal["sources"] = "sources"
+    sources: List[Source]
+
+
+class HtmlBlock(BaseModel):
+    # Escape hatch for interactive content the other blocks can't express
+    type: Literal["html"] = "html"
+    html: str
+
+
+Block = Union[TextBlock, ListBlock, CardBlock, TableBlock, WeatherBlock, ChartBlock, SourcesBlock, HtmlBlock]
+
+
+class StructuredResponse(BaseModel):
+    """What the model returns in structured mode; utils.renderer turns it into the themed HTML."""
+    title: Optional[str] = None
+    blocks: List[Annotated[Block, Field(discriminator="type")]]
@@ -1,5 +1,4 @@
 from fastmcp import FastMCP, Client
-from pymongo import MongoClient
 from typing import List, Optional, Dict, Any
 import uvicorn
 import asyncio
@@ -8,18 +7,41 @@ from dotenv import load_dotenv
 from bson import ObjectId
 import sys
 from loguru import logger
+from datetime import datetime, timezone
+import numpy as np
+import struct
 import json
+import re
+import shutil
 if sys.platform.startswith("win"):
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 load_dotenv()
 
+# Share the API's tuned, process-wide client factory (pool sizing, compression, timeouts); run from
+# the project root: `python -m servers.mongoose_database_server` (or through supervisor.py)
+from db.database import MONGO_SERVER_URL, get_sync_client, get_pool_metrics
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
 app = FastMCP()
 
 # MongoDB Connection
-MONGO_URI = os.getenv("MONGO_URI")
-client = MongoClient(MONGO_URI)
+client = get_sync_client(MONGO_SERVER_URL)
 db = client.get_database("mcp_db")
 
+
+@app.custom_route("/metrics", methods=["GET"])
+async def metrics(request: Request) -> JSONResponse:
+    return JSONResponse({"mongo_pool": get_pool_metrics()})
+
+# Exported datasets land in the script workspace so scripts can memory-map them
+WORKSPACE = os.getenv(
+    "WORKSPACE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "workspace")
+)
+DATASETS_DIR = os.path.join(WORKSPACE, "datasets")
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+
 def clean_document(doc: Dict[str, Any]) -> Dict[str, Any]:
     return {
         k: str(v) if isinstance(v, ObjectId) else v
@@ -231,6 +253,419 @@ def read_records(
             "error": str(e)
         }
 
+NPY_HEADER_SIZE = 128
+
+
+def _write_npy_header(f, descr: str, length: int) -> None:
+    # Fixed-size .npy v1.0 header so the row count can be patched in place once streaming is done
+    header = "{'descr': '%s', 'fortran_order': False, 'shape': (%d,), }" % (descr, length)
+    header = header.ljust(NPY_HEADER_SIZE - 11) + "\n"
+    f.seek(0)
+    f.write(b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header.encode("latin1"))
+    f.seek(0, os.SEEK_END)
+
+
+def _to_float(value: Any) -> float:
+    if isinstance(value, (bool, int, float)):
+        return float(value)
+    return float("nan")
+
+
+def _to_text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class ColumnWriter:
+    """
+    Streams a single column to disk as .npy files.
+    Numeric columns -> `<stem>.npy` (float64, NaN for missing values).
+    Other columns   -> `<stem>.offsets.npy` (int64, rows + 1) + `<stem>.data.npy` (utf-8 bytes).
+    `coerced` counts values of the other kind: non-numbers written as NaN to a numeric column,
+    numbers written as text to a string column.
+    """
+
+    def __init__(self, directory: str, stem: str, kind: str):
+        self.kind = kind
+        self.rows = 0
+        self.coerced = 0
+        self.nbytes = 0
+        if kind == "numeric":
+            self.files = [f"{stem}.npy"]
+        else:
+            self.files = [f"{stem}.offsets.npy", f"{stem}.data.npy"]
+        self.handles = [open(os.path.join(directory, f), "wb") for f in self.files]
+        if kind == "numeric":
+            _write_npy_header(self.handles[0], "<f8", 0)
+        else:
+            _write_npy_header(self.handles[0], "<i8", 0)
+            _write_npy_header(self.handles[1], "|u1", 0)
+            self.handles[0].write(struct.pack("<q", 0))
+
+    def append(self, values: List[Any]) -> None:
+        if not values:
+            return
+        if self.kind == "numeric":
+            self.coerced += sum(1 for v in values if v is not None and not isinstance(v, (bool, int, float)))
+            self.handles[0].write(np.array([_to_float(v) for v in values], dtype="<f8").tobytes())
+        else:
+            self.coerced += sum(1 for v in values if isinstance(v, (bool, int, float)))
+            encoded = [_to_text(v).encode("utf-8") for v in values]
+            lengths = np.fromiter((len(b) for b in encoded), dtype="<i8", count=len(encoded))
+            offsets = self.nbytes + np.cumsum(lengths)
+            self.handles[0].write(offsets.astype("<i8").tobytes())
+            self.handles[1].write(b"".join(encoded))
+            self.nbytes = int(offsets[-1])
+        self.rows += len(values)
+
+    def close(self) -> None:
+        if self.kind == "numeric":
+            _write_npy_header(self.handles[0], "<f8", self.rows)
+        else:
+            _write_npy_header(self.handles[0], "<i8", self.rows + 1)
+            _write_npy_header(self.handles[1], "|u1", self.nbytes)
+        for handle in self.handles:
+            handle.close()
+
+
+def _write_batch(directory: str, writers: Dict[str, ColumnWriter], batch: List[Dict[str, Any]], rows_before: int) -> None:
+    fields = []
+    for doc in batch:
+        for key in doc:
+            if key not in writers and key not in fields:
+                fields.append(key)
+
+    # A column is typed by the batch it first appears in (numeric only if every value there is a
+    # number) and back-filled for earlier rows; later values of the other kind are counted as coerced
+    for key in fields:
+        values = [doc[key] for doc in batch if doc.get(key) is not None]
+        if not values:
+            continue
+        kind = "numeric" if all(isinstance(v, (bool, int, float)) for v in values) else "string"
+        stem = re.sub(r"[^A-Za-z0-9_.-]", "_", key)
+        taken = {f for w in writers.values() for f in w.files}
+        if f"{stem}.npy" in taken or f"{stem}.offsets.npy" in taken:
+            stem = f"{stem}_{len(writers)}"
+        writers[key] = ColumnWriter(directory, stem, kind)
+        writers[key].append([None] * rows_before)
+
+    for key, writer in writers.items():
+        writer.append([doc.get(key) for doc in batch])
+
+
+def iter_batches(cursor, batch_size: int):
+    batch = []
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+@app.tool(
+    description="""
+Export the result of a MongoDB query to a columnar dataset in the script workspace.
+Use this instead of `read_records` whenever a script needs to process more than a handful of records:
+the data is streamed straight to disk and never passes through the conversation.
+
+    - `name`: dataset name (letters, digits, `_` and `-`), written to `workspace/datasets/<name>/`
+    - `query_filter`, `projection`, `limit`: same as `read_records`
+
+    Inside a workspace script load it with:
+    ```python
+    from dataset_loader import load_dataset
+    data = load_dataset("<name>")          # {column: numpy array (memory-mapped)}
+    ages = data["Age"]                     # numeric columns are float64, NaN = missing
+    ```
+    `coerced` lists columns with values of another type than the column's (NaN in a numeric
+    column, numbers stored as text in a string column), with their counts."""
+)
+def export_dataset(
+    database: str,
+    collection: str,
+    name: str,
+    query_filter: Optional[Dict[str, Any]] = None,
+    projection: Optional[List[str]] = None,
+    limit: Optional[int] = None
+) -> Dict[str, Any]:
+    logger.info("EXPORT DATASET")
+    if not re.fullmatch(r"[A-Za-z0-9_-]+", name):
+        return {
+            "status": "error",
+            "database": database,
+            "collection": collection,
+            "error": "Dataset name may only contain letters, digits, '_' and '-'"
+        }
+
+    target = os.path.join(DATASETS_DIR, name)
+    staging = target + ".tmp"
+    writers: Dict[str, ColumnWriter] = {}
+    try:
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+
+        query_filter = query_filter or {}
+        projection_dict = {field: 1 for field in projection} if projection else None
+        cursor = client[database][collection].find(query_filter, projection_dict).batch_size(EXPORT_BATCH_SIZE)
+        if limit:
+            cursor = cursor.limit(limit)
+
+        rows = 0
+        for batch in iter_batches(cursor, EXPORT_BATCH_SIZE):
+            _write_batch(staging, writers, batch, rows)
+            rows += len(batch)
+
+        for writer in writers.values():
+            writer.close()
+
+        meta = {
+            "name": name,
+            "database": database,
+            "collection": collection,
+            "query_filter": json.loads(json.dumps(query_filter, default=str)),
+            "rows": rows,
+            "columns": {key: {"kind": w.kind, "files": w.files, "coerced": w.coerced} for key, w in writers.items()},
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+        with open(os.path.join(staging, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+
+        # Swap the finished export in so scripts never see a half-written dataset
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(staging, target)
+        logger.info(f"Exported {rows} records from {database}.{collection} to dataset {name}")
+        coerced = {key: w.coerced for key, w in writers.items() if w.coerced}
+        if coerced:
+            logger.warning(f"Dataset {name} has mixed-type columns, values coerced: {coerced}")
+        return {
+            "status": "success",
+            "database": database,
+            "collection": collection,
+            "dataset": name,
+            "path": os.path.relpath(target, WORKSPACE),
+            "rows": rows,
+            "columns": {key: w.kind for key, w in writers.items()},
+            "coerced": coerced,
+            "usage": f"from dataset_loader import load_dataset; data = load_dataset('{name}')"
+        }
+    except Exception as e:
+        for writer in writers.values():
+            for handle in writer.handles:
+                handle.close()
+        shutil.rmtree(staging, ignore_errors=True)
+        return {
+            "status": "error",
+            "database": database,
+            "collection": collection,
+            "error": str(e)
+        }
+
+DESCRIBE_QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+DESCRIBE_FINE_BINS = 4096
+DESCRIBE_MAX_DISTINCT = 20
+
+
+def _round(value: float, digits: int = 6) -> Optional[float]:
+    if value is None or not np.isfinite(value):
+        return None
+    return float(f"{value:.{digits}g}")
+
+
+def _column(batch: List[Dict[str, Any]], field: str) -> np.ndarray:
+    return np.fromiter((_to_float(doc.get(field)) for doc in batch), dtype=np.float64, count=len(batch))
+
+
+class NumericSummary:
+    """
+    Bounded-memory statistics for one numeric field.
+    Pass 1 (`update`) collects moments, min/max and small value distributions,
+    pass 2 (`update_histogram`) bins values between min and max for the histogram and quantiles.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.count = 0
+        self.zeros = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.distinct: Optional[Dict[float, int]] = {}
+        self.fine_counts = np.zeros(DESCRIBE_FINE_BINS, dtype=np.int64)
+
+    def update(self, values: np.ndarray) -> None:
+        self.rows += len(values)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        n = len(values)
+        batch_mean = float(values.mean())
+        batch_m2 = float(((values - batch_mean) ** 2).sum())
+        # Chan et al. parallel variance merge keeps mean/std exact across batches
+        delta = batch_mean - self.mean
+        total = self.count + n
+        self.mean += delta * n / total
+        self.m2 += batch_m2 + delta * delta * self.count * n / total
+        self.count = total
+        self.zeros += int(np.count_nonzero(values == 0))
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        if self.distinct is not None:
+            uniques, counts = np.unique(values, return_counts=True)
+            for value, c in zip(uniques.tolist(), counts.tolist()):
+                self.distinct[value] = self.distinct.get(value, 0) + c
+            if len(self.distinct) > DESCRIBE_MAX_DISTINCT:
+                self.distinct = None
+
+    def update_histogram(self, values: np.ndarray) -> None:
+        values = values[~np.isnan(values)]
+        if not len(values) or self.max == self.min:
+            return
+        # Documents written between the passes can fall outside pass-1 [min, max]; np.histogram would
+        # drop them, so they are counted in the end bins instead
+        values = np.clip(values, self.min, self.max)
+        counts, _ = np.histogram(values, bins=DESCRIBE_FINE_BINS, range=(self.min, self.max))
+        self.fine_counts += counts
+
+    def quantiles(self) -> Dict[str, Optional[float]]:
+        if not self.count:
+            return {}
+        if self.distinct is not None:
+            # Few distinct values: quantiles are exact
+            values = np.array(sorted(self.distinct))
+            cumulative = np.cumsum([self.distinct[v] for v in values.tolist()])
+            return {
+                f"p{int(q * 100):02d}": _round(float(values[min(int(np.searchsorted(cumulative, q * self.count)), len(values) - 1)]))
+                for q in DESCRIBE_QUANTILES
+            }
+        width = (self.max - self.min) / DESCRIBE_FINE_BINS
+        cumulative = np.cumsum(self.fine_counts)
+        result = {}
+        for q in DESCRIBE_QUANTILES:
+            # Ranks within what pass 2 binned, in case the document set changed between the passes
+            target = q * cumulative[-1]
+            index = int(np.searchsorted(cumulative, target))
+            index = min(index, DESCRIBE_FINE_BINS - 1)
+            before = cumulative[index - 1] if index else 0
+            in_bin = self.fine_counts[index]
+            fraction = (target - before) / in_bin if in_bin else 0.0
+            result[f"p{int(q * 100):02d}"] = _round(self.min + (index + fraction) * width)
+        return result
+
+    def histogram(self, bins: int) -> Dict[str, List[Any]]:
+        if not self.count:
+            return {"edges": [], "counts": []}
+        if self.max == self.min:
+            return {"edges": [_round(self.min), _round(self.max)], "counts": [self.count]}
+        # Fold the fine bins into the requested number of bins
+        groups = np.array_split(self.fine_counts, bins)
+        edges = np.linspace(self.min, self.max, len(groups) + 1)
+        return {
+            "edges": [_round(e) for e in edges.tolist()],
+            "counts": [int(g.sum()) for g in groups]
+        }
+
+    def to_dict(self, bins: int) -> Dict[str, Any]:
+        summary = {
+            "count": self.count,
+            "null_ratio": _round((self.rows - self.count) / self.rows, 4) if self.rows else None,
+            "zero_ratio": _round(self.zeros / self.count, 4) if self.count else None,
+            "min": _round(self.min),
+            "max": _round(self.max),
+            "mean": _round(self.mean) if self.count else None,
+            "std": _round(float(np.sqrt(self.m2 / self.count))) if self.count else None,
+            "quantiles": self.quantiles(),
+            "histogram": self.histogram(bins)
+        }
+        if self.distinct is not None and self.count:
+            summary["value_counts"] = {
+                (str(int(k)) if float(k).is_integer() else str(k)): v
+                for k, v in sorted(self.distinct.items())
+            }
+        return summary
+
+
+@app.tool(
+    description="""
+Profile the numeric fields of a collection (or of a query result) without reading the records into the conversation.
+Returns per field: count, null_ratio, zero_ratio, min, max, mean, std, quantiles (p05/p25/p50/p75/p95),
+a histogram and, for fields with few distinct values (e.g. 0/1 outcomes), exact value counts.
+
+    - `fields`: numeric fields to describe; detected from the first batch of documents when omitted
+    - `query_filter`, `limit`: same as `read_records`
+    - `bins`: number of histogram bins (default 10)
+
+    Prefer this over `read_records` + a script whenever the user asks for statistics, distributions or a data overview."""
+)
+def describe_collection(
+    database: str,
+    collection: str,
+    fields: Optional[List[str]] = None,
+    query_filter: Optional[Dict[str, Any]] = None,
+    limit: Optional[int] = None,
+    bins: int = 10
+) -> Dict[str, Any]:
+    logger.info("DESCRIBE COLLECTION")
+    try:
+        collection_obj = client[database][collection]
+        query_filter = query_filter or {}
+        bins = max(1, min(bins, 100))
+
+        def scan():
+            projection_dict = {field: 1 for field in fields} if fields else None
+            cursor = collection_obj.find(query_filter, projection_dict).batch_size(EXPORT_BATCH_SIZE)
+            if limit:
+                # Both passes must read the same documents; without a sort a limited query may not
+                cursor = cursor.sort("_id", 1).limit(limit)
+            return iter_batches(cursor, EXPORT_BATCH_SIZE)
+
+        summaries: Dict[str, NumericSummary] = {}
+        rows = 0
+        for batch in scan():
+            if fields is None:
+                fields = []
+                for doc in batch:
+                    for key, value in doc.items():
+                        if key not in fields and not key.startswith("_") and isinstance(value, (int, float)) and not isinstance(value, bool):
+                            fields.append(key)
+            for field in fields:
+                summaries.setdefault(field, NumericSummary()).update(_column(batch, field))
+            rows += len(batch)
+
+        # Second pass only needs the fields that actually have a spread of values
+        spread = [f for f, s in summaries.items() if s.count and s.max > s.min]
+        if spread:
+            fields = spread
+            for batch in scan():
+                for field in spread:
+                    summaries[field].update_histogram(_column(batch, field))
+
+        return {
+            "status": "success",
+            "database": database,
+            "collection": collection,
+            "query_filter": json.loads(json.dumps(query_filter, default=str)),
+            "count": rows,
+            "fields": {field: s.to_dict(bins) for field, s in summaries.items()}
+        }
+    except Exception as e:
+        return {
+            "status": "error",
+            "database": database,
+            "collection": collection,
+            "query_filter": query_filter,
+            "error": str(e)
+        }
+
 if __name__ == "__main__":
     try:
         client.admin.command("ping")
@@ -4,35 +4,231 @@ import uvicorn
 import os
 import subprocess
 import sys
+import ast
+import bisect
+import difflib
+import hashlib
+import json
+import re
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
 from loguru import logger
 
-# Configure loguru
-logger.remove()  # remove default handler
-logger.add(
-    sys.stdout,
-    colorize=True,
-    format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | "
-           "<level>{level: <8}</level> | "
-           "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - "
-           "<level>{message}</level>"
-)
-
 if sys.platform.startswith("win"):
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 app = FastMCP()
 
 # Define a safe workspace directory
-WORKSPACE = os.path.abspath("./workspace")
+WORKSPACE = os.getenv(
+    "WORKSPACE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "workspace")
+)
 os.makedirs(WORKSPACE, exist_ok=True)
+CATALOG_PATH = os.path.join(WORKSPACE, ".catalog.json")
+
+
+def write_atomic(path: str, text: str) -> None:
+    """
+    Write to a temp file of its own next to `path` and swap it in, so readers never see a partial
+    file and concurrent writers (another worker, the standalone server) never share a temp file.
+    """
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+        if os.path.exists(path):
+            os.chmod(tmp, os.stat(path).st_mode)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class WorkspaceCatalog:
+    """
+    Index of the workspace scripts (size, mtime, hash, docstring, functions, imports, last run).
+    Entries are re-parsed only when a file's mtime or size changes, so a refresh is a single
+    directory scan. The index is persisted next to the scripts so restarts don't re-parse everything.
+    """
+
+    def __init__(self, root: str, index_path: str):
+        self.root = root
+        self.index_path = index_path
+        self.entries = {}
+        self.names = []
+        self.lock = threading.Lock()
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    @staticmethod
+    def hash_content(content: bytes) -> str:
+        return hashlib.sha256(content).hexdigest()
+
+    def _parse(self, filename: str, stat: os.stat_result) -> dict:
+        with open(os.path.join(self.root, filename), "rb") as f:
+            content = f.read()
+        entry = {
+            "filename": filename,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "mtime_ns": stat.st_mtime_ns,
+            "hash": self.hash_content(content),
+            "lines": content.count(b"\n") + 1 if content else 0,
+            "docstring": None,
+            "functions": [],
+            "classes": [],
+            "imports": [],
+            "syntax_error": None,
+            "last_run": self.entries.get(filename, {}).get("last_run"),
+            "runs": self.entries.get(filename, {}).get("runs", 0),
+        }
+        try:
+            tree = ast.parse(content)
+        except SyntaxError as e:
+            entry["syntax_error"] = f"line {e.lineno}: {e.msg}"
+            return entry
+        docstring = ast.get_docstring(tree)
+        if docstring:
+            entry["docstring"] = docstring.strip().split("\n\n")[0][:300]
+        imports = []
+        for node in tree.body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                entry["functions"].append(node.name)
+            elif isinstance(node, ast.ClassDef):
+                entry["classes"].append(node.name)
+            elif isinstance(node, ast.Import):
+                imports.extend(alias.name.split(".")[0] for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                imports.append(node.module.split(".")[0])
+        entry["imports"] = sorted(set(imports))
+        return entry
+
+    def _save(self) -> None:
+        write_atomic(self.index_path, json.dumps(self.entries))
+
+    def refresh(self) -> None:
+        with self.lock:
+            changed = False
+            seen = set()
+            with os.scandir(self.root) as it:
+                for item in it:
+                    if not item.name.endswith(".py") or not item.is_file():
+                        continue
+                    seen.add(item.name)
+                    stat = item.stat()
+                    entry = self.entries.get(item.name)
+                    if entry and entry.get("mtime_ns") == stat.st_mtime_ns and entry.get("size") == stat.st_size:
+                        continue
+                    self.entries[item.name] = self._parse(item.name, stat)
+                    changed = True
+            for name in list(self.entries):
+                if name not in seen:
+                    del self.entries[name]
+                    changed = True
+            if changed or len(self.names) != len(self.entries):
+                self.names = sorted(self.entries)
+                self._save()
+
+    def update(self, filename: str) -> None:
+        with self.lock:
+            stat = os.stat(os.path.join(self.root, filename))
+            self.entries[filename] = self._parse(filename, stat)
+            self.names = sorted(self.entries)
+            self._save()
+
+    def record_run(self, filename: str, exit_code: Optional[int], duration: float, timed_out: bool = False) -> None:
+        with self.lock:
+            entry = self.entries.get(filename)
+            if entry is None:
+                # Not listed since it was created (e.g. written outside write_script): index it now
+                try:
+                    stat = os.stat(os.path.join(self.root, filename))
+                except OSError:
+                    return
+                entry = self.entries[filename] = self._parse(filename, stat)
+                self.names = sorted(self.entries)
+            entry["runs"] = entry.get("runs", 0) + 1
+            entry["last_run"] = {
+                "at": time.time(),
+                "exit_code": exit_code,
+                "duration_s": round(duration, 3),
+                "timed_out": timed_out,
+            }
+            self._save()
+
+    def get(self, filename: str) -> Optional[dict]:
+        return self.entries.get(filename)
+
+    def search(self, prefix: Optional[str] = None, query: Optional[str] = None,
+               imports: Optional[str] = None, limit: int = 50) -> list:
+        self.refresh()
+        names = self.names
+        if prefix:
+            # names are kept sorted, so a prefix match is a bisect slice
+            start = bisect.bisect_left(names, prefix)
+            end = bisect.bisect_left(names, prefix + "\U0010ffff")
+            names = names[start:end]
+        results = []
+        needle = query.lower() if query else None
+        for name in names:
+            entry = self.entries[name]
+            if imports and imports not in entry["imports"]:
+                continue
+            if needle:
+                haystack = " ".join([name, entry["docstring"] or ""] + entry["functions"] + entry["classes"]).lower()
+                if needle not in haystack:
+                    continue
+            results.append(entry)
+            if len(results) >= limit:
+                break
+        return results
+
 
+catalog = WorkspaceCatalog(WORKSPACE, CATALOG_PATH)
 
-@app.tool(description="List all Python scripts in the workspace.")
-async def list_scripts() -> dict:
+
+@app.tool(
+    description="""
+    List the Python scripts in the workspace together with what they contain, so you can find a
+    reusable script without reading each one.
+    Each entry has: filename, size, lines, mtime, hash, docstring, functions, classes, imports,
+    syntax_error, runs and last_run (exit_code, duration_s, timed_out).
+
+    - `prefix`: only scripts whose filename starts with this
+    - `query`: case-insensitive match against filename, docstring, function and class names
+    - `imports`: only scripts importing this top-level module (e.g. "numpy")
+    - `details`: set True for the full entries; by default only filenames are returned
+    - `limit`: maximum number of scripts returned (default 50)
+    """
+)
+async def list_scripts(
+    prefix: Optional[str] = None,
+    query: Optional[str] = None,
+    imports: Optional[str] = None,
+    details: bool = False,
+    limit: int = 50
+) -> dict:
     try:
-        files = [f for f in os.listdir(WORKSPACE) if f.endswith(".py")]
-        logger.info(f"Listed {len(files)} scripts: {files}")
-        return {"scripts": files}
+        # The refresh stats (and may re-read) every script; keep it off the event loop in in-process mode
+        entries = await asyncio.to_thread(catalog.search, prefix=prefix, query=query, imports=imports, limit=limit)
+        logger.info(f"Listed {len(entries)} scripts (prefix={prefix}, query={query}, imports={imports})")
+        if not details:
+            return {"scripts": [e["filename"] for e in entries]}
+        return {
+            "scripts": [
+                {k: v for k, v in e.items() if k != "mtime_ns"}
+                for e in entries
+            ]
+        }
     except Exception as e:
         logger.error(f"Error listing scripts: {e}")
         return {"error": str(e)}
@@ -47,24 +243,193 @@ def write_script(filename: str, code: str) -> dict:
         filepath = os.path.join(WORKSPACE, filename)
         with open(filepath, "w", encoding="utf-8") as f:
             f.write(code)
+        catalog.update(filename)
         logger.success(f"Script {filename} written successfully.")
-        return {"success": f"Script {filename} written successfully."}
+        return {"success": f"Script {filename} written successfully.", "hash": catalog.get(filename)["hash"]}
     except Exception as e:
         logger.error(f"Error writing script {filename}: {e}")
         return {"error": str(e)}
 
 
-@app.tool(description="Read the contents of a Python script.")
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+def _find_block(lines: List[str], block: List[str], hint: int) -> int:
+    """Locate `block` in `lines`, preferring the position closest to `hint`."""
+    if not block:
+        return min(max(hint, 0), len(lines))
+    matches = [
+        i for i in range(len(lines) - len(block) + 1)
+        if lines[i:i + len(block)] == block
+    ]
+    if not matches:
+        return -1
+    return min(matches, key=lambda i: abs(i - hint))
+
+
+def apply_unified_diff(content: str, diff: str) -> str:
+    lines = content.splitlines(keepends=True)
+    hunks = []
+    current = None
+    for raw in diff.splitlines(keepends=True):
+        header = HUNK_HEADER.match(raw)
+        if header:
+            current = {"start": int(header.group(1)), "old": [], "new": []}
+            hunks.append(current)
+            continue
+        # Anything before the first hunk is file headers (---/+++, diff --git, ...); inside a hunk a
+        # line like "--- x" is the removal of "-- x"
+        if current is None or raw.startswith("\\"):
+            continue
+        # Editors and models often strip the space from a blank context line
+        tag, text = (" ", "\n") if raw.strip("\r\n") == "" else (raw[:1], raw[1:])
+        if not text.endswith("\n"):
+            text += "\n"
+        if tag in (" ", ""):
+            current["old"].append(text)
+            current["new"].append(text)
+        elif tag == "-":
+            current["old"].append(text)
+        elif tag == "+":
+            current["new"].append(text)
+    if not hunks:
+        raise ValueError("diff contains no @@ hunks")
+
+    # Compare without the final newline so a file lacking one still matches
+    if lines and not lines[-1].endswith("\n"):
+        lines[-1] += "\n"
+        missing_newline = True
+    else:
+        missing_newline = False
+
+    offset = 0
+    for number, hunk in enumerate(hunks, start=1):
+        hint = hunk["start"] - 1 + offset
+        at = _find_block(lines, hunk["old"], hint)
+        if at < 0:
+            raise ValueError(f"hunk {number} (@@ -{hunk['start']}) does not match the current file")
+        lines[at:at + len(hunk["old"])] = hunk["new"]
+        offset += len(hunk["new"]) - len(hunk["old"])
+
+    result = "".join(lines)
+    if missing_newline and result.endswith("\n"):
+        result = result[:-1]
+    return result
+
+
+def apply_search_replace(content: str, edits: List[Dict[str, str]]) -> str:
+    for number, edit in enumerate(edits, start=1):
+        search = edit.get("search", "")
+        replace = edit.get("replace", "")
+        if not search:
+            raise ValueError(f"edit {number} has an empty `search`")
+        count = content.count(search)
+        if count == 0:
+            raise ValueError(f"edit {number}: `search` text not found")
+        if count > 1 and not edit.get("replace_all"):
+            raise ValueError(f"edit {number}: `search` text matches {count} times, add more context or set replace_all")
+        content = content.replace(search, replace) if edit.get("replace_all") else content.replace(search, replace, 1)
+    return content
+
+
+def changed_regions(old: str, new: str, context: int = 2) -> List[dict]:
+    old_lines = old.splitlines()
+    new_lines = new.splitlines()
+    regions = []
+    matcher = difflib.SequenceMatcher(a=old_lines, b=new_lines, autojunk=False)
+    for group in matcher.get_grouped_opcodes(context):
+        start = group[0][3]
+        end = group[-1][4]
+        regions.append({
+            "start_line": start + 1,
+            "end_line": end,
+            "content": "\n".join(new_lines[start:end])
+        })
+    return regions
+
+
+@app.tool(
+    description="""
+    Edit an existing workspace script without resending the whole file. Prefer this over `write_script`
+    for any change to an existing script.
+
+    Provide exactly one of:
+    - `edits`: list of {"search": "<exact existing text>", "replace": "<new text>"} applied in order
+      (`search` must match exactly once unless "replace_all": true is set)
+    - `diff`: a unified diff (`@@ -l,n +l,n @@` hunks with ' ', '-', '+' lines)
+
+    `expected_hash`: the script's hash from `read_script`/`list_scripts`/`write_script`/`edit_script`; if the file
+    changed since then the edit is rejected as a conflict.
+    All hunks are applied or none are. Returns the new hash and only the changed regions (with 2 lines of context).
+    """
+)
+def edit_script(
+    filename: str,
+    edits: Optional[List[Dict[str, str]]] = None,
+    diff: Optional[str] = None,
+    expected_hash: Optional[str] = None
+) -> dict:
+    try:
+        filepath = os.path.join(WORKSPACE, filename)
+        if not os.path.exists(filepath):
+            logger.warning(f"Tried to edit non-existent script: {filename}")
+            return {"error": f"{filename} does not exist"}
+        if bool(edits) == bool(diff):
+            return {"error": "Provide exactly one of `edits` or `diff`"}
+
+        with catalog.lock:
+            with open(filepath, "r", encoding="utf-8", newline="") as f:
+                content = f.read()
+            current_hash = WorkspaceCatalog.hash_content(content.encode("utf-8"))
+            if expected_hash and expected_hash != current_hash:
+                logger.warning(f"Edit conflict on {filename}")
+                return {"error": "conflict: script changed since expected_hash", "current_hash": current_hash}
+
+            # read_script returns "\n" line endings, so match on those and keep the file's own on write
+            crlf = "\r\n" in content
+            content = content.replace("\r\n", "\n")
+            try:
+                if diff:
+                    updated = apply_unified_diff(content, diff.replace("\r\n", "\n"))
+                else:
+                    updated = apply_search_replace(content, [
+                        {k: v.replace("\r\n", "\n") if isinstance(v, str) else v for k, v in edit.items()}
+                        for edit in edits
+                    ])
+            except ValueError as e:
+                return {"error": str(e), "current_hash": current_hash}
+
+            # Swap in a complete file so a failed write never leaves a half-edited script
+            write_atomic(filepath, updated.replace("\n", "\r\n") if crlf else updated)
+
+        catalog.update(filename)
+        regions = changed_regions(content, updated)
+        logger.success(f"Script {filename} edited ({len(regions)} region(s) changed).")
+        return {
+            "success": f"Script {filename} edited.",
+            "hash": catalog.get(filename)["hash"],
+            "changes": regions
+        }
+    except Exception as e:
+        logger.error(f"Error editing script {filename}: {e}")
+        return {"error": str(e)}
+
+
+@app.tool(description="""
+    Read the contents of a Python script. Also returns its `hash`; pass it to `edit_script` as
+    `expected_hash` so the edit is rejected if the script changed in the meantime.
+    """)
 def read_script(filename: str) -> dict:
     try:
         filepath = os.path.join(WORKSPACE, filename)
         if not os.path.exists(filepath):
             logger.warning(f"Tried to read non-existent script: {filename}")
             return {"error": f"{filename} does not exist"}
-        with open(filepath, "r", encoding="utf-8") as f:
-            content = f.read()
+        with open(filepath, "rb") as f:
+            raw = f.read()
+        content = raw.decode("utf-8").replace("\r\n", "\n")
         logger.info(f"Read script {filename} ({len(content)} chars).")
-        return {"filename": filename, "content": content}
+        return {"filename": filename, "content": content, "hash": WorkspaceCatalog.hash_content(raw)}
     except Exception as e:
         logger.error(f"Error reading script {filename}: {e}")
         return {"error": str(e)}
@@ -80,6 +445,7 @@ def run_script(filename: str, timeout:int = 30) -> dict:
             return {"error": f"{filename} does not exist"}
 
         logger.info(f"Running script: {filename}")
+        started = time.perf_counter()
         result = subprocess.run(
             [sys.executable, filepath],
             stdout=subprocess.PIPE,
@@ -88,6 +454,7 @@ def run_script(filename: str, timeout:int = 30) -> dict:
             timeout=timeout # prevent runaway scripts
         )
 
+        catalog.record_run(filename, result.returncode, time.perf_counter() - started)
         logger.info(f"Execution finished (exit_code={result.returncode}).")
         if result.stderr:
             logger.error(f"Stderr: {result.stderr.strip()}")
@@ -98,6 +465,7 @@ def run_script(filename: str, timeout:int = 30) -> dict:
             "exit_code": result.returncode,
         }
     except subprocess.TimeoutExpired:
+        catalog.record_run(filename, None, time.perf_counter() - started, timed_out=True)
         logger.error(f"Script {filename} timed out.")
         return {"error": "Script execution timed out"}
     except Exception as e:
@@ -115,13 +483,17 @@ def python_coder() -> str:
     Task: Write or modify Python scripts, then run them.
 
     Steps for the model:
-    1. If user asks to create or update a script:
+    1. If user asks to create a script:
        - Use `write_script` with filename + code.
+       To change an existing script:
+       - Use `edit_script` with search/replace `edits` or a unified `diff`
+         instead of rewriting the whole file.
     2. If user wants to see script contents:
        - Use `read_script`.
     3. If user wants to execute:
        - Use `run_script`.
-    4. If needed, list available scripts with `list_scripts`.
+    4. Before writing a new script, check `list_scripts` (use `query`/`prefix`)
+       for an existing one that already does the job.
 
     Important:
     - Always work inside the ./workspace directory.
@@ -156,8 +528,36 @@ async def run_tests():
         res = await test_server.call_tool("list_scripts", {})
         logger.debug(res.content[0].text)
 
+        # A unified diff whose blank context line lost its leading space
+        original = "def f():\n    a = 1\n\n    return a\n"
+        diff = "@@ -1,4 +1,4 @@\n def f():\n-    a = 1\n+    a = 2\n\n     return a\n"
+        assert apply_unified_diff(original, diff) == original.replace("a = 1", "a = 2")
+
+        # Edits built from read_script's output apply to a CRLF script, which keeps its line endings
+        with open(os.path.join(WORKSPACE, "crlf.py"), "wb") as f:
+            f.write(b"x = 1\r\ny = 2\r\n")
+        read = read_script.fn("crlf.py")
+        assert edit_script.fn("crlf.py", edits=[{"search": "x = 1\ny = 2", "replace": "x = 3\ny = 4"}],
+                              expected_hash=read["hash"]).get("success")
+        assert edit_script.fn("crlf.py", diff="@@ -1,2 +1,2 @@\n-x = 3\n+x = 5\n y = 4\n").get("success")
+        with open(os.path.join(WORKSPACE, "crlf.py"), "rb") as f:
+            assert f.read() == b"x = 5\r\ny = 4\r\n"
+        os.remove(os.path.join(WORKSPACE, "crlf.py"))
+        logger.success("✅ blank context lines and CRLF scripts edit cleanly")
+
 
 if __name__ == "__main__":
+    # Configure loguru for the standalone server only; imported in-process (MCP_INPROCESS) the
+    # API's handlers stay as they are
+    logger.remove()  # remove default handler
+    logger.add(
+        sys.stdout,
+        colorize=True,
+        format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | "
+               "<level>{level: <8}</level> | "
+               "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - "
+               "<level>{message}</level>"
+    )
     logger.info("Running test cases 🏃‍♂️....")
     asyncio.run(run_tests())
     app.run(transport="streamable-http", host="0.0.0.0", port=8002)
@@ -0,0 +1,91 @@
+"""
+Helpers for workspace scripts to read datasets written by the `export_dataset` tool.
+
+    from dataset_loader import load_dataset
+    data = load_dataset("diabetes")
+    glucose = data["Glucose"]            # memory-mapped float64 array, NaN = missing
+    names = data["name"].to_list()       # string columns decode lazily
+
+Nothing is copied into memory until it is used, so large exports stay cheap to open.
+"""
+import json
+import os
+
+import numpy as np
+
+DATASETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "datasets")
+
+
+class StringColumn:
+    """Lazily decoded utf-8 column backed by memory-mapped offsets + data arrays."""
+
+    def __init__(self, offsets: np.ndarray, data: np.ndarray):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return self.data[start:end].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def to_list(self):
+        return list(self)
+
+    def to_json(self):
+        """Decode a column exported from nested documents/lists back into Python objects."""
+        return [json.loads(v) if v else None for v in self]
+
+
+def list_datasets():
+    if not os.path.isdir(DATASETS_DIR):
+        return []
+    return sorted(
+        d for d in os.listdir(DATASETS_DIR)
+        if os.path.exists(os.path.join(DATASETS_DIR, d, "meta.json"))
+    )
+
+
+def load_meta(name):
+    with open(os.path.join(DATASETS_DIR, name, "meta.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_column(name, column, meta=None):
+    meta = meta or load_meta(name)
+    info = meta["columns"][column]
+    paths = [os.path.join(DATASETS_DIR, name, f) for f in info["files"]]
+    if info["kind"] == "numeric":
+        return np.load(paths[0], mmap_mode="r")
+    offsets = np.load(paths[0], mmap_mode="r")
+    # np.load refuses to memory-map zero-length files, which happens for all-empty strings
+    data = np.load(paths[1], mmap_mode="r") if os.path.getsize(paths[1]) > 128 else np.zeros(0, dtype=np.uint8)
+    return StringColumn(offsets, data)
+
+
+def load_dataset(name, columns=None):
+    meta = load_meta(name)
+    columns = columns or list(meta["columns"])
+    return {column: load_column(name, column, meta) for column in columns}
+
+
+def numeric_matrix(name, columns=None):
+    """Stack numeric columns into a (rows, columns) float64 array, e.g. for model training."""
+    meta = load_meta(name)
+    columns = columns or [c for c, info in meta["columns"].items() if info["kind"] == "numeric"]
+    return np.column_stack([load_column(name, c, meta) for c in columns]), columns
+
+
+if __name__ == "__main__":
+    for dataset in list_datasets():
+        meta = load_meta(dataset)
+        print(f"{dataset}: {meta['rows']} rows, columns={list(meta['columns'])}")
@@ -1,23 +1,45 @@
 
 import json
+from dataset_loader import load_dataset, list_datasets
 
-# Read data from the specified collection and database using the directly available function
-response = read_records(database="auth-demo", collection="web-data")
+# Export the collection first with the `export_dataset` tool:
+#   export_dataset(database="auth-demo", collection="web-data", name="web_data")
+if "web_data" in list_datasets():
+    data = load_dataset("web_data")
+    columns = list(data)
+    rows = len(data[columns[0]]) if columns else 0
+
+    records = []
+    for i in range(rows):
+        record = {}
+        for column in columns:
+            value = data[column][i]
+            if isinstance(value, float):
+                if value != value:  # NaN marks a missing numeric value
+                    continue
+                value = float(value)
+            elif isinstance(value, str):
+                if value == "":
+                    continue
+                # Nested documents are stored as JSON strings; plain text like "[draft] notes" stays as is
+                if value[:1] in "{[":
+                    try:
+                        value = json.loads(value)
+                    except ValueError:
+                        pass
+            record[column] = value
+        records.append(record)
 
-if response and response.get("status") == "success":
-    records = response.get("records", [])
-    
     # Convert the list of records to a JSON string
     json_output = json.dumps(records, indent=4)
-    
+
     # Define the filename for the JSON output
     filename = "web_data.json"
-    
+
     # Write the JSON string to the file in the workspace
     with open(filename, "w") as f:
         f.write(json_output)
-    
+
     print(f"Data successfully written to {filename}")
 else:
-    print("Failed to read records from the database.")
-    print(response) # Print response for debugging
+    print("Dataset 'web_data' not found. Run export_dataset(database='auth-demo', collection='web-data', name='web_data') first.")
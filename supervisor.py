@@ -0,0 +1,257 @@
+"""
+Starts the MCP tool servers and the API in dependency order and keeps them running.
+
+- the tool servers start in parallel; each counts as up once it answers an MCP `ping`
+- the API starts once they are up and counts as up once `GET /ready` answers 200, i.e. it has
+  discovered the tools of every server
+- a process that exits is restarted with exponential backoff; the backoff resets once it has
+  stayed up for SUPERVISOR_STABLE_SECONDS
+- Ctrl+C / SIGTERM stops the API first (so in-flight chats drain) and then the tool servers
+
+Tool servers listed in MCP_INPROCESS run inside the API and are not started separately. The
+servers listen on the addresses in MCP_SEARCH_URL / MCP_DATABASE_URL / MCP_SCRIPTS_URL, the API
+on API_HOST:API_PORT.
+
+    python supervisor.py
+    python supervisor.py --services search,scripts
+"""
+import argparse
+import asyncio
+import importlib
+import os
+import signal
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+import httpx
+from dotenv import load_dotenv
+from fastmcp import Client
+from loguru import logger
+
+load_dotenv()
+from utils.mcp_pool import MCP_INPROCESS, MCP_SERVER_MODULES, MCP_SERVERS  # noqa: E402
+
+API_HOST = os.getenv("API_HOST", "127.0.0.1")
+API_PORT = int(os.getenv("API_PORT", "8080"))
+# How long a service may take from spawn to passing its readiness probe
+SUPERVISOR_STARTUP_TIMEOUT = float(os.getenv("SUPERVISOR_STARTUP_TIMEOUT", "60"))
+SUPERVISOR_START_ATTEMPTS = int(os.getenv("SUPERVISOR_START_ATTEMPTS", "5"))
+SUPERVISOR_BACKOFF_BASE_SECONDS = float(os.getenv("SUPERVISOR_BACKOFF_BASE_SECONDS", "1"))
+SUPERVISOR_BACKOFF_MAX_SECONDS = float(os.getenv("SUPERVISOR_BACKOFF_MAX_SECONDS", "60"))
+SUPERVISOR_STABLE_SECONDS = float(os.getenv("SUPERVISOR_STABLE_SECONDS", "60"))
+# Grace period between asking a process to stop and killing it
+SUPERVISOR_STOP_TIMEOUT = float(os.getenv("SUPERVISOR_STOP_TIMEOUT", "130"))
+PROBE_INTERVAL_SECONDS = 0.25
+PROBE_TIMEOUT_SECONDS = 5.0
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def mcp_probe(url: str) -> Callable[[], Awaitable[None]]:
+    async def probe():
+        async with Client(url) as client:
+            await client.ping()
+    return probe
+
+
+def http_probe(url: str) -> Callable[[], Awaitable[None]]:
+    async def probe():
+        async with httpx.AsyncClient(timeout=PROBE_TIMEOUT_SECONDS) as client:
+            (await client.get(url)).raise_for_status()
+    return probe
+
+
+class Service:
+    def __init__(self, name: str, command: List[str], probe: Callable[[], Awaitable[None]],
+                 depends_on: tuple = ()):
+        self.name = name
+        self.command = command
+        self.probe = probe
+        self.depends_on = depends_on
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.started_at = 0.0
+        # Seconds from spawn to passing the readiness probe, per start
+        self.startup_times: List[float] = []
+        self.restarts = 0
+        self.failures = 0
+
+    async def spawn(self):
+        self.process = await asyncio.create_subprocess_exec(*self.command, cwd=ROOT)
+        self.started_at = time.perf_counter()
+
+    async def wait_ready(self, timeout: float, stopping: asyncio.Event) -> bool:
+        deadline = self.started_at + timeout
+        while time.perf_counter() < deadline and not stopping.is_set():
+            if self.process.returncode is not None:
+                return False
+            try:
+                await asyncio.wait_for(self.probe(), PROBE_TIMEOUT_SECONDS)
+                self.startup_times.append(time.perf_counter() - self.started_at)
+                return True
+            except Exception:
+                await asyncio.sleep(PROBE_INTERVAL_SECONDS)
+        return False
+
+    async def stop(self, timeout: float):
+        if self.process is None or self.process.returncode is not None:
+            return
+        # SIGTERM lets uvicorn finish open requests; on Windows this is TerminateProcess
+        self.process.terminate()
+        try:
+            await asyncio.wait_for(self.process.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"{self.name} did not stop within {timeout:.0f}s, killing it")
+            self.process.kill()
+            await self.process.wait()
+
+
+def build_services(names: List[str]) -> Dict[str, Service]:
+    services = {}
+    for name in names:
+        if name == "api":
+            continue
+        services[name] = Service(name, [sys.executable, os.path.abspath(__file__), "--serve", name],
+                                 mcp_probe(MCP_SERVERS[name]))
+    if "api" in names:
+        services["api"] = Service("api", [sys.executable, os.path.join(ROOT, "api.py")],
+                                  http_probe(f"http://{API_HOST}:{API_PORT}/ready"),
+                                  depends_on=tuple(services))
+    return services
+
+
+class Supervisor:
+    def __init__(self, services: Dict[str, Service], startup_timeout: float = SUPERVISOR_STARTUP_TIMEOUT,
+                 start_attempts: int = SUPERVISOR_START_ATTEMPTS,
+                 backoff_base: float = SUPERVISOR_BACKOFF_BASE_SECONDS,
+                 backoff_max: float = SUPERVISOR_BACKOFF_MAX_SECONDS,
+                 stable_after: float = SUPERVISOR_STABLE_SECONDS, stop_timeout: float = SUPERVISOR_STOP_TIMEOUT):
+        self.services = services
+        self.startup_timeout = startup_timeout
+        self.start_attempts = start_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stable_after = stable_after
+        self.stop_timeout = stop_timeout
+        self.stopping = asyncio.Event()
+        self.failed = False
+
+    def stages(self) -> List[List[Service]]:
+        """Services grouped so each group only depends on earlier groups."""
+        stages, done = [], set()
+        pending = dict(self.services)
+        while pending:
+            stage = [s for s in pending.values() if all(d in done or d not in self.services for d in s.depends_on)]
+            if not stage:
+                raise ValueError(f"Dependency cycle between {list(pending)}")
+            stages.append(stage)
+            for service in stage:
+                done.add(service.name)
+                pending.pop(service.name)
+        return stages
+
+    def backoff(self, service: Service) -> float:
+        return min(self.backoff_max, self.backoff_base * 2 ** max(0, service.failures - 1))
+
+    async def start(self, service: Service) -> bool:
+        """Spawn `service` and wait for its readiness probe, retrying with backoff."""
+        for attempt in range(1, self.start_attempts + 1):
+            if self.stopping.is_set():
+                return False
+            await service.spawn()
+            if await service.wait_ready(self.startup_timeout, self.stopping):
+                logger.info(f"{service.name} ready in {service.startup_times[-1]:.2f}s (pid {service.process.pid})")
+                return True
+            service.failures += 1
+            await service.stop(5)
+            delay = self.backoff(service)
+            logger.warning(f"{service.name} not ready (attempt {attempt}/{self.start_attempts}), "
+                           f"exit code {service.process.returncode}; retrying in {delay:.1f}s")
+            await self.sleep(delay)
+        return False
+
+    async def sleep(self, seconds: float):
+        try:
+            await asyncio.wait_for(self.stopping.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def watch(self, service: Service):
+        while not self.stopping.is_set():
+            code = await service.process.wait()
+            if self.stopping.is_set():
+                return
+            uptime = time.perf_counter() - service.started_at
+            if uptime >= self.stable_after:
+                service.failures = 0
+            service.failures += 1
+            service.restarts += 1
+            delay = self.backoff(service)
+            logger.error(f"{service.name} exited with code {code} after {uptime:.1f}s; restarting in {delay:.1f}s")
+            await self.sleep(delay)
+            if not self.stopping.is_set() and not await self.start(service):
+                logger.error(f"{service.name} could not be restarted, stopping everything")
+                self.failed = True
+                self.stopping.set()
+
+    def report(self):
+        print("\nService startup times")
+        for service in self.services.values():
+            print(f"  {service.name:10} {service.startup_times[-1]:7.2f}s  pid {service.process.pid}")
+
+    async def run(self) -> int:
+        started = time.perf_counter()
+        try:
+            for stage in self.stages():
+                results = await asyncio.gather(*(self.start(s) for s in stage))
+                if not all(results):
+                    failed = [s.name for s, ok in zip(stage, results) if not ok]
+                    logger.error(f"Could not start {failed}; not starting services that depend on them")
+                    return 1
+            self.report()
+            print(f"  {'total':10} {time.perf_counter() - started:7.2f}s\n")
+            watchers = [asyncio.create_task(self.watch(s)) for s in self.services.values()]
+            await self.stopping.wait()
+            for watcher in watchers:
+                watcher.cancel()
+            return 1 if self.failed else 0
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        self.stopping.set()
+        # Reverse dependency order: the API drains before the tool servers go away
+        for stage in reversed(self.stages()):
+            await asyncio.gather(*(s.stop(self.stop_timeout) for s in stage))
+
+
+def serve(name: str):
+    """Run one tool server's FastMCP app on the address its MCP_*_URL points at."""
+    url = urlparse(MCP_SERVERS[name])
+    app = importlib.import_module(MCP_SERVER_MODULES[name]).app
+    app.run(transport="streamable-http", host=url.hostname, port=url.port, path=url.path or "/mcp")
+
+
+async def main(names: List[str]) -> int:
+    supervisor = Supervisor(build_services(names))
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, supervisor.stopping.set)
+        except (NotImplementedError, AttributeError):
+            # Windows: Ctrl+C still cancels the run, and run() stops the processes on the way out
+            pass
+    return await supervisor.run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    default = [name for name in MCP_SERVERS if name not in MCP_INPROCESS] + ["api"]
+    parser.add_argument("--services", default=",".join(default), help="services to run, in any order")
+    parser.add_argument("--serve", choices=list(MCP_SERVERS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.serve)
+    else:
+        sys.exit(asyncio.run(main([n.strip() for n in args.services.split(",") if n.strip()])))
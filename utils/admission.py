@@ -0,0 +1,180 @@
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from loguru import logger
+
+CHAT_MAX_CONCURRENCY = int(os.getenv("CHAT_MAX_CONCURRENCY", "8"))
+CHAT_MAX_QUEUE = int(os.getenv("CHAT_MAX_QUEUE", "32"))
+CHAT_QUEUE_TIMEOUT_SECONDS = float(os.getenv("CHAT_QUEUE_TIMEOUT_SECONDS", "10"))
+
+
+class Overloaded(Exception):
+    """Raised instead of admitting a run; `retry_after` is the suggested wait in whole seconds."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Caps concurrent agent runs. Up to `max_concurrency` runs execute at once, up to `max_queue`
+    more wait in FIFO order, and a waiter that isn't admitted within `queue_timeout` seconds is
+    shed. A request arriving to a full queue is shed immediately, so overload is answered with a
+    fast 429 instead of every run slowing down until all of them time out.
+    """
+
+    def __init__(self, max_concurrency: int = CHAT_MAX_CONCURRENCY, max_queue: int = CHAT_MAX_QUEUE,
+                 queue_timeout: float = CHAT_QUEUE_TIMEOUT_SECONDS):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiters: "deque[asyncio.Future]" = deque()
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_deadline = 0
+        self.queue_wait_total_s = 0.0
+        self.queue_wait_max_s = 0.0
+        # Moving average of run duration, used to estimate Retry-After
+        self.run_avg_s = 5.0
+        self.draining = False
+
+    def retry_after(self) -> int:
+        backlog = len(self.waiters) + 1
+        return max(1, math.ceil(self.run_avg_s * backlog / self.max_concurrency))
+
+    async def acquire(self):
+        started = time.perf_counter()
+        if self.draining:
+            raise Overloaded("draining", 1)
+        if self.active < self.max_concurrency and not self.waiters:
+            self.active += 1
+        elif len(self.waiters) >= self.max_queue:
+            self.shed_queue_full += 1
+            raise Overloaded("queue full", self.retry_after())
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self.waiters.append(waiter)
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                # A waiter shed by start_draining() just as we gave up holds no slot
+                shed = waiter.done() and not waiter.cancelled() and waiter.exception() is not None
+                if waiter.done() and not waiter.cancelled():
+                    if not shed:
+                        # The slot was handed over just as we gave up; pass it on
+                        self.release()
+                else:
+                    waiter.cancel()
+                    self.waiters.remove(waiter)
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                if shed:
+                    raise waiter.exception()
+                self.shed_deadline += 1
+                raise Overloaded("queue timeout", self.retry_after())
+        waited = time.perf_counter() - started
+        self.admitted += 1
+        self.queue_wait_total_s += waited
+        self.queue_wait_max_s = max(self.queue_wait_max_s, waited)
+
+    def release(self):
+        # Hand the slot straight to the oldest waiter so newcomers can't overtake the queue
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.run_avg_s = 0.9 * self.run_avg_s + 0.1 * (time.perf_counter() - started)
+            self.release()
+
+    def start_draining(self):
+        """
+        Stop admitting runs: new and still-queued ones are shed with reason "draining" (a 503, so the
+        client retries on another worker). Runs already admitted carry on; uvicorn waits for them.
+        """
+        if self.draining:
+            return
+        self.draining = True
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_exception(Overloaded("draining", 1))
+        logger.info(f"Draining: {self.active} agent runs in flight, no new ones admitted")
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "queued": len(self.waiters),
+            "admitted": self.admitted,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_deadline": self.shed_deadline,
+            "queue_wait_avg_ms": round(self.queue_wait_total_s / self.admitted * 1000, 3) if self.admitted else 0.0,
+            "queue_wait_max_ms": round(self.queue_wait_max_s * 1000, 3),
+            "run_avg_s": round(self.run_avg_s, 3),
+            "draining": self.draining,
+        }
+
+
+chat_admission = AdmissionController()
+
+
+async def run_tests():
+    admission = AdmissionController(max_concurrency=2, max_queue=2, queue_timeout=0.3)
+
+    async def run(duration):
+        try:
+            async with admission.slot():
+                await asyncio.sleep(duration)
+            return "ok"
+        except Overloaded as e:
+            return e.reason
+
+    results = await asyncio.gather(*(run(0.1) for _ in range(6)))
+    assert results.count("ok") == 4 and results.count("queue full") == 2, results
+    assert admission.active == 0 and not admission.waiters, admission.stats()
+    print("✅ concurrency limit + bounded queue passed")
+
+    results = await asyncio.gather(run(1.0), run(1.0), run(0.1))
+    assert results == ["ok", "ok", "queue timeout"], results
+    print("✅ queue deadline passed")
+
+    blocker = asyncio.create_task(run(0.3))
+    blocker2 = asyncio.create_task(run(0.3))
+    await asyncio.sleep(0.01)
+    waiting = asyncio.create_task(run(0.1))
+    await asyncio.sleep(0.01)
+    waiting.cancel()
+    await asyncio.gather(blocker, blocker2, return_exceptions=True)
+    assert admission.active == 0 and not admission.waiters, "cancelled waiter leaked a slot"
+    print("✅ cancelled waiter released passed")
+
+    running = [asyncio.create_task(run(0.3)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    admission.start_draining()
+    results = await asyncio.gather(*running, run(0.1))
+    assert results == ["ok", "ok", "draining", "draining"], results
+    assert admission.active == 0 and not admission.waiters, admission.stats()
+    print("✅ drain passed")
+    logger.info(admission.stats())
+
+
+if __name__ == "__main__":
+    asyncio.run(run_tests())
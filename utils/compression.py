@@ -0,0 +1,352 @@
+import asyncio
+import gzip
+import os
+import re
+import zlib
+from collections import Counter
+from hashlib import blake2b
+
+from loguru import logger
+
+try:
+    import brotli
+except ImportError:  # optional: `pip install brotli` enables br
+    brotli = None
+
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+# Minify AI replies (whitespace, repeated inline styles -> classes) before they are sent
+HTML_MINIFY = os.getenv("HTML_MINIFY", "0") == "1"
+
+_ENCODING = re.compile(r"\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([\d.]+))?\s*")
+COMPRESSIBLE = ("application/json", "text/", "application/javascript", "image/svg+xml")
+
+
+def negotiate(accept_encoding: str) -> str:
+    """Best supported encoding the client accepts: br, then gzip, else identity."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        match = _ENCODING.fullmatch(part)
+        if match:
+            accepted[match.group(1).lower()] = float(match.group(2) or 1)
+    wildcard = accepted.get("*", 0)
+    for encoding in ("br", "gzip"):
+        if encoding == "br" and brotli is None:
+            continue
+        if accepted.get(encoding, wildcard) > 0:
+            return encoding
+    return "identity"
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+class CompressionStats:
+    def __init__(self):
+        self.responses = Counter()
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def record(self, encoding: str, size_in: int, size_out: int):
+        self.responses[encoding] += 1
+        self.bytes_in += size_in
+        self.bytes_out += size_out
+
+    def snapshot(self) -> dict:
+        return {
+            "responses": dict(self.responses),
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "bytes_saved": self.bytes_in - self.bytes_out,
+            "ratio": round(self.bytes_out / self.bytes_in, 4) if self.bytes_in else 1.0,
+        }
+
+
+def _negotiable(headers: list) -> bool:
+    """Whether the response's encoding depends on Accept-Encoding: a compressible type not already encoded."""
+    names = {k.lower(): v.decode("latin-1") for k, v in headers}
+    return b"content-encoding" not in names and names.get(b"content-type", "").startswith(COMPRESSIBLE)
+
+
+def _vary(headers: list) -> list:
+    """Add Accept-Encoding to Vary so caches keep the compressed and plain variants apart."""
+    vary = ", ".join(v.decode("latin-1") for k, v in headers if k.lower() == b"vary")
+    if "accept-encoding" in vary.lower():
+        return headers
+    headers = [(k, v) for k, v in headers if k.lower() != b"vary"]
+    return headers + [(b"vary", (f"{vary}, Accept-Encoding" if vary else "Accept-Encoding").encode())]
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with the best encoding the client accepts (br when the
+    optional `brotli` package is installed, else gzip). Bodies under `minimum_size`, non-text
+    types and already-encoded responses are sent as is. Every compressed response carries
+    `X-Uncompressed-Length`, and the bytes saved are totalled in `stats` (see GET /metrics).
+    Every compressible-type response, compressed or not, carries `Vary: Accept-Encoding`.
+    Large bodies are compressed in a worker thread so the event loop isn't held up.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES, stats: "CompressionStats" = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.stats = stats if stats is not None else compression_stats
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict((k.decode("latin-1").lower(), v.decode("latin-1")) for k, v in scope["headers"])
+        encoding = negotiate(headers.get("accept-encoding", ""))
+        if encoding == "identity":
+            async def identity_send(message):
+                if message["type"] == "http.response.start" and _negotiable(message["headers"]):
+                    message = {**message, "headers": _vary(message["headers"])}
+                await send(message)
+            return await self.app(scope, receive, identity_send)
+
+        start = None
+        chunks = []
+
+        async def buffered_send(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                return await send(message)
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            await self.finish(start, b"".join(chunks), encoding, send)
+
+        await self.app(scope, receive, buffered_send)
+
+    async def finish(self, start: dict, body: bytes, encoding: str, send):
+        headers = [(k, v) for k, v in start["headers"] if k.lower() not in (b"content-length",)]
+        names = {k.lower(): v.decode("latin-1") for k, v in headers}
+        content_type = names.get(b"content-type", "")
+        if (len(body) < self.minimum_size or b"content-encoding" in names
+                or not content_type.startswith(COMPRESSIBLE)):
+            if _negotiable(headers):
+                headers = _vary(headers)
+            await send({**start, "headers": headers + [(b"content-length", str(len(body)).encode())]})
+            await send({"type": "http.response.body", "body": body})
+            return
+        compressed = await asyncio.to_thread(compress, body, encoding) if len(body) > 256 * 1024 \
+            else compress(body, encoding)
+        self.stats.record(encoding, len(body), len(compressed))
+        logger.debug(f"{encoding}: {len(body)} -> {len(compressed)} bytes ({len(body) - len(compressed)} saved)")
+        headers += [
+            (b"content-encoding", encoding.encode()),
+            (b"content-length", str(len(compressed)).encode()),
+            (b"x-uncompressed-length", str(len(body)).encode()),
+        ]
+        await send({**start, "headers": _vary(headers)})
+        await send({"type": "http.response.body", "body": compressed})
+
+
+# --- HTML minification ---------------------------------------------------------------------------
+
+_RAW = re.compile(r"(<(pre|textarea|script)\b[^>]*>.*?</\2>)", re.S | re.I)
+_STYLE_BLOCK = re.compile(r"(<style\b[^>]*>)(.*?)(</style>)", re.S | re.I)
+# Whitespace after a tag, before the next one; dropped only when one of the two is block-level, since
+# between inline elements ("<b>pandas</b> <code>") it renders as a space
+_BETWEEN_TAGS = re.compile(r"(</?([a-zA-Z][\w-]*)[^<>]*>)\s+(?=</?([a-zA-Z][\w-]*))")
+BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "body", "br", "caption", "col", "colgroup", "dd", "details", "div",
+    "dl", "dt", "fieldset", "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "head",
+    "header", "hr", "html", "li", "link", "main", "meta", "nav", "ol", "p", "section", "style", "summary", "table",
+    "tbody", "td", "tfoot", "th", "thead", "title", "tr", "ul",
+    # SVG shapes: whitespace between them is never rendered
+    "svg", "g", "defs", "rect", "line", "polyline", "path", "circle",
+}
+_SPACES = re.compile(r"\s+")
+_CSS_SPACES = re.compile(r"\s*([{};:,>])\s*")
+_TAG = re.compile(r"<([a-zA-Z][\w-]*)(\s[^<>]*?)?(\s*/?)>")
+_STYLE_ATTR = re.compile(r"""\sstyle\s*=\s*("([^"]*)"|'([^']*)')""", re.I)
+_CLASS_ATTR = re.compile(r"""\sclass\s*=\s*("([^"]*)"|'([^']*)')""", re.I)
+
+
+def _between_tags(match) -> str:
+    block = match.group(2).lower() in BLOCK_TAGS or match.group(3).lower() in BLOCK_TAGS
+    return match.group(1) if block else match.group(1) + " "
+
+
+def _declarations(style: str) -> list:
+    """Split a style attribute on `;`, except inside parentheses and quotes (url(data:...;base64,...))."""
+    parts, current, depth, quote = [], [], 0, None
+    for ch in style:
+        if quote:
+            quote = None if ch == quote else quote
+        elif ch in "'\"":
+            quote = ch
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth = max(0, depth - 1)
+        elif ch == ";" and depth == 0:
+            parts.append("".join(current))
+            current = []
+            continue
+        current.append(ch)
+    parts.append("".join(current))
+    return [p.strip() for p in parts if p.strip()]
+
+
+def _important(declaration: str) -> str:
+    return declaration if declaration.replace(" ", "").endswith("!important") else declaration + " !important"
+
+
+def _minify_css(css: str) -> str:
+    return _CSS_SPACES.sub(r"\1", _SPACES.sub(" ", css)).replace(";}", "}").strip()
+
+
+def _minify_text(html: str) -> str:
+    html = _STYLE_BLOCK.sub(lambda m: m.group(1) + _minify_css(m.group(2)) + m.group(3), html)
+    return _BETWEEN_TAGS.sub(_between_tags, _SPACES.sub(" ", html)).strip()
+
+
+def _dedupe_styles(parts: list) -> str:
+    """
+    Inline style attributes used more than once become one class rule each. `parts` alternates markup
+    and raw pre/textarea/script segments; only the markup ones are read and rewritten.
+    """
+    markup = parts[::2]
+    styles = [_minify_css(m.group(2) if m.group(2) is not None else m.group(3))
+              for text in markup for m in _STYLE_ATTR.finditer(text)]
+    repeated = {style for style, count in Counter(styles).items() if count > 1 and style}
+    if not repeated:
+        return "".join(parts)
+    classes = {style: "ks-" + blake2b(style.encode(), digest_size=3).hexdigest() for style in repeated}
+
+    def rewrite(tag):
+        attrs = tag.group(2) or ""
+        match = _STYLE_ATTR.search(attrs)
+        if not match:
+            return tag.group(0)
+        style = _minify_css(match.group(2) if match.group(2) is not None else match.group(3))
+        if style not in classes:
+            return tag.group(0)
+        attrs = attrs[:match.start()] + attrs[match.end():]
+        existing = _CLASS_ATTR.search(attrs)
+        if existing:
+            current = existing.group(2) if existing.group(2) is not None else existing.group(3)
+            attrs = attrs[:existing.start()] + f' class="{current} {classes[style]}"' + attrs[existing.end():]
+        else:
+            attrs += f' class="{classes[style]}"'
+        return f"<{tag.group(1)}{attrs}{tag.group(3)}>"
+
+    # Inline styles outrank stylesheet rules; !important keeps that precedence after the move
+    rules = "".join(
+        f".{name}{{{';'.join(_important(d) for d in _declarations(style))}}}"
+        for style, name in classes.items()
+    )
+    return f"<style>{rules}</style>" + "".join(
+        _TAG.sub(rewrite, part) if i % 2 == 0 else part for i, part in enumerate(parts))
+
+
+class MinifyStats:
+    def __init__(self):
+        self.replies = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def snapshot(self) -> dict:
+        return {"replies": self.replies, "bytes_in": self.bytes_in, "bytes_out": self.bytes_out,
+                "bytes_saved": self.bytes_in - self.bytes_out}
+
+
+minify_stats = MinifyStats()
+
+
+def minify_html(html: str) -> str:
+    """Collapse whitespace (outside pre/textarea/script) and turn repeated inline styles into classes."""
+    parts = _RAW.split(html)
+    # split() with two groups yields [text, raw, tagname, text, raw, tagname, ...]
+    out = []
+    for i in range(0, len(parts), 3):
+        out.append(_minify_text(parts[i]))
+        if i + 1 < len(parts):
+            out.append(parts[i + 1])
+    minified = _dedupe_styles(out)
+    minify_stats.replies += 1
+    minify_stats.bytes_in += len(html.encode("utf-8"))
+    minify_stats.bytes_out += len(minified.encode("utf-8"))
+    return minified
+
+
+compression_stats = CompressionStats()
+
+
+async def run_tests():
+    assert negotiate("gzip, deflate, br") == ("br" if brotli else "gzip")
+    assert negotiate("gzip;q=0, br;q=0") == "identity" and negotiate("") == "identity"
+    assert negotiate("*") in ("br", "gzip") and negotiate("deflate") == "identity"
+    print("✅ encoding negotiation passed")
+
+    body = b'{"message": "' + b"<td style='padding:8px'>x</td>" * 200 + b'"}'
+    stats = CompressionStats()
+
+    async def app(scope, receive, send):
+        payload = body if scope["path"] == "/big" else b'{"ok": true}'
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())]})
+        await send({"type": "http.response.body", "body": payload})
+
+    async def call(path: str, accept: str):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+        scope = {"type": "http", "path": path, "headers": [(b"accept-encoding", accept.encode())]}
+        await CompressionMiddleware(app, minimum_size=1024, stats=stats)(scope, None, send)
+        return dict(sent[0]["headers"]), sent[1]["body"]
+
+    headers, payload = await call("/big", "gzip")
+    assert headers[b"content-encoding"] == b"gzip" and zlib.decompress(payload, 16 + zlib.MAX_WBITS) == body
+    assert int(headers[b"content-length"]) == len(payload) and int(headers[b"x-uncompressed-length"]) == len(body)
+    assert headers[b"vary"] == b"Accept-Encoding"
+    headers, payload = await call("/small", "gzip")
+    assert b"content-encoding" not in headers and payload == b'{"ok": true}'
+    assert headers[b"vary"] == b"Accept-Encoding", "small bodies still vary on Accept-Encoding"
+    headers, payload = await call("/big", "identity")
+    assert b"content-encoding" not in headers and payload == body
+    assert headers[b"vary"] == b"Accept-Encoding", "identity responses still vary on Accept-Encoding"
+    if brotli:
+        headers, payload = await call("/big", "br, gzip")
+        assert headers[b"content-encoding"] == b"br" and brotli.decompress(payload) == body
+    print("✅ compression middleware passed")
+    print(stats.snapshot())
+
+    html = """
+        <div style="background:#1e293b; color:#f1f5f9">
+            <table>
+                <tr><td style="padding: 8px;">a</td><td class="x" style="padding:8px">b</td></tr>
+                <tr><td style="padding:8px">c</td><td style="color:red">d</td></tr>
+            </table>
+            <pre>keep   this
+  spacing</pre>
+        </div>"""
+    minified = minify_html(html)
+    assert "keep   this\n  spacing" in minified, "pre content must be kept"
+    assert minified.count("padding:8px") == 1 and 'class="x ks-' in minified, minified
+    assert 'style="color:red"' in minified and "> <" not in minified and "\n" not in minified.replace("this\n", "")
+
+    inline = minify_html("<p>Use <strong>pandas</strong>\n   <code>read_csv</code>, then <em>plot</em></p>")
+    assert inline == "<p>Use <strong>pandas</strong> <code>read_csv</code>, then <em>plot</em></p>", inline
+    data_uri = "background:url(data:image/png;base64,AAA);color:red"
+    styled = minify_html(f'<span style="{data_uri}">a</span><span style="{data_uri}">b</span>')
+    assert "url(data:image/png;base64,AAA) !important;color:red !important}" in styled, styled
+    raw = ('<pre>&lt;td style="padding:8px"&gt;</pre><script>el.innerHTML = \'<b style="padding:8px">\';</script>')
+    styled = minify_html(f'<td style="padding:8px">a</td><td style="padding:8px">b</td>{raw}')
+    assert styled.endswith(raw) and styled.count("ks-") == 3, styled
+    print("✅ html minification passed")
+    print(minify_stats.snapshot())
+
+
+if __name__ == "__main__":
+    asyncio.run(run_tests())
@@ -0,0 +1,160 @@
+import os
+import re
+from typing import List, Optional, Tuple
+
+from langchain_core.messages import AIMessage, ToolMessage
+from loguru import logger
+
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "32000"))
+CONTEXT_KEEP_RECENT_MESSAGES = int(os.getenv("CONTEXT_KEEP_RECENT_MESSAGES", "6"))
+CONTEXT_MESSAGE_MAX_TOKENS = int(os.getenv("CONTEXT_MESSAGE_MAX_TOKENS", "2000"))
+CONTEXT_TOOL_RESULT_MAX_TOKENS = int(os.getenv("CONTEXT_TOOL_RESULT_MAX_TOKENS", "6000"))
+CONTEXT_SUMMARY_MAX_TOKENS = int(os.getenv("CONTEXT_SUMMARY_MAX_TOKENS", "1500"))
+
+SUMMARY_PREFIX = "[Summary of the earlier conversation]\n"
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_TAGS = re.compile(r"<(script|style)[^>]*>.*?</\1>|<[^>]+>", re.S | re.I)
+_SPACES = re.compile(r"\s+")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token holds well enough for English + HTML/JSON and needs no tokenizer round trip
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _text(content) -> str:
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "\n".join(c.get("text", "") if isinstance(c, dict) else str(c) for c in content)
+    return str(content)
+
+
+def message_tokens(message) -> int:
+    content = message["content"] if isinstance(message, dict) else message.content
+    return estimate_tokens(_text(content)) + MESSAGE_OVERHEAD_TOKENS
+
+
+def shorten(text: str, max_tokens: int) -> str:
+    """Keep the head and tail of an oversized text, noting how much was cut from the middle."""
+    limit = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    head = int(limit * 0.7)
+    tail = limit - head
+    omitted = estimate_tokens(text[head:len(text) - tail])
+    return f"{text[:head]}\n...[{omitted} tokens omitted]...\n{text[len(text) - tail:]}"
+
+
+def summarize_message(message: dict, max_chars: int = 300) -> str:
+    text = _SPACES.sub(" ", _TAGS.sub(" ", message["content"])).strip()
+    sentences = _SENTENCE_END.split(text)
+    gist = " ".join(sentences[:2])
+    if len(gist) > max_chars:
+        gist = gist[:max_chars].rstrip() + "..."
+    speaker = "User" if message["role"] in ("user", "human") else "Kowalski"
+    return f"- {speaker}: {gist}"
+
+
+class ContextWindow:
+    """
+    Keeps each LLM call within a token budget.
+    - Conversation level (`build`): the system prompt and the most recent messages are kept verbatim;
+      older messages are folded into a rolling extractive summary. Only newly folded messages are
+      summarized, so the summary is updated incrementally and stored with the conversation.
+    - Agent-step level (`pre_model_hook`): oversized tool results (full pages, record dumps, script
+      output) are shortened before each model call; results from earlier steps are cut harder.
+    """
+
+    def __init__(self, max_tokens: int = CONTEXT_MAX_TOKENS, keep_recent: int = CONTEXT_KEEP_RECENT_MESSAGES,
+                 message_max_tokens: int = CONTEXT_MESSAGE_MAX_TOKENS,
+                 tool_result_max_tokens: int = CONTEXT_TOOL_RESULT_MAX_TOKENS,
+                 summary_max_tokens: int = CONTEXT_SUMMARY_MAX_TOKENS):
+        self.max_tokens = max_tokens
+        self.keep_recent = keep_recent
+        self.message_max_tokens = message_max_tokens
+        self.tool_result_max_tokens = tool_result_max_tokens
+        self.summary_max_tokens = summary_max_tokens
+
+    def _extend_summary(self, summary: Optional[str], folded: List[dict]) -> str:
+        lines = (summary.split("\n") if summary else []) + [summarize_message(m) for m in folded]
+        # Drop the oldest lines once the summary itself outgrows its budget
+        while len(lines) > 1 and estimate_tokens("\n".join(lines)) > self.summary_max_tokens:
+            lines.pop(0)
+        return "\n".join(lines)
+
+    def build(self, messages: List[dict], summary: Optional[str] = None, summarized_upto: int = 0,
+              reserved_tokens: int = 0) -> Tuple[List[dict], Optional[str], int, dict]:
+        """
+        `messages` is the full stored history plus the new user message.
+        Returns (messages to send, summary, summarized_upto, stats).
+        """
+        budget = self.max_tokens - reserved_tokens
+        original = sum(message_tokens(m) for m in messages) + reserved_tokens
+        raw = messages[summarized_upto:]
+
+        # Older replies (usually long HTML) are trimmed first; the latest turns stay verbatim
+        recent_from = max(0, len(raw) - self.keep_recent)
+        window = [
+            {**m, "content": shorten(m["content"], self.message_max_tokens)} if i < recent_from else m
+            for i, m in enumerate(raw)
+        ]
+
+        summary_tokens = estimate_tokens(summary) if summary else 0
+        folded = []
+        while len(window) > self.keep_recent and summary_tokens + sum(message_tokens(m) for m in window) > budget:
+            folded.append(raw[len(folded)])
+            window.pop(0)
+            # Fold whole turns so the window never starts with an orphaned AI reply
+            while len(window) > self.keep_recent and window[0]["role"] not in ("user", "human"):
+                folded.append(raw[len(folded)])
+                window.pop(0)
+            summary_tokens = estimate_tokens(self._extend_summary(summary, folded))
+
+        if folded:
+            summary = self._extend_summary(summary, folded)
+            summarized_upto += len(folded)
+
+        if summary:
+            window = [{"role": "user", "content": SUMMARY_PREFIX + summary}] + window
+
+        sent = sum(message_tokens(m) for m in window) + reserved_tokens
+        stats = {
+            "history_tokens": original,
+            "history_tokens_sent": sent,
+            "summarized_messages": summarized_upto,
+            "newly_summarized": len(folded),
+        }
+        return window, summary, summarized_upto, stats
+
+    def pre_model_hook(self, stats: dict):
+        stats.setdefault("llm_steps", 0)
+        stats.setdefault("step_tokens", 0)
+        stats.setdefault("step_tokens_sent", 0)
+
+        def hook(state):
+            messages = state["messages"]
+            last_ai = max((i for i, m in enumerate(messages) if isinstance(m, AIMessage)), default=-1)
+            trimmed = []
+            for i, message in enumerate(messages):
+                if isinstance(message, ToolMessage):
+                    # The newest tool results get the full allowance, older ones a quarter of it
+                    limit = self.tool_result_max_tokens if i > last_ai else self.tool_result_max_tokens // 4
+                    text = _text(message.content)
+                    if estimate_tokens(text) > limit:
+                        message = message.model_copy(update={"content": shorten(text, limit)})
+                trimmed.append(message)
+
+            before = sum(message_tokens(m) for m in messages)
+            after = sum(message_tokens(m) for m in trimmed)
+            stats["llm_steps"] += 1
+            stats["step_tokens"] += before
+            stats["step_tokens_sent"] += after
+            if after < before:
+                logger.debug(f"Context window trimmed tool results: {before} -> {after} tokens")
+            return {"llm_input_messages": trimmed}
+
+        return hook
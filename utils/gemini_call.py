@@ -1,36 +1,124 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_mcp_adapters.client import MultiServerMCPClient, load_mcp_prompt
 from models.gemini_chat_model import GeminiChatModel,Chat
-from langgraph.prebuilt import create_react_agent
 from prompts.prompt import general_prompt
-mcp_client = MultiServerMCPClient({
-        "search": {
-            "url": "http://127.0.0.1:8000/mcp",
-            "transport": "streamable_http"
-        },
-        "database":{
-            "url": "http://127.0.0.1:8001/mcp",
-            "transport":"streamable_http"
-        },
-        "scripts":{
-            "url":"http://127.0.0.1:8002/mcp",
-            "transport":"streamable_http"
-        }
-    })
-
-
-async def gemini(messages: GeminiChatModel):
-    model = ChatGoogleGenerativeAI(model="gemini-2.5-flash")
-
-    tools = await mcp_client.get_tools()
-   
-    agent = create_react_agent(
-        model=model,
-        tools=tools,
-        prompt=general_prompt()
-    )
-
-    response = await agent.ainvoke(messages.model_dump())
+from utils.context_window import ContextWindow, message_tokens
+from utils.prompt_cache import prompt_cache
+from utils.mcp_pool import mcp_pool
+from utils.tool_governor import tool_governor
+from utils.llm_scheduler import ScheduledChatModel, llm_scheduler
+from langchain_core.messages import AIMessage, ToolMessage
+from loguru import logger
+from typing import Dict, Optional
+import time
+
+MODEL_NAME = "gemini-2.5-flash"
+context_window = ContextWindow()
+# Gemini clients by constructor kwargs (only `cached_content` varies), reused across requests
+_models: Dict[tuple, ScheduledChatModel] = {}
+
+
+def chat_model(**kwargs) -> ScheduledChatModel:
+    key = tuple(sorted(kwargs.items()))
+    model = _models.get(key)
+    if model is None:
+        # langchain_google_genai pulls in the whole google-genai SDK (~1.5s); it is imported here,
+        # on first use or by load_model_client() during startup, instead of when api.py is imported
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        # Retries are the scheduler's job (backoff shared across requests, quota aware), so the
+        # client makes a single attempt per call
+        model = ScheduledChatModel(
+            model=ChatGoogleGenerativeAI(model=MODEL_NAME, max_retries=1, **kwargs),
+            scheduler=llm_scheduler
+        )
+        if len(_models) >= 8:
+            _models.pop(next(iter(_models)))
+        _models[key] = model
+    return model
+
+
+def load_model_client():
+    """Import the Gemini and LangGraph stacks and build the default client. Blocking; run it in a thread."""
+    started = time.perf_counter()
+    import langgraph.prebuilt  # noqa: F401
+    try:
+        chat_model()
+    except Exception as e:
+        logger.warning(f"Could not create the Gemini client yet: {e}")
+    logger.info(f"Model client loaded in {time.perf_counter() - started:.2f}s")
+
+
+async def agent_tools():
+    """
+    The agent's tools: the pooled MCP tools (discovered once, every call reuses an initialized
+    session) with oversized results condensed (utils/tool_governor.py), plus read_tool_output.
+    The prompt cache is keyed on this exact list, so every caller must build it here.
+    """
+    return tool_governor.wrap(await mcp_pool.get_tools())
+
+
+async def warm_up_prompt_cache():
+    """Create (or adopt) the provider-side prompt cache before the first request needs it."""
+    await prompt_cache.get(MODEL_NAME, await agent_tools())
+
+
+def record_usage(messages, stats: dict):
+    """
+    Sum input/cached/output tokens over every LLM step of an agent run, and per tool its calls,
+    result tokens and context tokens (result tokens x the LLM steps that were sent the result).
+    """
+    steps = [i for i, m in enumerate(messages) if isinstance(m, AIMessage) and getattr(m, "usage_metadata", None)]
+    for i in steps:
+        usage = messages[i].usage_metadata
+        cached = (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+        stats["input_tokens"] = stats.get("input_tokens", 0) + usage.get("input_tokens", 0)
+        stats["cached_input_tokens"] = stats.get("cached_input_tokens", 0) + cached
+        stats["uncached_input_tokens"] = stats.get("uncached_input_tokens", 0) + usage.get("input_tokens", 0) - cached
+        stats["output_tokens"] = stats.get("output_tokens", 0) + usage.get("output_tokens", 0)
+    tools = stats.setdefault("tools", {})
+    for i, message in enumerate(messages):
+        if not isinstance(message, ToolMessage):
+            continue
+        tokens = message_tokens(message)
+        tool = tools.setdefault(message.name or "unknown", {"calls": 0, "result_tokens": 0, "context_tokens": 0})
+        tool["calls"] += 1
+        tool["result_tokens"] += tokens
+        tool["context_tokens"] += tokens * sum(1 for step in steps if step > i)
+
+
+async def gemini(messages: GeminiChatModel, stats: Optional[dict] = None):
+    """`stats`, when given, is filled with context-window and input/cached/output token counts."""
+    from langgraph.prebuilt import create_react_agent
+
+    stats = stats if stats is not None else {}
+    tools = await agent_tools()
+    pre_model_hook = context_window.pre_model_hook(stats)
+
+    cached_content = await prompt_cache.get(MODEL_NAME, tools)
+    if cached_content:
+        model = chat_model(cached_content=cached_content)
+        # The system prompt and tool schemas live in the provider cache and Gemini rejects requests
+        # that resend them, so the model is handed over unbound (as a dynamic model) and without a prompt
+        agent = create_react_agent(
+            model=lambda state, runtime: model,
+            tools=tools,
+            pre_model_hook=pre_model_hook
+        )
+    else:
+        model = chat_model()
+        agent = create_react_agent(
+            model=model,
+            tools=tools,
+            prompt=general_prompt(),
+            pre_model_hook=pre_model_hook
+        )
+    stats["prompt_cache"] = bool(cached_content)
+
+    question = next((m.content for m in reversed(messages.messages) if m.role in ("user", "human")), "")
+    with tool_governor.turn(query=question) as turn:
+        response = await agent.ainvoke(messages.model_dump())
+    record_usage(response['messages'], stats)
+    for tool, raw in turn.raw_tokens.items():
+        if tool in stats["tools"]:
+            stats["tools"][tool]["raw_tokens"] = raw
     last_content = response['messages'][-1].content
 
     # Ensure it's always a string
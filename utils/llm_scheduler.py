@@ -0,0 +1,367 @@
+import asyncio
+import os
+import random
+import re
+import time
+from typing import Any, List, Optional, Tuple
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from loguru import logger
+
+from utils.context_window import message_tokens
+
+# The quotas are per API key; with several API worker processes each one gets an equal share
+LLM_QUOTA_WORKERS = max(1, int(os.getenv("LLM_QUOTA_WORKERS", os.getenv("API_WORKERS", "1"))))
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "60")) / LLM_QUOTA_WORKERS
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "1000000")) / LLM_QUOTA_WORKERS
+# Output tokens reserved per call until the real usage is known
+LLM_EXPECTED_OUTPUT_TOKENS = int(os.getenv("LLM_EXPECTED_OUTPUT_TOKENS", "1024"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "1"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "30"))
+# Send a duplicate request when the first hasn't answered after this many seconds; 0 disables hedging
+LLM_HEDGE_AFTER_SECONDS = float(os.getenv("LLM_HEDGE_AFTER_SECONDS", "0"))
+
+# Status codes as whole numbers, so "14290 bytes" or a request id containing 429 doesn't count
+_THROTTLED = re.compile(r"\b(?:429|503)\b|RESOURCE_EXHAUSTED|UNAVAILABLE")
+_RETRY_DELAY = re.compile(r"retry(?:Delay)?\W+(?:in\s+)?(\d+(?:\.\d+)?)\s*s", re.I)
+
+
+class TokenBucket:
+    """Refills `per_minute` units per minute, up to one minute's worth. Waiters are served in order."""
+
+    def __init__(self, per_minute: float, clock=time.monotonic):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.clock = clock
+        self.updated = clock()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def take(self, amount: float) -> float:
+        """Waits until `amount` units are available, takes them and returns the seconds waited."""
+        if self.capacity <= 0:
+            return 0.0
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        async with self.lock:
+            self._refill()
+            while self.level < amount:
+                delay = (amount - self.level) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+                self._refill()
+            self.level -= amount
+        return waited
+
+    def adjust(self, amount: float):
+        # Reconcile an estimate with the real usage; the level may go negative (debt)
+        if self.capacity > 0:
+            self._refill()
+            self.level = min(self.capacity, self.level - amount)
+
+
+def _error_chain(error: BaseException):
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        error = error.__cause__ or error.__context__
+
+
+def is_throttled(error: BaseException) -> bool:
+    """Rate limit / overload errors (HTTP 429, 503, RESOURCE_EXHAUSTED, UNAVAILABLE) are worth retrying."""
+    for e in _error_chain(error):
+        code = getattr(e, "code", None) or getattr(e, "status_code", None)
+        if code in (429, 503):
+            return True
+        name = type(e).__name__
+        if "RateLimit" in name or "ResourceExhausted" in name or "ServiceUnavailable" in name:
+            return True
+        if _THROTTLED.search(str(e)):
+            return True
+    return False
+
+
+def retry_hint(error: BaseException) -> Optional[float]:
+    """Server-suggested delay, e.g. Gemini's `retryDelay: "23s"` or a Retry-After header."""
+    for e in _error_chain(error):
+        response = getattr(e, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        if headers.get("retry-after", "").replace(".", "", 1).isdigit():
+            return float(headers["retry-after"])
+        match = _RETRY_DELAY.search(str(e))
+        if match:
+            return float(match.group(1))
+    return None
+
+
+class LLMScheduler:
+    """
+    Paces LLM calls under the provider's requests/tokens per minute quotas, retries throttled calls
+    with jittered exponential backoff (honouring the server's suggested delay), and optionally hedges
+    slow calls with a duplicate request, keeping whichever answers first.
+    """
+
+    def __init__(self, requests_per_minute: float = LLM_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = LLM_TOKENS_PER_MINUTE, max_retries: int = LLM_MAX_RETRIES,
+                 backoff_base: float = LLM_BACKOFF_BASE_SECONDS, backoff_max: float = LLM_BACKOFF_MAX_SECONDS,
+                 hedge_after: float = LLM_HEDGE_AFTER_SECONDS,
+                 expected_output_tokens: int = LLM_EXPECTED_OUTPUT_TOKENS):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_after = hedge_after
+        self.expected_output_tokens = expected_output_tokens
+        self.calls = 0
+        self.attempts = 0
+        self.retries = 0
+        self.throttled = 0
+        self.failures = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.wait_total_s = 0.0
+        self.wait_max_s = 0.0
+        self.backoff_total_s = 0.0
+
+    def backoff(self, attempt: int, error: BaseException) -> float:
+        hint = retry_hint(error)
+        if hint is not None:
+            return min(self.backoff_max, hint) + random.uniform(0, self.backoff_base)
+        # Full jitter, so throttled callers don't retry in lockstep
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def _attempt(self, call, estimated_tokens: int):
+        waited = await self.requests.take(1)
+        waited += await self.tokens.take(estimated_tokens)
+        self.wait_total_s += waited
+        self.wait_max_s = max(self.wait_max_s, waited)
+        self.attempts += 1
+        return await call()
+
+    async def _hedged(self, call, estimated_tokens: int):
+        if self.hedge_after <= 0:
+            return await self._attempt(call, estimated_tokens)
+        first = asyncio.ensure_future(self._attempt(call, estimated_tokens))
+        done, _ = await asyncio.wait({first}, timeout=self.hedge_after)
+        if done:
+            return first.result()
+        self.hedges += 1
+        second = asyncio.ensure_future(self._attempt(call, estimated_tokens))
+        pending = {first, second}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.hedge_wins += 1
+                        return task.result()
+            # Both failed: surface the original request's error
+            return first.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def run(self, call, estimated_tokens: int, used_tokens=None):
+        """
+        `call` is a zero-argument coroutine factory, called once per attempt.
+        `used_tokens(result)`, when given, returns the real token usage to reconcile the estimate with.
+        """
+        self.calls += 1
+        estimated_tokens += self.expected_output_tokens
+        for attempt in range(self.max_retries + 1):
+            try:
+                result = await self._hedged(call, estimated_tokens)
+                if used_tokens is not None:
+                    used = used_tokens(result)
+                    if used:
+                        self.tokens.adjust(used - estimated_tokens)
+                return result
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if not is_throttled(e) or attempt == self.max_retries:
+                    self.failures += 1
+                    raise
+                self.throttled += 1
+                self.retries += 1
+                delay = self.backoff(attempt, e)
+                self.backoff_total_s += delay
+                logger.warning(f"LLM call throttled (attempt {attempt + 1}), retrying in {delay:.1f}s: {e}")
+                await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "failures": self.failures,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "quota_wait_avg_ms": round(self.wait_total_s / self.attempts * 1000, 3) if self.attempts else 0.0,
+            "quota_wait_max_ms": round(self.wait_max_s * 1000, 3),
+            "backoff_total_s": round(self.backoff_total_s, 3),
+        }
+
+
+def _usage(result: ChatResult) -> int:
+    total = 0
+    for generation in result.generations:
+        usage = getattr(generation.message, "usage_metadata", None) or {}
+        total += usage.get("total_tokens", 0) or usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+    return total
+
+
+class ScheduledChatModel(BaseChatModel):
+    """Chat model wrapper that sends every generation through an LLMScheduler."""
+
+    model: BaseChatModel
+    scheduler: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return f"scheduled-{self.model._llm_type}"
+
+    def bind_tools(self, tools, **kwargs):
+        # Let the wrapped model format the tools, but keep the calls going through this wrapper
+        bound = self.model.bind_tools(tools, **kwargs)
+        return self.bind(**bound.kwargs)
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        # The scheduler's buckets and lock belong to the API's event loop, and a sync call that
+        # skipped them would go unpaced and unretried, so sync use is refused outright
+        raise TypeError(f"{type(self).__name__} only supports async calls (ainvoke/astream); "
+                        "invoke() would bypass the LLM scheduler")
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        estimated = sum(message_tokens(m) for m in messages)
+        return await self.scheduler.run(
+            lambda: self.model._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs),
+            estimated,
+            used_tokens=_usage
+        )
+
+
+llm_scheduler = LLMScheduler()
+
+
+class _FakeThrottled(Exception):
+    """Stands in for the provider's 429 response."""
+
+    code = 429
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Local fake model endpoint: fails the first `throttle` calls with a 429, sleeps `delays[i]` on
+    call i; with `error` set, every call fails with that (non-throttle) message instead.
+    """
+
+    throttle: int = 0
+    error: str = ""
+    delays: List[float] = []
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _next_call(self) -> Tuple[int, float]:
+        call = self.calls
+        self.calls += 1
+        if self.error:
+            raise ValueError(self.error)
+        if call < self.throttle:
+            raise _FakeThrottled("429 RESOURCE_EXHAUSTED. Please retry in 0.05s.")
+        return call, self.delays[call] if call < len(self.delays) else 0
+
+    @staticmethod
+    def _answer(call: int) -> ChatResult:
+        message = AIMessage(content=f"answer {call}",
+                            usage_metadata={"input_tokens": 10, "output_tokens": 5, "total_tokens": 15})
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        call, delay = self._next_call()
+        time.sleep(delay)
+        return self._answer(call)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        call, delay = self._next_call()
+        await asyncio.sleep(delay)
+        return self._answer(call)
+
+
+async def run_tests():
+    scheduler = LLMScheduler(requests_per_minute=6000, tokens_per_minute=0, max_retries=3, backoff_base=0.01)
+    model = ScheduledChatModel(model=FakeChatModel(throttle=2), scheduler=scheduler)
+    response = await model.ainvoke("hi")
+    assert response.content == "answer 2" and scheduler.retries == 2, scheduler.stats()
+    assert response.usage_metadata["total_tokens"] == 15, "usage metadata must pass through"
+    print("✅ retry on 429 passed")
+
+    scheduler = LLMScheduler(requests_per_minute=6000, tokens_per_minute=0, max_retries=1, backoff_base=0.01)
+    model = ScheduledChatModel(model=FakeChatModel(throttle=5), scheduler=scheduler)
+    try:
+        await model.ainvoke("hi")
+        raise AssertionError("should give up after max_retries")
+    except _FakeThrottled:
+        assert scheduler.failures == 1 and scheduler.attempts == 2, scheduler.stats()
+    print("✅ retry budget passed")
+
+    scheduler = LLMScheduler(requests_per_minute=6000, tokens_per_minute=0, max_retries=3, backoff_base=0.01)
+    model = ScheduledChatModel(model=FakeChatModel(error="request 4290-a1 rejected: payload of 14290 bytes"),
+                               scheduler=scheduler)
+    try:
+        await model.ainvoke("hi")
+        raise AssertionError("non-throttle errors must not be retried")
+    except ValueError:
+        assert scheduler.attempts == 1 and scheduler.retries == 0, scheduler.stats()
+    print("✅ digits in other errors are not throttling")
+
+    # 120 requests/minute = one every 0.5s once the burst allowance is spent
+    scheduler = LLMScheduler(requests_per_minute=120, tokens_per_minute=0)
+    scheduler.requests.level = 1
+    model = ScheduledChatModel(model=FakeChatModel(), scheduler=scheduler)
+    started = time.perf_counter()
+    await asyncio.gather(model.ainvoke("a"), model.ainvoke("b"), model.ainvoke("c"))
+    elapsed = time.perf_counter() - started
+    assert 0.9 < elapsed < 1.5, f"rate limit not applied: {elapsed:.2f}s"
+    print(f"✅ requests/minute bucket passed ({elapsed:.2f}s for 3 calls)")
+
+    scheduler = LLMScheduler(requests_per_minute=6000, tokens_per_minute=0, hedge_after=0.1)
+    model = ScheduledChatModel(model=FakeChatModel(delays=[2.0, 0.01]), scheduler=scheduler)
+    started = time.perf_counter()
+    response = await model.ainvoke("slow")
+    elapsed = time.perf_counter() - started
+    assert response.content == "answer 1" and elapsed < 0.5, (response.content, elapsed)
+    assert scheduler.hedges == 1 and scheduler.hedge_wins == 1, scheduler.stats()
+    print(f"✅ hedged request passed ({elapsed:.2f}s instead of 2s)")
+
+    model = ScheduledChatModel(model=FakeChatModel(), scheduler=LLMScheduler())
+    bound = model.bind(temperature=0)
+    assert (await bound.ainvoke("x")).content == "answer 0"
+    print("✅ bound calls passed")
+
+    try:
+        model.invoke("x")
+        raise AssertionError("sync calls must not bypass the scheduler")
+    except TypeError as e:
+        assert "only supports async" in str(e)
+    print("✅ sync calls refused")
+    logger.info(scheduler.stats())
+
+
+if __name__ == "__main__":
+    asyncio.run(run_tests())
@@ -0,0 +1,377 @@
+import asyncio
+import functools
+import importlib
+import inspect
+import os
+import time
+from typing import Dict, List, Optional, Union
+
+import anyio
+import httpx
+from fastmcp import Client, FastMCP
+from langchain_core.tools import StructuredTool, ToolException
+from loguru import logger
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED
+
+MCP_SERVERS = {
+    "search": os.getenv("MCP_SEARCH_URL", "http://127.0.0.1:8000/mcp"),
+    "database": os.getenv("MCP_DATABASE_URL", "http://127.0.0.1:8001/mcp"),
+    "scripts": os.getenv("MCP_SCRIPTS_URL", "http://127.0.0.1:8002/mcp"),
+}
+# FastMCP app of each server, for in-process mode
+MCP_SERVER_MODULES = {
+    "search": "servers.search_server",
+    "database": "servers.mongoose_database_server",
+    "scripts": "servers.script_server",
+}
+# Servers to import into this process and call in memory instead of over HTTP: "search,database", "all", ...
+MCP_INPROCESS = {
+    name.strip() for name in os.getenv("MCP_INPROCESS", "").split(",") if name.strip()
+}
+if "all" in MCP_INPROCESS:
+    MCP_INPROCESS = set(MCP_SERVER_MODULES)
+MCP_POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "2"))
+MCP_HEALTH_INTERVAL = float(os.getenv("MCP_HEALTH_INTERVAL", "30"))
+MCP_CONNECT_TIMEOUT = float(os.getenv("MCP_CONNECT_TIMEOUT", "10"))
+MCP_TOOL_TIMEOUT = float(os.getenv("MCP_TOOL_TIMEOUT", "120"))
+# How often to retry tool discovery while a tool server is not up yet
+MCP_READY_RETRY_SECONDS = float(os.getenv("MCP_READY_RETRY_SECONDS", "2"))
+
+
+def _in_thread(fn):
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    return wrapper
+
+
+class InProcessServer:
+    """
+    Session factory for a tool server's FastMCP app imported into this process; sessions use
+    fastmcp's in-memory transport, so tool calls skip loopback HTTP and the extra JSON round trip.
+    """
+
+    transport = "inprocess"
+
+    def __init__(self, source: Union[str, FastMCP]):
+        # A module path ("servers.search_server") whose `app` is imported on first use, or an app
+        self.source = source
+        self.app = None
+
+    async def load(self):
+        if self.app is not None:
+            return
+        app = importlib.import_module(self.source).app if isinstance(self.source, str) else self.source
+        # FastMCP calls sync tools directly on the event loop; in a separate server that only stalls
+        # the server, in-process it would stall the API, so blocking tools run in worker threads
+        for tool in (await app.get_tools()).values():
+            fn = getattr(tool, "fn", None)
+            if fn is not None and not inspect.iscoroutinefunction(fn):
+                tool.fn = _in_thread(fn)
+        self.app = app
+
+    def __call__(self) -> Client:
+        return Client(self.app)
+
+
+class HTTPServer:
+    """Session factory for a tool server running as its own process (streamable HTTP)."""
+
+    transport = "http"
+
+    def __init__(self, url: str):
+        self.url = url
+
+    async def load(self):
+        pass
+
+    def __call__(self) -> Client:
+        return Client(self.url)
+
+
+ServerFactory = Union[HTTPServer, InProcessServer]
+
+
+def server_factories() -> Dict[str, ServerFactory]:
+    return {
+        name: InProcessServer(MCP_SERVER_MODULES[name]) if name in MCP_INPROCESS else HTTPServer(url)
+        for name, url in MCP_SERVERS.items()
+    }
+
+
+class SessionExpired(ConnectionError):
+    """The server rejected the session (e.g. it restarted), so the request was never processed."""
+
+
+TRANSPORT_ERRORS = (ConnectionError, OSError, httpx.HTTPError, anyio.ClosedResourceError, anyio.BrokenResourceError)
+
+
+def is_transport_error(e: BaseException) -> bool:
+    """A broken connection, as opposed to an error the server returned for the request."""
+    if isinstance(e, McpError):
+        return e.error.code == CONNECTION_CLOSED
+    return isinstance(e, TRANSPORT_ERRORS)
+
+
+class PooledSession:
+    """One long-lived, initialized MCP session that is reused across tool calls."""
+
+    def __init__(self, factory: ServerFactory):
+        self.factory = factory
+        self.client: Optional[Client] = None
+        self.in_use = 0
+
+    @property
+    def runner(self) -> Optional[asyncio.Task]:
+        # fastmcp keeps the transport in a background task, which ends when the connection breaks.
+        # The attribute is private (fastmcp is pinned in requirements.txt); if a release drops it,
+        # calls are just not raced against the transport and `connected` uses is_connected()
+        state = getattr(self.client, "_session_state", None)
+        return getattr(state, "session_task", None)
+
+    @property
+    def connected(self) -> bool:
+        if self.client is None:
+            return False
+        runner = self.runner
+        return not runner.done() if runner is not None else self.client.is_connected()
+
+    async def connect(self):
+        await self.close()
+        client = self.factory()
+        try:
+            await asyncio.wait_for(client.__aenter__(), MCP_CONNECT_TIMEOUT)
+        except RuntimeError as e:
+            # fastmcp reports connection failures as RuntimeError ("Client failed to connect: ...")
+            raise ConnectionError(f"MCP session could not connect: {e}") from e
+        self.client = client
+
+    async def close(self):
+        client, self.client = self.client, None
+        if client is None:
+            return
+        try:
+            await asyncio.wait_for(client.close(), 5)
+        except Exception as e:
+            logger.debug(f"MCP session closed with error: {e}")
+
+    async def run(self, method: str, *args, **kwargs):
+        # A request on a session the server no longer knows (e.g. the server restarted) never gets
+        # a reply; the transport task dies instead. Wait on both so such calls fail fast.
+        client, runner = self.client, self.runner
+        if client is None or not self.connected:
+            raise ConnectionError("MCP session is not connected")
+        if runner is None:
+            return await getattr(client, method)(*args, **kwargs)
+        call = asyncio.ensure_future(getattr(client, method)(*args, **kwargs))
+        try:
+            await asyncio.wait({call, runner}, return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            call.cancel()
+            raise
+        if call.done() and not (runner.done() and not call.cancelled() and call.exception() is not None):
+            return call.result()
+        call.cancel()
+        error = None if runner.cancelled() else runner.exception()
+        if isinstance(error, httpx.HTTPStatusError) and error.response.status_code in (400, 404):
+            raise SessionExpired(f"MCP session rejected by the server: {error.response.status_code}")
+        raise ConnectionError(f"MCP session closed during the call: {error}")
+
+
+class MCPServerPool:
+    """A few persistent sessions to one MCP server; calls go to the least busy healthy session."""
+
+    def __init__(self, name: str, factory: ServerFactory, size: int = MCP_POOL_SIZE):
+        self.name = name
+        self.factory = factory
+        self.sessions = [PooledSession(factory) for _ in range(max(1, size))]
+        self.lock = asyncio.Lock()
+        self.calls = 0
+        self.reconnects = 0
+        self.failures = 0
+
+    async def start(self):
+        try:
+            await self.factory.load()
+        except Exception as e:
+            logger.error(f"Could not load MCP server '{self.name}' in-process: {e}")
+            return
+        results = await asyncio.gather(*(s.connect() for s in self.sessions), return_exceptions=True)
+        failed = [r for r in results if isinstance(r, BaseException)]
+        if failed:
+            logger.warning(f"MCP server '{self.name}': {len(failed)}/{len(self.sessions)} sessions failed to connect: {failed[0]}")
+
+    async def _acquire(self) -> PooledSession:
+        healthy = [s for s in self.sessions if s.connected]
+        if healthy:
+            return min(healthy, key=lambda s: s.in_use)
+        async with self.lock:
+            healthy = [s for s in self.sessions if s.connected]
+            if healthy:
+                return healthy[0]
+            self.reconnects += 1
+            await self.sessions[0].connect()
+            return self.sessions[0]
+
+    async def call(self, method: str, *args, retry: bool = True, **kwargs):
+        """
+        Run a client method on a pooled session. On a transport failure the session is dropped and the
+        call is repeated once on a fresh session if `retry`, or if the server never saw the request.
+        Tool calls pass retry=False since the server may already have run a non-idempotent tool.
+        """
+        for attempt in (1, 2):
+            session = await self._acquire()
+            session.in_use += 1
+            try:
+                self.calls += 1
+                return await session.run(method, *args, **kwargs)
+            except Exception as e:
+                if not is_transport_error(e):
+                    raise
+                self.failures += 1
+                logger.warning(f"MCP server '{self.name}' {method} failed on attempt {attempt}: {e}")
+                await session.close()
+                if attempt == 2 or not (retry or isinstance(e, SessionExpired)):
+                    raise
+            finally:
+                session.in_use -= 1
+
+    async def health_check(self):
+        for session in self.sessions:
+            if session.in_use:
+                continue
+            try:
+                if not session.connected:
+                    raise ConnectionError("not connected")
+                await asyncio.wait_for(session.run("ping"), MCP_CONNECT_TIMEOUT)
+            except Exception as e:
+                logger.info(f"MCP server '{self.name}' session unhealthy ({e}), reconnecting")
+                self.reconnects += 1
+                try:
+                    await session.connect()
+                except Exception as e:
+                    logger.warning(f"MCP server '{self.name}' reconnect failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "transport": self.factory.transport,
+            "sessions": len(self.sessions),
+            "connected": sum(1 for s in self.sessions if s.connected),
+            "in_flight": sum(s.in_use for s in self.sessions),
+            "calls": self.calls,
+            "reconnects": self.reconnects,
+            "failures": self.failures,
+        }
+
+
+def _result_text(result) -> str:
+    parts = []
+    for content in result.content:
+        text = getattr(content, "text", None)
+        parts.append(text if text is not None else content.model_dump_json())
+    return "\n".join(parts)
+
+
+class MCPPool:
+    """
+    Long-lived, health-checked MCP sessions to every tool server, exposed as LangChain tools.
+    Tool schemas are discovered once and reused; each tool call borrows a pooled session instead
+    of opening (and initializing) a new streamable-HTTP session.
+    `servers` maps a server name to an HTTPServer or InProcessServer; defaults follow MCP_INPROCESS.
+    """
+
+    def __init__(self, servers: Optional[Dict[str, ServerFactory]] = None, size: int = MCP_POOL_SIZE,
+                 health_interval: float = MCP_HEALTH_INTERVAL):
+        servers = servers or server_factories()
+        self.servers = {name: MCPServerPool(name, factory, size) for name, factory in servers.items()}
+        self.health_interval = health_interval
+        self.tools: Optional[List[StructuredTool]] = None
+        self.health_task: Optional[asyncio.Task] = None
+        self.started = False
+        self.lock = asyncio.Lock()
+
+    async def start(self):
+        async with self.lock:
+            if self.started:
+                return
+            started = time.perf_counter()
+            await asyncio.gather(*(pool.start() for pool in self.servers.values()))
+            self.started = True
+            if self.health_interval > 0:
+                self.health_task = asyncio.create_task(self._health_loop())
+            logger.info(f"MCP pool started in {time.perf_counter() - started:.2f}s: {self.stats()}")
+
+    async def close(self):
+        if self.health_task:
+            self.health_task.cancel()
+            self.health_task = None
+        for pool in self.servers.values():
+            for session in pool.sessions:
+                await session.close()
+        self.started = False
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            for pool in self.servers.values():
+                await pool.health_check()
+
+    def _make_tool(self, pool: MCPServerPool, tool) -> StructuredTool:
+        async def call_tool(**arguments):
+            try:
+                result = await pool.call("call_tool_mcp", tool.name, arguments, retry=False, timeout=MCP_TOOL_TIMEOUT)
+            except McpError as e:
+                if is_transport_error(e):
+                    raise ToolException(f"Tool server '{pool.name}' is unavailable: {e}")
+                # e.g. the request timed out (MCP_TOOL_TIMEOUT) or the server rejected it
+                raise ToolException(f"Tool server '{pool.name}' failed the call: {e}")
+            except TRANSPORT_ERRORS as e:
+                raise ToolException(f"Tool server '{pool.name}' is unavailable: {e}")
+            text = _result_text(result)
+            if result.isError:
+                raise ToolException(text)
+            return text
+
+        return StructuredTool(
+            name=tool.name,
+            description=tool.description or "",
+            args_schema=tool.inputSchema,
+            coroutine=call_tool,
+            handle_tool_error=True,
+            metadata={"mcp_server": pool.name},
+        )
+
+    async def get_tools(self, refresh: bool = False) -> List[StructuredTool]:
+        if not self.started:
+            await self.start()
+        if self.tools is None or refresh:
+            tools = []
+            for pool in self.servers.values():
+                try:
+                    for tool in await pool.call("list_tools"):
+                        tools.append(self._make_tool(pool, tool))
+                except Exception as e:
+                    logger.error(f"Could not list tools of MCP server '{pool.name}': {e}")
+                    # Don't cache a partial tool list; try again on the next request
+                    return tools
+            self.tools = tools
+        return self.tools
+
+    @property
+    def ready(self) -> bool:
+        """Every tool server has answered and the full tool list is known."""
+        return self.tools is not None
+
+    async def wait_ready(self, interval: float = MCP_READY_RETRY_SECONDS):
+        while not self.ready:
+            await self.get_tools()
+            if not self.ready:
+                await asyncio.sleep(interval)
+        logger.info(f"MCP tools ready: {[t.name for t in self.tools]}")
+
+    def stats(self) -> dict:
+        return {name: pool.stats() for name, pool in self.servers.items()}
+
+
+mcp_pool = MCPPool()
@@ -1,12 +1,36 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import bcrypt
 
+# Cost factor for new hashes; existing hashes keep the cost they were created with
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# bcrypt releases the GIL, so a small thread pool runs hashes truly in parallel off the event loop
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Upper bound on hash/verify jobs admitted at once (running + queued in the pool)
+BCRYPT_MAX_CONCURRENCY = int(os.getenv("BCRYPT_MAX_CONCURRENCY", str(BCRYPT_WORKERS * 4)))
+
+_executor = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+_limiter = asyncio.Semaphore(BCRYPT_MAX_CONCURRENCY)
+
 
 class PasswordUtils:
     
     @staticmethod    
     def hash_password(password:str)->str:
-        return bcrypt.hashpw(password.encode('utf-8'),bcrypt.gensalt()).decode('utf-8')
+        return bcrypt.hashpw(password.encode('utf-8'),bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8')
 
     @staticmethod
     def verify_password(password:str, hashed:str)->bool:
-        return  bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
\ No newline at end of file
+        return  bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+    @staticmethod
+    async def hash_password_async(password:str)->str:
+        async with _limiter:
+            return await asyncio.get_running_loop().run_in_executor(_executor, PasswordUtils.hash_password, password)
+
+    @staticmethod
+    async def verify_password_async(password:str, hashed:str)->bool:
+        async with _limiter:
+            return await asyncio.get_running_loop().run_in_executor(_executor, PasswordUtils.verify_password, password, hashed)
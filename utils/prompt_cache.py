@@ -0,0 +1,208 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Optional
+
+from loguru import logger
+from pymongo.errors import DuplicateKeyError
+
+from prompts.prompt import general_prompt
+
+GEMINI_CONTEXT_CACHE = os.getenv("GEMINI_CONTEXT_CACHE", "1") == "1"
+GEMINI_CONTEXT_CACHE_TTL = int(os.getenv("GEMINI_CONTEXT_CACHE_TTL", "3600"))
+# Extend the cache's TTL once less than this much of it is left
+GEMINI_CONTEXT_CACHE_REFRESH_MARGIN = int(os.getenv("GEMINI_CONTEXT_CACHE_REFRESH_MARGIN", "300"))
+# After a failure (quota, prompt below the provider's minimum size, ...) wait this long before retrying
+GEMINI_CONTEXT_CACHE_RETRY_AFTER = int(os.getenv("GEMINI_CONTEXT_CACHE_RETRY_AFTER", "600"))
+# How long one worker may hold the claim to create or extend the shared cache before another takes over
+GEMINI_CONTEXT_CACHE_CLAIM_TIMEOUT = int(os.getenv("GEMINI_CONTEXT_CACHE_CLAIM_TIMEOUT", "30"))
+
+
+class PromptCache:
+    """
+    Provider-side (Gemini explicit context cache) copy of the static system prompt + tool schemas.
+    `get()` returns the cache name to pass as `cached_content`, creating the cache on first use and
+    extending its TTL shortly before it expires. Returns None whenever caching is unavailable, in
+    which case callers send the prompt and tools inline as before.
+    With a shared `collection` (see `share`) the cache name is published per fingerprint, so all
+    API workers reuse one provider-side cache instead of each creating and paying for its own.
+    One worker at a time claims the fingerprint to create or extend it; the others wait for the
+    name it publishes (or keep using the current one while it is fresh).
+    """
+
+    def __init__(self, enabled: bool = GEMINI_CONTEXT_CACHE, ttl: int = GEMINI_CONTEXT_CACHE_TTL,
+                 refresh_margin: int = GEMINI_CONTEXT_CACHE_REFRESH_MARGIN,
+                 retry_after: int = GEMINI_CONTEXT_CACHE_RETRY_AFTER,
+                 claim_timeout: int = GEMINI_CONTEXT_CACHE_CLAIM_TIMEOUT):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.retry_after = retry_after
+        self.claim_timeout = claim_timeout
+        self.name = None
+        self.key = None
+        self.expires_at = 0.0
+        self.disabled_until = 0.0
+        self.lock = asyncio.Lock()
+        self._client = None
+        self.collection = None
+
+    def share(self, collection):
+        self.collection = collection
+
+    async def _load_shared(self, key: str):
+        """Adopt the cache another worker created for the same fingerprint, if it is still fresh."""
+        if self.collection is None:
+            return
+        try:
+            shared = await self.collection.find_one({"_id": key})
+        except Exception as e:
+            logger.debug(f"Shared prompt cache lookup failed: {e}")
+            return
+        # The document may only hold another worker's claim so far
+        if shared and shared.get("name") and \
+                shared["expires_at"] > max(self.expires_at if self.key == key else 0.0, time.time()):
+            self.name = shared["name"]
+            self.key = key
+            self.expires_at = shared["expires_at"]
+
+    async def _claim(self, key: str) -> bool:
+        """
+        Claim the fingerprint to create or extend its cache. The upsert only matches when nobody
+        holds an unexpired claim; otherwise inserting the existing `_id` fails, and the claim is lost.
+        """
+        if self.collection is None:
+            return True
+        now = time.time()
+        try:
+            await self.collection.update_one(
+                {"_id": key, "claimed_until": {"$not": {"$gt": now}}},
+                {"$set": {"claimed_until": now + self.claim_timeout}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+        except Exception as e:
+            logger.debug(f"Could not claim prompt cache creation: {e}")
+            return True
+
+    async def _wait_for_shared(self, key: str):
+        """Poll for the cache the claiming worker publishes, for at most the claim timeout."""
+        deadline = time.time() + self.claim_timeout
+        while time.time() < deadline:
+            await asyncio.sleep(0.5)
+            await self._load_shared(key)
+            if self.name and self.key == key and self.expires_at - time.time() > self.refresh_margin:
+                return
+
+    async def _publish(self):
+        """Publish the cache name and release the claim."""
+        if self.collection is None:
+            return
+        try:
+            await self.collection.update_one(
+                {"_id": self.key},
+                {"$set": {"name": self.name, "expires_at": self.expires_at}, "$unset": {"claimed_until": ""}},
+                upsert=True
+            )
+        except Exception as e:
+            logger.debug(f"Could not publish prompt cache {self.name}: {e}")
+
+    async def _release(self, key: str):
+        if self.collection is None:
+            return
+        try:
+            await self.collection.update_one({"_id": key}, {"$unset": {"claimed_until": ""}})
+        except Exception as e:
+            logger.debug(f"Could not release the prompt cache claim: {e}")
+
+    @property
+    def client(self):
+        if self._client is None:
+            from google import genai
+            self._client = genai.Client()
+        return self._client
+
+    @staticmethod
+    def _declarations(tools):
+        """Gemini function declarations of `tools`, with their JSON schemas passed through as is."""
+        from google.genai import types
+        from langchain_core.utils.function_calling import convert_to_openai_tool
+        functions = [convert_to_openai_tool(t)["function"] for t in tools]
+        return [types.Tool(function_declarations=[
+            types.FunctionDeclaration(name=f["name"], description=f.get("description", ""),
+                                      parameters_json_schema=f.get("parameters"))
+            for f in functions
+        ])]
+
+    @staticmethod
+    def fingerprint(model: str, tools) -> str:
+        schemas = sorted(json.dumps({"name": t.name, "args": t.args}, sort_keys=True, default=str) for t in tools)
+        return hashlib.sha256("\n".join([model, general_prompt()] + schemas).encode("utf-8")).hexdigest()
+
+    async def get(self, model: str, tools) -> Optional[str]:
+        if not self.enabled or time.time() < self.disabled_until:
+            return None
+        key = self.fingerprint(model, tools)
+        now = time.time()
+        if self.name and self.key == key and self.expires_at - now > self.refresh_margin:
+            return self.name
+
+        async with self.lock:
+            now = time.time()
+            if self.name and self.key == key and self.expires_at - now > self.refresh_margin:
+                return self.name
+            await self._load_shared(key)
+            if self.name and self.key == key and self.expires_at - now > self.refresh_margin:
+                return self.name
+            if not await self._claim(key):
+                # Another worker is creating or extending it
+                if not (self.name and self.key == key and self.expires_at > now):
+                    await self._wait_for_shared(key)
+                return self.name if self.key == key and self.expires_at > time.time() else None
+            from google.genai import types
+            try:
+                if self.name and self.key == key and self.expires_at > now:
+                    await self.client.aio.caches.update(
+                        name=self.name,
+                        config=types.UpdateCachedContentConfig(ttl=f"{self.ttl}s")
+                    )
+                    logger.info(f"Extended prompt cache {self.name}")
+                else:
+                    cache = await self.client.aio.caches.create(
+                        model=model,
+                        config=types.CreateCachedContentConfig(
+                            display_name="kowalski-system-prompt",
+                            system_instruction=general_prompt(),
+                            tools=self._declarations(tools),
+                            ttl=f"{self.ttl}s"
+                        )
+                    )
+                    stale = self.name
+                    self.name = cache.name
+                    self.key = key
+                    logger.info(f"Created prompt cache {self.name}")
+                    # Another worker may still be using a shared cache; it expires on its own
+                    if stale and self.collection is None:
+                        await self._delete(stale)
+                self.expires_at = now + self.ttl
+                await self._publish()
+                return self.name
+            except Exception as e:
+                logger.warning(f"Prompt caching unavailable, sending the prompt inline: {e}")
+                await self._release(key)
+                self.name = None
+                self.disabled_until = now + self.retry_after
+                return None
+
+    async def _delete(self, name: str):
+        try:
+            await self.client.aio.caches.delete(name=name)
+        except Exception as e:
+            logger.debug(f"Could not delete stale prompt cache {name}: {e}")
+
+
+prompt_cache = PromptCache()
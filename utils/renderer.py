@@ -0,0 +1,223 @@
+import html
+import json
+import re
+import time
+from typing import Optional
+
+from loguru import logger
+from pydantic import ValidationError
+
+from models.response_schema import (CardBlock, ChartBlock, HtmlBlock, ListBlock, SourcesBlock,
+                                    StructuredResponse, TableBlock, TextBlock, WeatherBlock)
+
+# The Kowalski theme (dark card, standard heading sizes, rounded striped tables, gradient cards)
+STYLES = {
+    "k-root": "background-color:#1e293b;color:#f1f5f9;font-family:'Roboto',sans-serif;padding:20px;"
+              "border-radius:8px;box-shadow:1px 2px 10px rgba(0,0,0,0.6);width:100%;max-width:600px;"
+              "margin:20px auto;box-sizing:border-box;line-height:1.5",
+    "k-h1": "font-size:1.5em;margin:0 0 12px 0",
+    "k-h3": "font-size:1.2em;margin:0 0 8px 0",
+    "k-p": "margin:0 0 10px 0",
+    "k-code": "background:#0f172a;padding:1px 5px;border-radius:4px;font-family:monospace",
+    "k-list": "margin:0 0 10px 0;padding-left:22px",
+    "k-card": "background:linear-gradient(135deg,#334155,#1e3a8a);border-radius:12px;padding:16px;"
+              "margin:0 0 12px 0;box-shadow:0 2px 8px rgba(0,0,0,0.4)",
+    "k-facts": "display:grid;grid-template-columns:repeat(auto-fit,minmax(120px,1fr));gap:8px;margin-top:8px",
+    "k-fact": "background:rgba(15,23,42,0.45);border-radius:8px;padding:8px",
+    "k-label": "font-size:0.8em;color:#94a3b8",
+    "k-value": "font-weight:600",
+    "k-scroll": "overflow-x:auto;margin:0 0 12px 0;border-radius:10px",
+    "k-table": "width:100%;border-collapse:collapse;font-size:0.9em;background:#0f172a",
+    "k-th": "background:#334155;text-align:left;padding:8px 10px;white-space:nowrap",
+    "k-td": "padding:8px 10px;border-top:1px solid #1e293b",
+    "k-caption": "caption-side:bottom;font-size:0.8em;color:#94a3b8;padding:6px",
+    "k-weather": "border-radius:14px;padding:18px;margin:0 0 12px 0;background-size:cover;background-position:center",
+    "k-temp": "font-size:2.4em;font-weight:700;margin:4px 0",
+    "k-chart": "margin:0 0 12px 0",
+    "k-link": "color:#7dd3fc;text-decoration:none",
+}
+# Only expressible in a style block, so absent in inline mode
+EXTRA_CSS = (".kowalski .k-table tr:nth-child(even) td{background:#162033}"
+             ".kowalski .k-table tr:hover td{background:#1d4ed8}"
+             ".kowalski .k-link:hover{text-decoration:underline}")
+STYLE_BLOCK = "<style>" + "".join(f".kowalski .{name}{{{css}}}" for name, css in STYLES.items()) + EXTRA_CSS + "</style>"
+
+WEATHER_IMAGES = {
+    "rain": "https://images.pexels.com/photos/459451/pexels-photo-459451.jpeg",
+    "sunny": "https://images.pexels.com/photos/1169084/pexels-photo-1169084.jpeg",
+    "cloudy": "https://images.pexels.com/photos/158163/clouds-cloudporn-weather-lookup-158163.jpeg",
+    "snow": "https://images.pexels.com/photos/688660/pexels-photo-688660.jpeg",
+}
+WEATHER_KEYWORDS = [
+    ("rain", ("rain", "drizzle", "shower", "thunder", "storm")),
+    ("snow", ("snow", "sleet", "blizzard")),
+    ("cloudy", ("cloud", "overcast", "mist", "fog", "haze", "smoke")),
+]
+WEATHER_ICONS = {"rain": "🌧️", "snow": "❄️", "cloudy": "☁️", "sunny": "☀️"}
+CHART_COLORS = ("#38bdf8", "#f472b6", "#a3e635", "#fbbf24", "#c084fc")
+
+_BOLD = re.compile(r"\*\*(.+?)\*\*")
+_CODE = re.compile(r"`([^`]+)`")
+_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+class Renderer:
+    """
+    Turns a StructuredResponse into the themed HTML. Elements carry class names resolved by one
+    scoped <style> block; `inline=True` instead repeats each style on every element, which is what
+    the model used to write by hand (benchmarks/response_format.py compares the two).
+    """
+
+    def __init__(self, inline: bool = False):
+        self.inline = inline
+
+    def attr(self, name: str, extra: str = "") -> str:
+        if self.inline:
+            return f' style="{STYLES[name]}{";" + extra if extra else ""}"'
+        return f' class="{name}"' + (f' style="{extra}"' if extra else "")
+
+    def text(self, value: str) -> str:
+        escaped = html.escape(value, quote=False)
+        escaped = _BOLD.sub(r"<strong>\1</strong>", escaped)
+        return _CODE.sub(lambda m: f"<code{self.attr('k-code')}>{m.group(1)}</code>", escaped)
+
+    @staticmethod
+    def cell(value) -> str:
+        if isinstance(value, float):
+            value = round(value, 2)
+        return html.escape("" if value is None else str(value), quote=False)
+
+    def render_text(self, block: TextBlock) -> str:
+        paragraphs = [p.strip() for p in block.text.split("\n\n") if p.strip()]
+        return "".join(f"<p{self.attr('k-p')}>{self.text(p).replace(chr(10), '<br>')}</p>" for p in paragraphs)
+
+    def render_list(self, block: ListBlock) -> str:
+        tag = "ol" if block.ordered else "ul"
+        return f"<{tag}{self.attr('k-list')}>" + "".join(f"<li>{self.text(i)}</li>" for i in block.items) + f"</{tag}>"
+
+    def render_facts(self, facts: dict) -> str:
+        if not facts:
+            return ""
+        return f"<div{self.attr('k-facts')}>" + "".join(
+            f"<div{self.attr('k-fact')}><div{self.attr('k-label')}>{self.cell(k)}</div>"
+            f"<div{self.attr('k-value')}>{self.cell(v)}</div></div>" for k, v in facts.items()
+        ) + "</div>"
+
+    def render_card(self, block: CardBlock) -> str:
+        body = f"<p{self.attr('k-p')}>{self.text(block.text)}</p>" if block.text else ""
+        return (f"<div{self.attr('k-card')}><h3{self.attr('k-h3')}>{self.text(block.title)}</h3>"
+                f"{body}{self.render_facts(block.facts)}</div>")
+
+    def render_table(self, block: TableBlock) -> str:
+        th = "".join(f"<th{self.attr('k-th')}>{self.cell(c)}</th>" for c in block.columns)
+        td = self.attr("k-td")
+        rows = "".join("<tr>" + "".join(f"<td{td}>{self.cell(v)}</td>" for v in row) + "</tr>" for row in block.rows)
+        caption = f"<caption{self.attr('k-caption')}>{self.text(block.caption)}</caption>" if block.caption else ""
+        return (f"<div{self.attr('k-scroll')}><table{self.attr('k-table')}>{caption}"
+                f"<thead><tr>{th}</tr></thead><tbody>{rows}</tbody></table></div>")
+
+    def render_weather(self, block: WeatherBlock) -> str:
+        condition = block.condition.lower()
+        kind = next((k for k, words in WEATHER_KEYWORDS if any(w in condition for w in words)), "sunny")
+        background = (f"background-image:linear-gradient(rgba(15,23,42,0.55),rgba(15,23,42,0.55)),"
+                      f"url('{WEATHER_IMAGES[kind]}')")
+        facts = {}
+        if block.feels_like is not None:
+            facts["🌡️ Feels like"] = f"{block.feels_like}{block.unit}"
+        if block.humidity is not None:
+            facts["💧 Humidity"] = f"{block.humidity}%"
+        if block.wind is not None:
+            facts["💨 Wind"] = f"{block.wind} m/s"
+        temperature = f"<div{self.attr('k-temp')}>{self.cell(f'{block.temperature}{block.unit}')}</div>" \
+            if block.temperature is not None else ""
+        return (f"<div{self.attr('k-weather', background)}><h3{self.attr('k-h3')}>{WEATHER_ICONS[kind]} "
+                f"{self.text(block.city)}</h3>{temperature}<div>{self.text(block.condition.capitalize())}</div>"
+                f"{self.render_facts(facts)}</div>")
+
+    def render_chart(self, block: ChartBlock) -> str:
+        width, height, pad = 560, 220, 28
+        values = [v for s in block.series for v in s.values] or [0.0]
+        top = max(max(values), 0.0) or 1.0
+        n = max(len(block.labels), 1)
+        step = (width - 2 * pad) / n
+
+        def y(v):
+            return height - pad - max(v, 0.0) / top * (height - 2 * pad)
+
+        parts = []
+        for si, series in enumerate(block.series):
+            color = CHART_COLORS[si % len(CHART_COLORS)]
+            if block.kind == "line":
+                points = " ".join(f"{pad + step * (i + 0.5):.1f},{y(v):.1f}" for i, v in enumerate(series.values))
+                parts.append(f'<polyline fill="none" stroke="{color}" stroke-width="2" points="{points}"/>')
+            else:
+                bar = step * 0.8 / len(block.series)
+                for i, v in enumerate(series.values):
+                    x = pad + step * i + step * 0.1 + bar * si
+                    parts.append(f'<rect x="{x:.1f}" y="{y(v):.1f}" width="{bar:.1f}" '
+                                 f'height="{height - pad - y(v):.1f}" rx="3" fill="{color}"/>')
+        labels = "".join(
+            f'<text x="{pad + step * (i + 0.5):.1f}" y="{height - 8}" text-anchor="middle">{self.cell(l)}</text>'
+            for i, l in enumerate(block.labels)
+        )
+        legend = "".join(
+            f'<text x="{width - pad}" y="{16 + 14 * i}" text-anchor="end" fill="{CHART_COLORS[i % len(CHART_COLORS)]}">'
+            f"{self.cell(s.name)}</text>" for i, s in enumerate(block.series)
+        )
+        title = f"<h3{self.attr('k-h3')}>{self.text(block.title)}</h3>" if block.title else ""
+        return (f"<div{self.attr('k-chart')}>{title}<svg viewBox=\"0 0 {width} {height}\" width=\"100%\" "
+                f"font-size=\"11\" fill=\"#cbd5e1\"><text x=\"{pad}\" y=\"14\">{self.cell(top)}</text>"
+                f"<line x1=\"{pad}\" y1=\"{height - pad}\" x2=\"{width - pad}\" y2=\"{height - pad}\" stroke=\"#475569\"/>"
+                f"{''.join(parts)}{labels}{legend}</svg></div>")
+
+    def render_sources(self, block: SourcesBlock) -> str:
+        items = "".join(
+            f"<li><a{self.attr('k-link')} href=\"{html.escape(s.url)}\" target=\"_blank\" rel=\"noopener\">"
+            f"{self.text(s.title)}</a></li>" for s in block.sources if s.url.startswith(("http://", "https://"))
+        )
+        return f"<h3{self.attr('k-h3')}>Sources</h3><ul{self.attr('k-list')}>{items}</ul>"
+
+    def render(self, response: StructuredResponse) -> str:
+        parts = [STYLE_BLOCK] if not self.inline else []
+        if response.title:
+            parts.append(f"<h1{self.attr('k-h1')}>{self.text(response.title)}</h1>")
+        for block in response.blocks:
+            if isinstance(block, HtmlBlock):
+                parts.append(block.html)
+            else:
+                parts.append(getattr(self, f"render_{block.type}")(block))
+        root = ' class="kowalski"' + (self.attr("k-root") if self.inline else ' style="' + STYLES["k-root"] + '"')
+        return f"<div{root}>{''.join(parts)}</div>"
+
+
+renderer = Renderer()
+
+
+def parse_reply(content: str) -> Optional[StructuredResponse]:
+    """The StructuredResponse in a model reply (bare JSON or a ```json fence), or None."""
+    text = _FENCE.sub("", content.strip())
+    if not text.startswith("{"):
+        start, end = text.find("{"), text.rfind("}")
+        if start < 0 or end < start:
+            return None
+        text = text[start:end + 1]
+    try:
+        return StructuredResponse.model_validate(json.loads(text))
+    except (ValueError, ValidationError):
+        return None
+
+
+def render_reply(content: str) -> str:
+    """
+    HTML for an AI message. Structured replies are rendered; HTML (replies from before structured
+    mode, or when the model ignored the format) passes through; anything else becomes a text block.
+    """
+    response = parse_reply(content)
+    if response is None:
+        if content.lstrip().startswith("<"):
+            return content
+        response = StructuredResponse(blocks=[TextBlock(text=content)])
+    started = time.perf_counter()
+    rendered = renderer.render(response)
+    logger.debug(f"Rendered {len(response.blocks)} blocks in {(time.perf_counter() - started) * 1000:.2f}ms")
+    return rendered
@@ -0,0 +1,323 @@
+import asyncio
+import hashlib
+import os
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
+
+import numpy as np
+from loguru import logger
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "0") == "1"
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2000"))
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.85"))
+# Also keep answers in Mongo so every API worker can serve what any of them has cached
+RESPONSE_CACHE_SHARED = os.getenv("RESPONSE_CACHE_SHARED", "1") == "1"
+
+# TTL per question category in seconds; 0 means never cache
+CATEGORY_TTLS = {
+    "weather": 10 * 60,
+    "news": 15 * 60,
+    "definition": 7 * 24 * 3600,
+    "general": 24 * 3600,
+    "personal": 0,
+}
+
+CATEGORY_KEYWORDS = [
+    # user specific data and side effects must always reach the agent
+    ("personal", {"my", "mine", "database", "databases", "collection", "collections", "record", "records",
+                  "script", "scripts", "insert", "update", "delete", "add", "write", "run", "file"}),
+    ("weather", {"weather", "temperature", "forecast", "rain", "raining", "humidity", "wind", "sunny", "snow"}),
+    ("news", {"news", "latest", "today", "current", "currently", "now", "price", "stock", "score", "live",
+              "recent", "yesterday", "tonight", "election", "trending"}),
+    ("definition", {"who", "what", "define", "definition", "meaning", "explain", "history", "means"}),
+]
+
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "of", "in", "on", "at", "to", "for", "and", "or",
+    "me", "i", "you", "it", "its", "this", "that", "do", "does", "did", "can", "could", "would", "please",
+    "tell", "show", "give", "about", "with", "by", "from", "s", "whats", "what", "who", "whos", "how",
+}
+# Words that don't change the answer if one phrasing has them and the other doesn't
+FILLER = {"today", "now", "current", "currently", "right", "like", "info", "information", "details",
+          "quick", "brief", "briefly", "some", "know", "want", "need", "kowalski", "hey", "hi"}
+
+_NON_WORD = re.compile(r"[^a-z0-9\s]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(prompt: str) -> str:
+    text = _NON_WORD.sub(" ", prompt.lower().replace("'", ""))
+    return _SPACES.sub(" ", text).strip()
+
+
+def categorize(tokens) -> str:
+    words = set(tokens)
+    for category, keywords in CATEGORY_KEYWORDS:
+        if words & keywords:
+            return category
+    return "general"
+
+
+class ResponseCache:
+    """
+    Opt-in cache of final agent answers for self-contained questions.
+    Lookup is an exact match on the normalized prompt, then a nearest-neighbour search over hashed
+    TF-IDF vectors of the cached prompts. A similar prompt only counts as a hit when it has the same
+    category and contains all of the query's key terms, so "weather in Paris" never answers
+    "weather in London". Entries expire by category TTL and the cache is LRU-bounded.
+    Everything is computed locally; `clock` can be injected for tests.
+    With a shared `collection` (see `share`), `lookup`/`store` also read and write exact-match
+    entries in Mongo, so an answer cached by one API worker is served by all of them.
+    """
+
+    def __init__(self, enabled: bool = RESPONSE_CACHE_ENABLED, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+                 similarity: float = RESPONSE_CACHE_SIMILARITY, ttls: Optional[Dict[str, int]] = None,
+                 dims: int = 1024, clock: Callable[[], float] = time.time):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self.ttls = {**CATEGORY_TTLS, **(ttls or {})}
+        self.dims = dims
+        self.clock = clock
+        self.entries: "OrderedDict[str, dict]" = OrderedDict()
+        self.vectors = np.zeros((max_entries, dims), dtype=np.float32)
+        self.row_keys = [None] * max_entries
+        self.free_rows = list(range(max_entries - 1, -1, -1))
+        self.doc_freq = np.zeros(dims, dtype=np.float32)
+        self.hits = 0
+        self.similar_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.collection = None
+
+    def share(self, collection):
+        """Back the cache with a Mongo collection shared by all workers (TTL index on `expires_at`)."""
+        if self.enabled and RESPONSE_CACHE_SHARED:
+            self.collection = collection
+
+    async def ensure_indexes(self):
+        if self.collection is not None:
+            await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    @staticmethod
+    def _terms(tokens):
+        return [t for t in tokens if t not in STOPWORDS and t not in FILLER]
+
+    def _vector(self, terms) -> np.ndarray:
+        vector = np.zeros(self.dims, dtype=np.float32)
+        features = terms + [f"{a} {b}" for a, b in zip(terms, terms[1:])]
+        for feature in features:
+            index = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=4).digest(), "little") % self.dims
+            vector[index] = 1.0
+        return vector
+
+    def _remove(self, key: str):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        row = entry["row"]
+        self.doc_freq -= self.vectors[row]
+        self.vectors[row] = 0
+        self.row_keys[row] = None
+        self.free_rows.append(row)
+
+    def _expire(self, key: str, entry: dict) -> bool:
+        if entry["expires_at"] > self.clock():
+            return False
+        self._remove(key)
+        return True
+
+    def get(self, prompt: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        key = normalize(prompt)
+        tokens = key.split()
+        category = categorize(tokens)
+        if not self.ttls.get(category):
+            return None
+
+        entry = self.entries.get(key)
+        if entry and not self._expire(key, entry):
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry["response"]
+
+        terms = self._terms(tokens)
+        if not terms or not self.entries:
+            self.misses += 1
+            return None
+        query = self._vector(terms)
+        n = len(self.entries)
+        idf = np.log((n + 1) / (self.doc_freq + 1)) + 1
+        weighted_query = query * idf
+        weighted = self.vectors * idf
+        norms = np.linalg.norm(weighted, axis=1) * (np.linalg.norm(weighted_query) or 1.0)
+        scores = np.divide(weighted @ weighted_query, norms, out=np.zeros(len(norms), dtype=np.float32), where=norms > 0)
+
+        key_terms = set(terms)
+        for row in np.argsort(-scores)[:5]:
+            if scores[row] < self.similarity:
+                break
+            candidate_key = self.row_keys[row]
+            candidate = self.entries.get(candidate_key)
+            if candidate is None or self._expire(candidate_key, candidate):
+                continue
+            if candidate["category"] != category or not key_terms <= candidate["terms"]:
+                continue
+            self.entries.move_to_end(candidate_key)
+            self.hits += 1
+            self.similar_hits += 1
+            logger.debug(f"Response cache similar hit ({scores[row]:.2f}): '{key}' ~ '{candidate_key}'")
+            return candidate["response"]
+
+        self.misses += 1
+        return None
+
+    def put(self, prompt: str, response: str, expires_at: Optional[float] = None):
+        """`expires_at` (a timestamp) overrides the category TTL, e.g. for an entry adopted from Mongo."""
+        if not self.enabled:
+            return
+        key = normalize(prompt)
+        tokens = key.split()
+        category = categorize(tokens)
+        ttl = self.ttls.get(category, 0)
+        if not ttl or not key:
+            return
+        self._remove(key)
+        while len(self.entries) >= self.max_entries:
+            self._remove(next(iter(self.entries)))
+        terms = self._terms(tokens)
+        row = self.free_rows.pop()
+        self.vectors[row] = self._vector(terms)
+        self.doc_freq += self.vectors[row]
+        self.row_keys[row] = key
+        self.entries[key] = {
+            "response": response,
+            "category": category,
+            "terms": set(terms),
+            "row": row,
+            "expires_at": self.clock() + ttl if expires_at is None else expires_at,
+        }
+
+    async def lookup(self, prompt: str) -> Optional[str]:
+        """`get`, falling back to an exact match in the shared collection."""
+        response = self.get(prompt)
+        if response is not None or self.collection is None:
+            return response
+        key = normalize(prompt)
+        if not self.ttls.get(categorize(key.split())):
+            return None
+        try:
+            entry = await self.collection.find_one(
+                {"_id": key, "expires_at": {"$gt": datetime.fromtimestamp(self.clock(), timezone.utc)}},
+                {"response": 1, "expires_at": 1}
+            )
+        except Exception as e:
+            logger.warning(f"Shared response cache unavailable: {e}")
+            return None
+        if entry is None:
+            return None
+        # Keep the shared entry's expiry, otherwise each adopting worker would restart the TTL
+        expires_at = entry["expires_at"]
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        self.put(prompt, entry["response"], expires_at=expires_at.timestamp())
+        self.misses -= 1
+        self.hits += 1
+        self.shared_hits += 1
+        return entry["response"]
+
+    async def store(self, prompt: str, response: str):
+        """`put`, also writing the entry to the shared collection."""
+        self.put(prompt, response)
+        entry = self.entries.get(normalize(prompt))
+        if entry is None or self.collection is None:
+            return
+        try:
+            await self.collection.update_one(
+                {"_id": normalize(prompt)},
+                {"$set": {"response": response,
+                          "expires_at": datetime.fromtimestamp(entry["expires_at"], timezone.utc)}},
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"Could not write to the shared response cache: {e}")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "shared": self.collection is not None,
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "similar_hits": self.similar_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+response_cache = ResponseCache()
+
+
+async def run_tests():
+    now = [1000.0]
+    cache = ResponseCache(enabled=True, max_entries=3, clock=lambda: now[0])
+
+    cache.put("Who is Pablo Escobar?", "<div>escobar</div>")
+    assert cache.get("who is pablo escobar") == "<div>escobar</div>", "exact normalized match failed"
+    assert cache.get("Who was Pablo Escobar??") == "<div>escobar</div>", "similar match failed"
+    assert cache.get("Who is Pablo Picasso?") is None, "different entity must miss"
+    print("✅ exact + similar matching passed")
+
+    cache.put("What's the weather in Paris", "<div>paris weather</div>")
+    assert cache.get("weather in paris today") == "<div>paris weather</div>", "filler words should not matter"
+    assert cache.get("weather in London") is None, "different city must miss"
+    now[0] += CATEGORY_TTLS["weather"] + 1
+    assert cache.get("What's the weather in Paris") is None, "weather entry should expire"
+    assert cache.get("who is pablo escobar") is not None, "definition entry should outlive weather"
+    print("✅ category TTLs passed")
+
+    cache.put("show my database records", "<div>private</div>")
+    assert cache.get("show my database records") is None, "personal queries must not be cached"
+    for i in range(5):
+        cache.put(f"define word{i}", f"{i}")
+    assert len(cache.entries) == 3 and cache.get("define word4") == "4", "LRU bound failed"
+    print("✅ personal queries + LRU bound passed")
+    print(cache.stats())
+
+    class SharedCollection:
+        def __init__(self):
+            self.docs = {}
+
+        async def find_one(self, query, projection=None):
+            doc = self.docs.get(query["_id"])
+            return doc if doc and doc["expires_at"] > query["expires_at"]["$gt"] else None
+
+        async def update_one(self, query, update, upsert=False):
+            self.docs[query["_id"]] = dict(update["$set"])
+
+    shared = SharedCollection()
+    worker_a = ResponseCache(enabled=True, clock=lambda: now[0])
+    worker_b = ResponseCache(enabled=True, clock=lambda: now[0])
+    worker_a.collection = worker_b.collection = shared
+    await worker_a.store("Who is Ada Lovelace?", "<div>ada</div>")
+    assert await worker_b.lookup("who is ada lovelace") == "<div>ada</div>", "other worker should see the entry"
+    assert worker_b.stats()["shared_hits"] == 1 and worker_b.get("who is ada lovelace") == "<div>ada</div>"
+    now[0] += CATEGORY_TTLS["definition"] - 60
+    worker_d = ResponseCache(enabled=True, clock=lambda: now[0])
+    worker_d.collection = shared
+    assert await worker_d.lookup("who is ada lovelace") == "<div>ada</div>"
+    now[0] += 61
+    assert worker_d.get("who is ada lovelace") is None, "adopted entry must keep the shared expiry"
+    worker_c = ResponseCache(enabled=True, clock=lambda: now[0])
+    worker_c.collection = shared
+    assert await worker_c.lookup("who is ada lovelace") is None, "shared entry should expire"
+    print("✅ shared cache across workers passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_tests())
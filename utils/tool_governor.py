@@ -0,0 +1,399 @@
+import asyncio
+import contextvars
+import json
+import os
+import re
+import secrets
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.tools import StructuredTool
+from loguru import logger
+
+from utils.context_window import CHARS_PER_TOKEN, estimate_tokens, shorten
+from utils.response_cache import STOPWORDS
+
+TOOL_GOVERNOR_ENABLED = os.getenv("TOOL_GOVERNOR_ENABLED", "1") == "1"
+# Largest tool result that reaches the model as is; larger ones are condensed to this size
+TOOL_OUTPUT_MAX_TOKENS = int(os.getenv("TOOL_OUTPUT_MAX_TOKENS", "4000"))
+# Per-tool overrides: "get_page_content=3000,read_records=2500,run_script=2000"
+TOOL_OUTPUT_BUDGETS = {
+    "get_page_content": 3000,
+    "read_records": 2500,
+    "run_script": 2000,
+    **{
+        name.strip(): int(budget)
+        for name, _, budget in (item.partition("=") for item in os.getenv("TOOL_OUTPUT_BUDGETS", "").split(","))
+        if name.strip() and budget.strip()
+    },
+}
+# Tokens all tool results of one agent run may add together; once spent, results shrink to the minimum
+TOOL_TURN_BUDGET_TOKENS = int(os.getenv("TOOL_TURN_BUDGET_TOKENS", "16000"))
+TOOL_OUTPUT_MIN_TOKENS = int(os.getenv("TOOL_OUTPUT_MIN_TOKENS", "400"))
+# Size of one read_tool_output page
+TOOL_OUTPUT_PAGE_TOKENS = int(os.getenv("TOOL_OUTPUT_PAGE_TOKENS", "2000"))
+TOOL_OUTPUT_TTL_SECONDS = float(os.getenv("TOOL_OUTPUT_TTL_SECONDS", "900"))
+TOOL_OUTPUT_STORE_MAX_MB = float(os.getenv("TOOL_OUTPUT_STORE_MAX_MB", "64"))
+
+READ_TOOL_NAME = "read_tool_output"
+# Program output: the end (results, tracebacks) matters as much as the start, so keep head and tail
+HEAD_TAIL_FIELDS = {"stdout", "stderr", "traceback", "logs"}
+LEAD_SENTENCES = 2
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9_-]{2,}")
+_SENTENCE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def _terms(*texts: str) -> set:
+    return {w for text in texts for w in _WORD.findall(text.lower()) if w not in STOPWORDS}
+
+
+def extract(text: str, max_tokens: int, query: str = "") -> str:
+    """
+    Cheap extractive condensing: the opening sentences plus the sentences sharing the most terms
+    with `query`, in their original order, with gaps marked. Falls back to head and tail without
+    query terms.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    terms = _terms(query)
+    sentences = [s for s in _SENTENCE.split(text) if s.strip()]
+    if not terms or len(sentences) <= LEAD_SENTENCES:
+        return shorten(text, max_tokens)
+    limit = max_tokens * CHARS_PER_TOKEN
+    ranked = sorted(range(LEAD_SENTENCES, len(sentences)),
+                    key=lambda i: (-len(terms & _terms(sentences[i])), i))
+    chosen, used = set(), 0
+    for i in list(range(LEAD_SENTENCES)) + ranked:
+        size = len(sentences[i]) + 1
+        if used + size > limit:
+            if i < LEAD_SENTENCES:
+                continue
+            break
+        chosen.add(i)
+        used += size
+    parts, previous = [], -1
+    for i in sorted(chosen):
+        if i != previous + 1:
+            parts.append("[...]")
+        parts.append(sentences[i])
+        previous = i
+    if previous != len(sentences) - 1:
+        parts.append("[...]")
+    return " ".join(parts)
+
+
+def _condense_value(value: Any, max_tokens: int, query: str, field: str = "") -> Any:
+    """Shrink the heaviest parts of a JSON tool result: long lists keep their leading items, long
+    strings are extracted (or cut to head and tail for program output); small fields stay as they are."""
+    if isinstance(value, str):
+        if estimate_tokens(value) <= max_tokens:
+            return value
+        return shorten(value, max_tokens) if field in HEAD_TAIL_FIELDS else extract(value, max_tokens, query)
+    if isinstance(value, list):
+        kept, used = [], 0
+        for item in value:
+            size = estimate_tokens(json.dumps(item, ensure_ascii=False, default=str))
+            if used + size > max_tokens:
+                break
+            kept.append(item)
+            used += size
+        if len(kept) < len(value):
+            if not kept and value:
+                kept.append(_condense_value(value[0], max_tokens, query, field))
+            kept.append(f"[{len(value) - len(kept)} more items omitted]")
+        return kept
+    if isinstance(value, dict):
+        sizes = {k: estimate_tokens(json.dumps(v, ensure_ascii=False, default=str)) for k, v in value.items()}
+        # Fields are given what they need smallest first, so one huge field can't starve the rest
+        remaining, out = max_tokens, {}
+        for i, key in enumerate(sorted(value, key=sizes.get)):
+            share = remaining // (len(value) - i)
+            out[key] = value[key] if sizes[key] <= share else _condense_value(value[key], share, query, key)
+            remaining -= min(sizes[key], share)
+        return {k: out[k] for k in value}
+    return value
+
+
+def condense(text: str, max_tokens: int, query: str = "") -> str:
+    """Condense a tool result (JSON or plain text) to roughly `max_tokens`."""
+    try:
+        value = json.loads(text)
+    except ValueError:
+        return extract(text, max_tokens, query)
+    # Shares don't count keys and separators, so overshoots are retried with a proportionally smaller
+    # budget to keep the JSON valid; a final cut guarantees the budget
+    target = max_tokens
+    for _ in range(3):
+        condensed = json.dumps(_condense_value(value, target, query), ensure_ascii=False, default=str)
+        size = estimate_tokens(condensed)
+        if size <= max_tokens:
+            return condensed
+        target = max(1, target * max_tokens // size - 8)
+    return shorten(condensed, max_tokens)
+
+
+class ToolOutputStore:
+    """Full tool results by handle, LRU within `max_bytes` and expired after `ttl` seconds."""
+
+    def __init__(self, ttl: float = TOOL_OUTPUT_TTL_SECONDS, max_bytes: int = int(TOOL_OUTPUT_STORE_MAX_MB * 1024 * 1024),
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.entries: "OrderedDict[str, Tuple[float, str, str]]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def put(self, tool: str, text: str) -> str:
+        handle = "out-" + secrets.token_hex(5)
+        now = self.clock()
+        self.entries[handle] = (now + self.ttl, tool, text)
+        self.bytes += len(text)
+        while len(self.entries) > 1 and (self.bytes > self.max_bytes or next(iter(self.entries.values()))[0] < now):
+            _, (_, _, evicted) = self.entries.popitem(last=False)
+            self.bytes -= len(evicted)
+            self.evictions += 1
+        return handle
+
+    def get(self, handle: str) -> Optional[Tuple[str, str]]:
+        entry = self.entries.get(handle)
+        if entry is None or entry[0] < self.clock():
+            if entry is not None:
+                del self.entries[handle]
+                self.bytes -= len(entry[2])
+            self.misses += 1
+            return None
+        self.entries.move_to_end(handle)
+        self.hits += 1
+        return entry[1], entry[2]
+
+    def stats(self) -> dict:
+        return {"entries": len(self.entries), "bytes": self.bytes, "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions}
+
+
+class TurnBudget:
+    """Tool-output tokens left for one agent run, and the question results are condensed towards."""
+
+    def __init__(self, query: str = "", tokens: int = TOOL_TURN_BUDGET_TOKENS):
+        self.query = query
+        self.remaining = tokens
+        self.raw_tokens: Dict[str, int] = {}
+        self.sent_tokens: Dict[str, int] = {}
+
+
+_turn: contextvars.ContextVar[Optional[TurnBudget]] = contextvars.ContextVar("tool_turn", default=None)
+
+
+class ToolGovernor:
+    """
+    Size limit between MCP tool results and the agent's context. A result larger than its tool's
+    budget (TOOL_OUTPUT_BUDGETS, else TOOL_OUTPUT_MAX_TOKENS), or than what is left of the run's
+    TOOL_TURN_BUDGET_TOKENS, is condensed locally: leading list items, sentences matching the
+    question, head and tail of program output. The full result is kept in `store`, and the model
+    can page through it or search it by handle with the `read_tool_output` tool.
+    """
+
+    def __init__(self, budgets: Optional[Dict[str, int]] = None, default_budget: int = TOOL_OUTPUT_MAX_TOKENS,
+                 min_tokens: int = TOOL_OUTPUT_MIN_TOKENS, page_tokens: int = TOOL_OUTPUT_PAGE_TOKENS,
+                 store: Optional[ToolOutputStore] = None, enabled: bool = TOOL_GOVERNOR_ENABLED):
+        self.budgets = budgets if budgets is not None else TOOL_OUTPUT_BUDGETS
+        self.default_budget = default_budget
+        self.min_tokens = min_tokens
+        self.page_tokens = page_tokens
+        self.store = store if store is not None else ToolOutputStore()
+        self.enabled = enabled
+        self.results = 0
+        self.condensed = 0
+        self.retrievals = 0
+        self.tokens_in = 0
+        self.tokens_out = 0
+        self._source: Optional[List[StructuredTool]] = None
+        self._wrapped: List[StructuredTool] = []
+
+    @contextmanager
+    def turn(self, query: str = "", tokens: int = TOOL_TURN_BUDGET_TOKENS):
+        """Scope one agent run: tool calls made inside share its token budget."""
+        budget = TurnBudget(query, tokens)
+        token = _turn.set(budget)
+        try:
+            yield budget
+        finally:
+            _turn.reset(token)
+
+    def budget_for(self, tool: str) -> int:
+        budget = self.budgets.get(tool, self.default_budget)
+        turn = _turn.get()
+        if turn is not None:
+            budget = min(budget, max(turn.remaining, self.min_tokens))
+        return budget
+
+    def _store(self, tool: str, arguments: dict, text: str, raw: int, budget: int) -> Tuple[str, str, int, str]:
+        """Keep the full result; returns its handle, the header, and the size and query to condense to."""
+        turn = _turn.get()
+        handle = self.store.put(tool, text)
+        query = " ".join([turn.query if turn else ""] + [str(v) for v in arguments.values() if isinstance(v, str)])
+        header = (f'[{tool} output condensed from {raw} to about {budget} tokens. Full output stored as handle '
+                  f'"{handle}": call {READ_TOOL_NAME}(handle="{handle}", query=...) to search it, or with '
+                  f'offset=... to page through it.]\n')
+        return handle, header, max(budget - estimate_tokens(header), self.min_tokens // 2), query
+
+    def _account(self, tool: str, raw: int, out: str, handle: Optional[str] = None) -> str:
+        sent = estimate_tokens(out)
+        if handle:
+            self.condensed += 1
+            logger.info(f"Tool output of {tool} condensed: {raw} -> {sent} tokens ({handle})")
+        self.results += 1
+        self.tokens_in += raw
+        self.tokens_out += sent
+        turn = _turn.get()
+        if turn is not None:
+            turn.remaining -= sent
+            turn.raw_tokens[tool] = turn.raw_tokens.get(tool, 0) + raw
+            turn.sent_tokens[tool] = turn.sent_tokens.get(tool, 0) + sent
+        return out
+
+    def govern(self, tool: str, arguments: dict, text: str) -> str:
+        raw = estimate_tokens(text)
+        budget = self.budget_for(tool)
+        if raw <= budget:
+            return self._account(tool, raw, text)
+        handle, header, size, query = self._store(tool, arguments, text, raw, budget)
+        return self._account(tool, raw, header + condense(text, size, query), handle)
+
+    async def agovern(self, tool: str, arguments: dict, text: str) -> str:
+        """
+        `govern` with only `condense` (milliseconds for large results) in a worker thread; the store,
+        counters and turn budget are updated on the event loop, like every other call.
+        """
+        raw = estimate_tokens(text)
+        budget = self.budget_for(tool)
+        if raw <= budget:
+            return self._account(tool, raw, text)
+        handle, header, size, query = self._store(tool, arguments, text, raw, budget)
+        return self._account(tool, raw, header + await asyncio.to_thread(condense, text, size, query), handle)
+
+    def read(self, handle: str, query: str = "", offset: int = 0) -> str:
+        """A page of a stored result from character `offset`, or its passages matching `query`."""
+        self.retrievals += 1
+        entry = self.store.get(handle)
+        if entry is None:
+            return json.dumps({"error": f"Unknown or expired handle {handle!r}; call the original tool again"})
+        tool, text = entry
+        if query:
+            return json.dumps({"handle": handle, "tool": tool, "query": query,
+                               "passages": extract(text, self.page_tokens, query)}, ensure_ascii=False)
+        size = self.page_tokens * CHARS_PER_TOKEN
+        offset = max(0, min(offset, len(text)))
+        end = min(len(text), offset + size)
+        return json.dumps({"handle": handle, "tool": tool, "offset": offset, "total_chars": len(text),
+                           "next_offset": end if end < len(text) else None, "content": text[offset:end]},
+                          ensure_ascii=False)
+
+    def read_tool(self) -> StructuredTool:
+        async def read_tool_output(handle: str, query: str = "", offset: int = 0) -> str:
+            return self.read(handle, query, offset)
+
+        return StructuredTool.from_function(
+            coroutine=read_tool_output,
+            name=READ_TOOL_NAME,
+            description=(
+                "Read more of a tool result that was condensed to fit the context. `handle` is the one given "
+                "in the condensed result. With `query`, returns the passages that best match it; otherwise "
+                f"returns about {self.page_tokens} tokens of the raw result starting at character `offset` "
+                "(use `next_offset` to continue)."
+            ),
+        )
+
+    def _governed(self, tool: StructuredTool) -> StructuredTool:
+        async def call_tool(**arguments):
+            # Looked up per call, so wrappers added to the pooled tool later (e.g. benchmarks) still apply
+            text = await tool.coroutine(**arguments)
+            if len(text) > 256 * 1024:
+                # Condensing large results takes milliseconds; keep it off the event loop
+                return await self.agovern(tool.name, arguments, text)
+            return self.govern(tool.name, arguments, text)
+
+        return tool.model_copy(update={"coroutine": call_tool})
+
+    def wrap(self, tools: List[StructuredTool]) -> List[StructuredTool]:
+        """The pooled MCP tools with governed results, plus `read_tool_output`; rebuilt only when the tool list changes."""
+        if not self.enabled:
+            return tools
+        if tools is not self._source:
+            self._wrapped = [self._governed(t) for t in tools] + [self.read_tool()]
+            self._source = tools
+        return self._wrapped
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "results": self.results,
+            "condensed": self.condensed,
+            "tokens_in": self.tokens_in,
+            "tokens_out": self.tokens_out,
+            "tokens_saved": self.tokens_in - self.tokens_out,
+            "retrievals": self.retrievals,
+            "store": self.store.stats(),
+        }
+
+
+tool_governor = ToolGovernor()
+
+
+async def run_tests():
+    governor = ToolGovernor(budgets={"read_records": 300}, default_budget=500, min_tokens=100, page_tokens=200,
+                            store=ToolOutputStore(ttl=60), enabled=True)
+
+    small = json.dumps({"city": "Cuttack", "temperature": 27.4})
+    assert governor.govern("get_weather", {"city": "Cuttack"}, small) == small, "small results pass unchanged"
+    print("✅ small results pass through")
+
+    records = [{"patient_id": i, "age": 40 + i % 30, "glucose": 90 + i % 50, "notes": "stable"} for i in range(500)]
+    raw = json.dumps({"status": "success", "collection": "patients", "records": records, "count": 500})
+    out = governor.govern("read_records", {"collection": "patients"}, raw)
+    assert estimate_tokens(out) <= 330, estimate_tokens(out)
+    handle = re.search(r'handle "(out-[0-9a-f]+)"', out).group(1)
+    body = json.loads(out.split("\n", 1)[1])
+    assert body["status"] == "success" and body["count"] == 500 and "more items omitted" in body["records"][-1]
+    page = json.loads(governor.read(handle, offset=0))
+    assert page["content"] == raw[:800] and page["next_offset"] == 800 and page["total_chars"] == len(raw)
+    print("✅ records condensed to budget, full result paged by handle")
+
+    filler = "Unrelated filler sentence about nothing in particular. " * 300
+    page_text = "Quantum computing uses qubits. " + filler + "Error correction is the main hurdle for qubits today. " + filler
+    with governor.turn(query="what is the hurdle in quantum error correction?", tokens=600) as turn:
+        out = governor.govern("get_page_content", {"link": "https://example.org"}, json.dumps({"url": "x", "data": page_text}))
+        assert "Quantum computing uses qubits." in out and "Error correction is the main hurdle" in out, out[:600]
+        assert turn.remaining < 600 - 300 and turn.raw_tokens["get_page_content"] > 5000
+        second = governor.govern("get_page_content", {"link": "https://example.org/2"}, json.dumps({"data": page_text}))
+        assert estimate_tokens(second) <= 110, "exhausted turn budget shrinks results to the minimum"
+    print("✅ relevant sentences kept, turn budget enforced")
+
+    stdout = "\n".join(f"step {i}" for i in range(2000)) + "\nTraceback: ValueError: bad input"
+    out = governor.govern("run_script", {"filename": "x.py"}, json.dumps({"stdout": stdout, "stderr": "", "exit_code": 1}))
+    assert '"exit_code": 1' in out and "ValueError: bad input" in out and "step 0" in out
+    print("✅ program output keeps head and tail")
+
+    handle = re.search(r'handle "(out-[0-9a-f]+)"', out).group(1)
+    found = json.loads(await governor.read_tool().ainvoke({"handle": handle, "query": "ValueError traceback"}))
+    assert "ValueError" in found["passages"]
+    assert "error" in json.loads(governor.read("out-missing"))
+    print("✅ read_tool_output tool passed")
+
+    big = json.dumps({"stdout": "x" * (300 * 1024), "stderr": "", "exit_code": 0})
+    with governor.turn(query="run it") as turn:
+        outs = await asyncio.gather(*(governor.agovern("run_script", {}, big) for _ in range(4)))
+        assert len({re.search(r'handle "(out-[0-9a-f]+)"', o).group(1) for o in outs}) == 4
+        assert turn.raw_tokens["run_script"] == 4 * estimate_tokens(big)
+    print("✅ concurrent large results condensed off the loop")
+    print(governor.stats())
+
+
+if __name__ == "__main__":
+    asyncio.run(run_tests())
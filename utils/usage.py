@@ -0,0 +1,74 @@
+import os
+from typing import Optional
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, generate_latest, multiprocess
+except ImportError:  # optional: `pip install prometheus_client` enables GET /metrics/prometheus
+    CollectorRegistry = None
+
+# With several API workers each process counts separately; in prometheus_client's multiprocess mode
+# they write to files in this directory and every worker serves the sum (api.py sets it for API_WORKERS > 1)
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# USD per million tokens; defaults are Gemini 2.5 Flash list prices
+LLM_PRICE_INPUT_PER_MTOK = float(os.getenv("LLM_PRICE_INPUT_PER_MTOK", "0.30"))
+LLM_PRICE_CACHED_INPUT_PER_MTOK = float(os.getenv("LLM_PRICE_CACHED_INPUT_PER_MTOK", "0.03"))
+LLM_PRICE_OUTPUT_PER_MTOK = float(os.getenv("LLM_PRICE_OUTPUT_PER_MTOK", "2.50"))
+
+
+def cost_usd(stats: dict) -> float:
+    """Cost of one agent run from the token counts gemini() records in `stats`."""
+    return (
+        stats.get("uncached_input_tokens", 0) * LLM_PRICE_INPUT_PER_MTOK
+        + stats.get("cached_input_tokens", 0) * LLM_PRICE_CACHED_INPUT_PER_MTOK
+        + stats.get("output_tokens", 0) * LLM_PRICE_OUTPUT_PER_MTOK
+    ) / 1_000_000
+
+
+class UsageMetrics:
+    """
+    Prometheus counters for token use, cost and tool context inflation. Labels are limited to
+    token kind and tool name; per-user and per-conversation numbers are in Mongo (GET /usage),
+    since users would make the series count unbounded. Under PROMETHEUS_MULTIPROC_DIR the
+    exposition aggregates every worker's counters.
+    """
+
+    def __init__(self):
+        self.enabled = CollectorRegistry is not None
+        if not self.enabled:
+            return
+        self.registry = CollectorRegistry()
+        self.requests = Counter("kowalski_chat_requests", "Agent runs accounted", registry=self.registry)
+        self.tokens = Counter("kowalski_llm_tokens", "LLM tokens by kind", ["kind"], registry=self.registry)
+        self.cost = Counter("kowalski_llm_cost_usd", "Estimated LLM cost in USD", registry=self.registry)
+        self.tool_calls = Counter("kowalski_tool_calls", "Tool calls", ["tool"], registry=self.registry)
+        self.tool_result_tokens = Counter("kowalski_tool_result_tokens", "Tokens returned by tools", ["tool"],
+                                          registry=self.registry)
+        self.tool_context_tokens = Counter("kowalski_tool_context_tokens",
+                                           "Tool result tokens resent to the model in later LLM steps", ["tool"],
+                                           registry=self.registry)
+
+    def observe(self, stats: dict, cost: float):
+        if not self.enabled:
+            return
+        self.requests.inc()
+        for kind in ("uncached_input_tokens", "cached_input_tokens", "output_tokens"):
+            self.tokens.labels(kind=kind.replace("_tokens", "")).inc(stats.get(kind, 0))
+        self.cost.inc(cost)
+        for tool, counts in stats.get("tools", {}).items():
+            self.tool_calls.labels(tool=tool).inc(counts["calls"])
+            self.tool_result_tokens.labels(tool=tool).inc(counts["result_tokens"])
+            self.tool_context_tokens.labels(tool=tool).inc(counts["context_tokens"])
+
+    def exposition(self) -> Optional[tuple]:
+        """(body, content type) in the Prometheus text format, or None without prometheus_client."""
+        if not self.enabled:
+            return None
+        registry = self.registry
+        if PROMETHEUS_MULTIPROC_DIR:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+usage_metrics = UsageMetrics()